@@ -70,6 +70,7 @@ setup(
         'waitress',
         'websauna.viewconfig',
         'pyramid_redis_sessions',
+        'msgpack>=1.0',
         'pyramid-layout',
         "deform>=2.0a2",
         'pyramid_deform',
@@ -136,6 +137,7 @@ setup(
             'ws-create-user=websauna.system.devop.scripts.createuser:main',
             'ws-celery=websauna.system.devop.scripts.celery:main',
             'ws-pserve=websauna.system.devop.scripts.pserve:main',
+            'ws-compile-templates=websauna.system.devop.scripts.compiletemplates:main',
         ],
 
         'paste.app_factory': [
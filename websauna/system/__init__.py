@@ -9,6 +9,7 @@ import logging
 import os
 
 from pyramid.config import Configurator
+from pyramid.events import ApplicationCreated
 from pyramid.interfaces import IDebugLogger, IViewMapperFactory
 from pyramid.path import DottedNameResolver
 from pyramid.settings import aslist
@@ -190,9 +191,16 @@ class Initializer:
             self.config.registry.registerUtility(mailer, IMailer)
 
     def configure_templates(self):
+        from websauna.system.core import templatecache
         from websauna.system.core import templatecontext
         from websauna.system.core.render import get_on_demand_resource_renderer
 
+        # Store compiled templates on the disk, must be set up before adding the renderers
+        cache_directory = templatecache.get_cache_directory(self.config.registry.settings)
+        if cache_directory:
+            templatecache.configure_jinja2_cache(self.config.registry.settings, cache_directory)
+            templatecache.configure_chameleon_cache(cache_directory)
+
         # Jinja 2 templates as .html files
         self.config.include('pyramid_jinja2')
         self.config.add_jinja2_renderer('.html')
@@ -231,6 +239,9 @@ class Initializer:
 
         self.config.add_request_method(get_request_user, 'user', reify=True)
 
+        # Optional Redis cache of user principals
+        self.config.include("websauna.system.auth.principalcache")
+
         self.config.add_tween("websauna.system.auth.tweens.SessionInvalidationTweenFactory", over=pyramid.tweens.MAIN)
 
         # Grab incoming auth details changed events
@@ -390,6 +401,13 @@ class Initializer:
 
         set_creation_time_aware_session_factory(self.config)
 
+    def configure_page_cache(self, settings):
+        """Configure the full page cache for anonymous visitors.
+
+        See :py:mod:`websauna.system.http.pagecache`.
+        """
+        self.config.include("websauna.system.http.pagecache")
+
     def configure_admin(self, settings):
         """Configure admin ux.
 
@@ -400,7 +418,6 @@ class Initializer:
         from websauna.system.admin import subscribers
         from websauna.system.admin.admin import Admin
         from websauna.system.admin.interfaces import IAdmin
-        from websauna.system.admin.interfaces import IAdmin
         from websauna.system.admin.utils import get_admin
 
         # Register default Admin provider
@@ -423,6 +440,14 @@ class Initializer:
         # Add request.admin variable
         self.config.add_request_method(get_admin, 'admin', reify=True)
 
+        # Build admin menus and other static structure once, after all model admins and subscribers are in place.
+        # Intermediate config.commit() calls, e.g. from add_simple_route(), happen before addons have registered their model admins.
+        def build_admin(event):
+            registry = event.app.registry
+            registry.queryUtility(IAdmin).get_prototype(registry)
+
+        config.add_subscriber(build_admin, ApplicationCreated)
+
     def configure_forms(self):
         """Configure subsystems for rendering Deform forms."""
 
@@ -629,6 +654,7 @@ class Initializer:
         self.configure_sessions(settings, self.secrets)
         self.configure_user(settings, self.secrets)
         self.configure_model_admins()
+        self.configure_page_cache(settings)
 
         self.configure_notebook()
 
@@ -1,4 +1,5 @@
 """Default admin root implementation."""
+import copy
 
 from zope.interface import implementer
 from pyramid.security import Allow
@@ -22,7 +23,7 @@ class Admin(Resource):
 
     * ``Admin.get_admin_menu()`` returns a horizontal menu which is visible after entering the admin UI
 
-    This class is instiated for each request and does not have global state.
+    The menus and the child resource factories are constructed once per application by firing :py:class:`websauna.system.admin.events.AdminConstruction` on a prototype admin, see :py:meth:`get_prototype`. This class is instiated for each request, but it only binds the shared structure to the request.
     """
 
     #: Default permissions of who can add, read and write things in admin
@@ -30,24 +31,55 @@ class Admin(Resource):
         (Allow, 'group:admin', 'add'),
         (Allow, 'group:admin', 'view'),
         (Allow, 'group:admin', 'edit'),
+        (Allow, 'group:admin', 'export'),
         (Allow, 'superuser:supseruser', 'shell'),
     ]
 
-    def __init__(self, request):
+    def __init__(self, request, registry=None):
+        """
+        :param request: Current HTTP request. ``None`` when constructing the prototype.
+        :param registry: Pyramid registry when constructing the prototype
+        """
         super(Admin, self).__init__(request)
 
-        # Current add_route() view config sets Admin instance as request.root when traversing inside admin.
-        # Assume this admin instance lives directly under the root
-        self.__parent__ =  Root(request)
         self.__name__ = "admin"
 
-        self.admin_menu_entry = None
-        self.quick_menu_entry = None
+        # Child resources resolved during this request
+        self._resources = {}
+
+        if request is None:
+            self.registry = registry
+            self.__parent__ = None
+
+            self.admin_menu_entry = None
+            self.quick_menu_entry = None
+
+            # Registered child resource factories, usually put in AdminConstruct event. Called with request as the argument.
+            self.children = {}
+
+            self.construct()
+        else:
+            self.registry = request.registry
+
+            # Current add_route() view config sets Admin instance as request.root when traversing inside admin.
+            # Assume this admin instance lives directly under the root
+            self.__parent__ = Root(request)
+
+            prototype = self.get_prototype(self.registry)
+            self.admin_menu_entry = prototype.admin_menu_entry
+            self.quick_menu_entry = prototype.quick_menu_entry
+            self.children = prototype.children
 
-        # Registered child resources, usually put in AdminConstruct event
-        self.children = {}
+    @classmethod
+    def get_prototype(cls, registry) -> "Admin":
+        """Get the request independent admin structure of the application.
 
-        self.construct()
+        The prototype is created when the WSGI application is created, or on the first call.
+        """
+        prototype = getattr(registry, "admin_prototype", None)
+        if prototype is None:
+            prototype = registry.admin_prototype = cls(None, registry)
+        return prototype
 
     def get_title(self):
         return "Admin"
@@ -58,7 +90,7 @@ class Admin(Resource):
         self.construct_default_menu()
 
         # Call all plugins to register themselves
-        self.request.registry.notify(AdminConstruction(self))
+        self.registry.notify(AdminConstruction(self))
 
     def get_admin_object_url(self, obj, view_name=None):
         """Get URL for viewing the object in admin.
@@ -109,7 +141,20 @@ class Admin(Resource):
         return self.admin_menu_entry.submenu
 
     def __getitem__(self, name):
-        """Traverse to individual model admins by the model name."""
-        child = self.children[name]
+        """Traverse to child resources, like model admins under ``models``.
+
+        Child resources are created from the registered factories once per request. Resource instances put to ``children`` by older ``AdminConstruction`` subscribers are copied and bound to the request.
+        """
+        child = self._resources.get(name)
+        if child is None:
+            factory = self.children[name]
+            if isinstance(factory, Resource) or not callable(factory):
+                child = copy.copy(factory)
+                child.request = self.request
+                child.__parent__ = None
+            else:
+                child = factory(self.request)
+            self._resources[name] = child
+            Resource.make_lineage(self, child, name)
         return child
 
@@ -0,0 +1,155 @@
+"""Statistics shown on the admin dashboard panels.
+
+The dashboard has a panel for each model admin and each panel shows the item count of its model. Counting models one by one makes a round trip to the database per model. Instead, :py:func:`get_counts` counts all model admins in one query and keeps the results in a short lived cache. The cache is kept in the process memory and in Redis, so that all processes share the results.
+
+Panels can cache their own statistics with :py:func:`get_cached`.
+
+The cached statistics are shared by all users of the admin interface. If a model admin filters its query by the current user, turn off the cache.
+
+Settings::
+
+    # How many seconds dashboard statistics are cached. Set 0 to turn off.
+    websauna.admin_dashboard_cache_ttl = 30
+    # Redis database to share the statistics, defaults to redis.sessions.url. Without either the cache is kept in the process memory only.
+    websauna.admin_dashboard_cache_url = redis://localhost:6379/1
+
+If Redis cannot be reached, the statistics are computed and kept in the process memory.
+"""
+import json
+import logging
+import time
+
+from pyramid.registry import Registry
+from pyramid.request import Request
+from redis import RedisError
+from sqlalchemy import select
+
+from websauna.compat.typing import Callable
+from websauna.compat.typing import Dict
+from websauna.compat.typing import Iterable
+from websauna.compat.typing import Tuple
+from websauna.system.admin.modeladmin import ModelAdmin
+from websauna.system.core.redis import get_redis
+from websauna.system.crud.counter import Count
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_cache_ttl(registry:Registry) -> int:
+    """How many seconds dashboard statistics are cached."""
+    return int(registry.settings.get("websauna.admin_dashboard_cache_ttl", 30))
+
+
+def _get_local_cache(registry:Registry) -> dict:
+    cache = getattr(registry, "_admin_dashboard_cache", None)
+    if cache is None:
+        cache = registry._admin_dashboard_cache = {}
+    return cache
+
+
+def get_cached(request:Request, key:str, creator:Callable):
+    """Get a dashboard statistic from the cache or compute it.
+
+    :param key: Name of the statistic
+    :param creator: Callable which returns the value. The value must be JSON serializable.
+    :return: Value as it was returned by creator, or as loaded from JSON
+    """
+    registry = request.registry
+    ttl = get_cache_ttl(registry)
+    if not ttl:
+        return creator()
+
+    local = _get_local_cache(registry)
+    now = time.time()
+    hit = local.get(key)
+    if hit and hit[0] > now:
+        return hit[1]
+
+    redis = None
+    redis_key = "{}:admin-dashboard:{}".format(registry.settings.get("websauna.site_id", "websauna"), key)
+    url = registry.settings.get("websauna.admin_dashboard_cache_url") or registry.settings.get("redis.sessions.url")
+    if url:
+        redis = get_redis(registry, url=url)
+        try:
+            data = redis.get(redis_key)
+        except RedisError as e:
+            logger.warning("Could not read dashboard statistic %s from Redis: %s", key, e)
+            data = None
+            redis = None
+        if data is not None:
+            value = json.loads(data.decode("utf-8"))
+            local[key] = (now + ttl, value)
+            return value
+
+    value = creator()
+
+    if redis is not None:
+        try:
+            redis.setex(redis_key, ttl, json.dumps(value))
+        except RedisError as e:
+            logger.warning("Could not store dashboard statistic %s to Redis: %s", key, e)
+
+    local[key] = (now + ttl, value)
+    return value
+
+
+def count_model_admins(dbsession, model_admins:Iterable[Tuple[str, ModelAdmin]]) -> Dict[str, Count]:
+    """Count items of several model admins in one database query.
+
+    Counters which do not provide ``get_count_statement()`` are run one by one.
+
+    :param model_admins: List of (model admin id, model admin) tuples
+    :return: Dict of model admin id -> count
+    """
+    counts = {}
+    batched = []
+
+    for id, model_admin in model_admins:
+        counter = model_admin.counter
+        stmt = None
+        if hasattr(counter, "get_count_statement"):
+            stmt = counter.get_count_statement(model_admin.get_query())
+
+        if stmt is None:
+            counts[id] = model_admin.get_count()
+        else:
+            batched.append((id, counter, stmt))
+
+    if batched:
+        # One row with a scalar subquery per model
+        combined = select([stmt.as_scalar().label("count_{}".format(i)) for i, (id, counter, stmt) in enumerate(batched)])
+        row = dbsession.execute(combined).first()
+        for (id, counter, stmt), value in zip(batched, row):
+            counts[id] = counter.make_count(value)
+
+    return counts
+
+
+def get_counts(request:Request, model_admins:Iterable[Tuple[str, ModelAdmin]]) -> Dict[str, Count]:
+    """Get cached item counts for dashboard panels.
+
+    :param model_admins: List of (model admin id, model admin) tuples
+    :return: Dict of model admin id -> count
+    """
+    model_admins = list(model_admins)
+
+    def create():
+        counts = count_model_admins(request.dbsession, model_admins)
+        return {id: [int(count), count.estimate, count.capped] for id, count in counts.items()}
+
+    key = "counts:" + ",".join(sorted(id for id, model_admin in model_admins))
+    data = get_cached(request, key, create)
+    return {id: Count(value, estimate=estimate, capped=capped) for id, (value, estimate, capped) in data.items()}
+
+
+def get_count(request:Request, model_admin:ModelAdmin) -> Count:
+    """Get the item count for a model admin panel.
+
+    Use the counts collected by the dashboard view for the current request, if available.
+    """
+    counts = getattr(request, "_admin_dashboard_counts", None) or {}
+    count = counts.get(model_admin.__name__)
+    if count is None:
+        count = model_admin.get_count()
+    return count
@@ -2,9 +2,9 @@
 
 
 class AdminConstruction:
-    """Fired when admin interface is constructed for the request.
+    """Fired once when the admin interface structure is constructed.
 
-    Subscribers may contribute their own parts and traversing to admin UI.
+    Subscribers may contribute their own menu entries and traversing to admin UI. The event is fired for the prototype admin when the WSGI application is created, so there is no request: ``admin.request`` is ``None``. Contribute traversable parts as factories taking request as an argument to ``admin.children``. A resource instance put to ``admin.children`` is also accepted: it is copied and bound to the request on traversal. Use menu entry conditions for request dependent visibility.
     """
 
     def __init__(self, admin):
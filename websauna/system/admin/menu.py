@@ -73,6 +73,7 @@ class Entry:
         self.submenu = submenu
         self.css_class = css_class
         self.condition = condition
+        self.link = link
 
         if caret:
             self.caret = caret
@@ -158,6 +159,27 @@ class TraverseEntry(Entry):
 
 
 
+class ModelAdminEntry(Entry):
+    """Menu entry which links to a view of a model admin.
+
+    The model admin resource is looked up from ``request.admin`` when the link is rendered, so the entry can be created on the application startup.
+    """
+
+    def __init__(self, id:str, label:str, model_admin_id:str, name:str, **kwargs):
+        """
+        :param model_admin_id: Traverse id of the model admin
+        :param name: Traversable view name
+        """
+        assert model_admin_id
+        assert name
+        super(ModelAdminEntry, self).__init__(id, label, **kwargs)
+        self.model_admin_id = model_admin_id
+        self.name = name
+
+    def get_link(self, request):
+        return request.resource_url(request.admin["models"][self.model_admin_id], self.name)
+
+
 class NavbarEntry(Entry):
     """Root entry for rendering horizontal navigation list menu."""
 
@@ -35,7 +35,7 @@ class ModelAdmin(CRUD):
 
     #: Our resource factory
     class Resource(AlchemyResource):
-        pass
+        __slots__ = ()
 
     def get_admin(self) -> IAdmin:
         """Get Admin resource object."""
@@ -58,18 +58,24 @@ class ModelAdminRoot(Resource):
 
         :yield: (model_id, IModelAdmin) tuples
         """
-
-        for model_id, model_cls in self.request.registry.getAdapters([self.request], IModelAdmin):
-            yield(model_id, model_cls)
+        return get_model_admins(self.request.registry)
 
     def __getitem__(self, item):
-        """Traverse to model admins. """
+        """Traverse to model admins.
+
+        Model admin instances are kept for the lifetime of this object, so that objects and resources they have already resolved are reused.
+        """
+        children = self.__dict__.setdefault("_children", {})
+        if item in children:
+            return children[item]
+
         registry = self.request.registry
         model_admin_resource = registry.queryAdapter(self.request, IModelAdmin, name=item)
         if not model_admin_resource:
             raise RuntimeError("Did not find model admin with id: {}".format(item))
 
         Resource.make_lineage(self, model_admin_resource, item)
+        children[item] = model_admin_resource
         return model_admin_resource
 
     def items(self) -> typing.List[typing.Tuple[str, ModelAdmin]]:
@@ -77,6 +83,14 @@ class ModelAdminRoot(Resource):
             yield id, self[id]
 
 
+def get_model_admins(registry) -> typing.List[typing.Tuple[str, type]]:
+    """List registered model admin classes without instantiating them.
+
+    :return: List of (model admin id, model admin class) tuples
+    """
+    return list(registry.adapters.lookupAll((IRequest,), IModelAdmin))
+
+
 def model_admin(traverse_id:str) -> type:
     """Class decorator to mark the class to become part of model admins.
 
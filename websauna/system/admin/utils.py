@@ -4,9 +4,15 @@ from websauna.system.model.meta import Base
 
 
 def get_admin(request) -> IAdmin:
-    """Get hold of the default site admin interface root object."""
-    admin_class = request.registry.queryUtility(IAdmin)
-    return admin_class(request)
+    """Get hold of the default site admin interface root object.
+
+    The same admin object is returned for the lifetime of the request.
+    """
+    admin = getattr(request, "_admin_cache", None)
+    if admin is None:
+        admin_class = request.registry.queryUtility(IAdmin)
+        admin = request._admin_cache = admin_class(request)
+    return admin
 
 
 def get_admin_for_model(admin:IAdmin, model:type) -> Resource:
@@ -3,6 +3,7 @@ from pyramid.httpexceptions import HTTPFound
 
 from pyramid.view import view_config
 from pyramid_layout.panel import panel_config
+from websauna.system.admin import dashboard
 from websauna.system.admin.modeladmin import ModelAdmin, ModelAdminRoot
 from websauna.system.admin.utils import get_admin
 from websauna.system.crud import views as crud_views
@@ -22,9 +23,13 @@ def admin(request):
     # For now, admin panels always appear in ascending order
 
     model_admin_root = admin["models"]
+    model_admins = list(model_admin_root.items())
+
+    # Count all models in one go for the panels
+    request._admin_dashboard_counts = dashboard.get_counts(request, model_admins)
 
     # TODO: Have renderer adapters for panels, so that they can override views
-    rendered_panels = [render_panel(ma, request, name="admin_panel") for id, ma in model_admin_root.items()]
+    rendered_panels = [render_panel(ma, request, name="admin_panel") for id, ma in model_admins]
 
     return dict(panels=rendered_panels)
 
@@ -36,7 +41,7 @@ def default_model_admin_panel(context, request):
     Display count of items in the database.
     """
     model_admin = context
-    count = model_admin.get_query().count()
+    count = dashboard.get_count(request, model_admin)
     admin = model_admin.__parent__
     title = model_admin.title
     return locals()
@@ -65,11 +70,27 @@ class Listing(crud_views.Listing):
         # We override this method just to define admin route_name traversing
         return super(Listing, self).listing()
 
+    @view_config(context=ModelAdmin, name="export", route_name="admin", permission='export')
+    def export(self):
+        # We override this method just to define admin route_name traversing
+        return super(Listing, self).export()
+
+
+class Autocomplete(crud_views.Autocomplete):
+    """Relationship widget search for model admins."""
+
+    @view_config(context=ModelAdmin, name="autocomplete", renderer="json", route_name="admin", permission='view')
+    def autocomplete(self):
+        # We override this method just to define admin route_name traversing
+        return super(Autocomplete, self).autocomplete()
+
 
 class Show(crud_views.Show):
     """Default show view for model admin."""
     base_template = "admin/base.html"
 
+    cache_schema = True
+
     resource_buttons = [
         TraverseLinkButton(id="edit", name="Edit", view_name="edit", permission="edit"),
         TraverseLinkButton(id="shell", name="Shell", view_name="shell", permission="shell", tooltip="Open IPython Notebook shell and have this item prepopulated in obj variable."),
@@ -103,6 +124,8 @@ class Edit(crud_views.Edit):
     """Default edit vie for model admin."""
     base_template = "admin/base.html"
 
+    cache_schema = True
+
     @view_config(context=ModelAdmin.Resource, name="edit", renderer="crud/edit.html", route_name="admin", permission='edit')
     def edit(self):
         # We override this method just to define admin route_name traversing
@@ -113,6 +136,8 @@ class Add(crud_views.Add):
     """Default add view for model admin."""
     base_template = "admin/base.html"
 
+    cache_schema = True
+
     @view_config(context=ModelAdmin, name="add", renderer="crud/add.html", route_name="admin", permission='add')
     def add(self):
         # We override this method just to define admin route_name traversing
@@ -1,22 +1,40 @@
 """The user authentication helper functions."""
 from pyramid.settings import aslist
 from pyramid.security import unauthenticated_userid
+from sqlalchemy.orm import joinedload
+
 from websauna.system.http import Request
 from websauna.system.user.models import User
 
 from websauna.system.user.utils import get_user_class
 
 
+def load_user(user_id, request:Request) -> User:
+    """Load the user and its groups in one query.
+
+    The result is cached for the lifetime of the request, so that ``request.user`` and principal resolution share the same object and query.
+
+    :return: User or None if there is no such user
+    """
+    cache = getattr(request, "_auth_user_cache", None)
+    if cache is None:
+        cache = request._auth_user_cache = {}
+
+    if user_id not in cache:
+        user_class = get_user_class(request.registry)
+        cache[user_id] = request.dbsession.query(user_class).options(joinedload("groups")).get(user_id)
+
+    return cache[user_id]
+
+
 def get_user(user_id, request:Request) -> User:
     """Extract the logged in user from the request object using Pyramid's authentication framework."""
 
     # user_id = unauthenticated_userid(request)
 
     # TODO: Abstract this to its own service like in Warehouse?
-    user_class = get_user_class(request.registry)
-
     if user_id is not None:
-        user = user_class.get_by_id(request, user_id)
+        user = load_user(user_id, request)
 
         # Check through conditions why this user would no longer be valid
         if user:
@@ -34,5 +52,3 @@ def get_request_user(request:Request) -> User:
 
     user_id = unauthenticated_userid(request)
     return get_user(user_id, request) if user_id else None
-
-
@@ -0,0 +1,8 @@
+from zope.interface import Interface
+
+
+class IPrincipalCache(Interface):
+    """Utility marker interface for the cross-request cache of user principals.
+
+    See :py:class:`websauna.system.auth.principalcache.PrincipalCache`.
+    """
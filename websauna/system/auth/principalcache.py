@@ -0,0 +1,165 @@
+"""Cross-request cache of user principals in Redis.
+
+Resolving the logged in user and its groups is done on every request. With the principal cache enabled the principals, login permission and session validation timestamp of a user are kept in Redis and PostgreSQL is consulted only when the entry is missing.
+
+Enable in the settings::
+
+    websauna.principal_cache = true
+
+    # How many seconds an entry lives if not invalidated
+    websauna.principal_cache_ttl = 600
+
+    # Redis database to use, defaults to redis.sessions.url
+    websauna.principal_cache_url = redis://localhost:6379/1
+
+Entries are dropped when :py:class:`websauna.system.user.events.UserAuthSensitiveOperation` is fired, when users or groups are edited in the admin and when a group is deleted during a request. If you change user groups or user details in your own code call :py:func:`invalidate_principals`.
+"""
+import datetime
+import json
+import logging
+from collections import namedtuple
+
+from pyramid.registry import Registry
+from pyramid.settings import asbool
+from pyramid.threadlocal import get_current_request
+from sqlalchemy import event
+from sqlalchemy import inspection
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from websauna.compat.typing import List
+from websauna.compat.typing import Optional
+from websauna.system.auth.interfaces import IPrincipalCache
+from websauna.system.core.redis import get_redis
+from websauna.system.http import Request
+from websauna.system.user.usermixin import GroupMixin
+
+
+logger = logging.getLogger(__name__)
+
+
+class AuthState(namedtuple("AuthState", ["principals", "can_login", "last_auth_sensitive_operation_at"])):
+    """What authentication needs to know about a user."""
+
+    def is_valid_session(self, session_created_at:datetime.datetime) -> bool:
+        """Check if the session is still valid for this user.
+
+        See :py:meth:`websauna.system.user.usermixin.UserMixin.is_valid_session`.
+        """
+        return self.last_auth_sensitive_operation_at <= session_created_at
+
+
+class PrincipalCache:
+    """Store :py:class:`AuthState` of users in Redis."""
+
+    #: Seconds until entries expire
+    ttl = 600
+
+    def __init__(self, registry:Registry, url:str=None, ttl:int=None):
+        self.registry = registry
+        self.url = url
+        if ttl:
+            self.ttl = ttl
+        self.prefix = "{}:principals:".format(registry.settings.get("websauna.site_id", "websauna"))
+
+    def get_redis(self):
+        return get_redis(self.registry, url=self.url)
+
+    def get_key(self, user_id) -> str:
+        return self.prefix + str(user_id)
+
+    def get(self, user_id) -> Optional[AuthState]:
+        """Get cached state of a user or None if not cached."""
+        data = self.get_redis().get(self.get_key(user_id))
+        if data is None:
+            return None
+
+        data = json.loads(data.decode("utf-8"))
+        last_op = data["last_auth_sensitive_operation_at"]
+        if last_op is not None:
+            last_op = datetime.datetime.fromtimestamp(last_op, datetime.timezone.utc)
+
+        return AuthState(data["principals"], data["can_login"], last_op)
+
+    def set(self, user_id, state:AuthState):
+        """Store the state of a user."""
+        last_op = state.last_auth_sensitive_operation_at
+        data = dict(
+            principals=state.principals,
+            can_login=state.can_login,
+            last_auth_sensitive_operation_at=last_op.timestamp() if last_op else None
+        )
+        self.get_redis().setex(self.get_key(user_id), self.ttl, json.dumps(data))
+
+    def invalidate(self, user_id):
+        """Drop the cached state of a user."""
+        self.get_redis().delete(self.get_key(user_id))
+
+
+def get_principal_cache(registry:Registry) -> Optional[PrincipalCache]:
+    """Get the configured principal cache or None if the cache is not enabled."""
+    return registry.queryUtility(IPrincipalCache)
+
+
+def invalidate_principals(request:Request, user_ids:List[int]):
+    """Drop cached principals of users.
+
+    The entries are dropped immediately and again after the transaction commits, so that a concurrent request cannot store the state of the old transaction back to the cache.
+
+    :param user_ids: List of user ids
+    """
+    cache = get_principal_cache(request.registry)
+    if not cache:
+        return
+
+    user_ids = list(user_ids)
+
+    def invalidate(success=True):
+        for user_id in user_ids:
+            cache.invalidate(user_id)
+
+    invalidate()
+
+    if hasattr(request, "tm"):
+        request.tm.get().addAfterCommitHook(invalidate)
+
+
+def get_group_member_ids(dbsession:Session, group) -> List[int]:
+    """Get ids of the members of a group.
+
+    The ids are read from the user-group association table, so that user rows are not loaded.
+    """
+    prop = inspection.inspect(group.__class__).relationships["users"]
+    (group_column, group_key), = prop.synchronize_pairs
+    (user_column, user_key), = prop.secondary_synchronize_pairs
+    query = select([user_key]).where(group_key == group.id)
+    return [user_id for user_id, in dbsession.execute(query)]
+
+
+def invalidate_deleted_groups(session:Session, flush_context, instances):
+    """Drop cached principals of members of deleted groups.
+
+    Only deletions during a HTTP request are noticed. Call :py:func:`invalidate_principals` if you delete groups in scripts.
+    """
+    request = get_current_request()
+    if request is None:
+        return
+
+    for obj in session.deleted:
+        if isinstance(obj, GroupMixin) and obj.id is not None:
+            invalidate_principals(request, get_group_member_ids(session, obj))
+
+
+def includeme(config):
+    """Enable the principal cache if set in the settings."""
+    settings = config.registry.settings
+
+    if not asbool(settings.get("websauna.principal_cache", False)):
+        return
+
+    url = settings.get("websauna.principal_cache_url") or settings.get("redis.sessions.url")
+    ttl = int(settings.get("websauna.principal_cache_ttl") or 0)
+    config.registry.registerUtility(PrincipalCache(config.registry, url=url, ttl=ttl), IPrincipalCache)
+
+    if not event.contains(Session, "before_flush", invalidate_deleted_groups):
+        event.listen(Session, "before_flush", invalidate_deleted_groups)
@@ -5,7 +5,10 @@ from pyramid.settings import aslist
 from websauna.system.http import Request
 from websauna.compat.typing import List
 from websauna.compat.typing import Optional
-from websauna.system.user.utils import get_user_class
+from websauna.system.auth.authentication import load_user
+from websauna.system.auth.principalcache import AuthState
+from websauna.system.auth.principalcache import get_principal_cache
+from websauna.system.user.models import User
 
 
 def resolve_principals(userid:int, request:Request) -> Optional[List[str]]:
@@ -17,10 +20,47 @@ def resolve_principals(userid:int, request:Request) -> Optional[List[str]]:
 
     * List super user as ``superuser:superuser`` style string
     """
+    state = get_auth_state(userid, request)
+    if state and state.can_login:
+        return state.principals
 
-    dbsession = request.dbsession
+    # User not found, user disabled
+    return None
+
+
+def get_auth_state(userid:int, request:Request) -> Optional[AuthState]:
+    """Get principals and session validation data for the user.
+
+    The state is resolved once per request. If :py:mod:`principal cache <websauna.system.auth.principalcache>` is enabled it is read from Redis and the database is queried only on a cache miss.
+
+    :return: AuthState or None if the user does not exist
+    """
+
+    # Pyramid calls resolve_principals() for every permission check
+    cache = getattr(request, "_auth_state_cache", None)
+    if cache is None:
+        cache = request._auth_state_cache = {}
+
+    if userid in cache:
+        return cache[userid]
+
+    principal_cache = get_principal_cache(request.registry)
+
+    state = principal_cache.get(userid) if principal_cache else None
+    if state is None:
+        user = load_user(userid, request)
+        if user:
+            state = AuthState(get_principals(user, request), user.can_login(), user.last_auth_sensitive_operation_at)
+            if principal_cache:
+                principal_cache.set(userid, state)
+
+    cache[userid] = state
+    return state
+
+
+def get_principals(user:User, request:Request) -> List[str]:
+    """Compute principals for the user."""
 
-    user_class = get_user_class(request.registry)
     settings = request.registry.settings
 
     # Read superuser names from the config
@@ -28,16 +68,10 @@ def resolve_principals(userid:int, request:Request) -> Optional[List[str]]:
 
     admin_as_superuser = asbool(settings.get("websauna.admin_as_superuser", False))
 
-    user = dbsession.query(user_class).get(userid)
-    if user and user.can_login():
-
-        principals = ['group:{}'.format(g.name) for g in user.groups]
+    principals = ['group:{}'.format(name) for name in sorted(user.get_group_names())]
 
-        # Allow superuser permission
-        if user.username in superusers or user.email in superusers or (admin_as_superuser and "group:admin" in principals):
-            principals.append("superuser:superuser")
+    # Allow superuser permission
+    if user.username in superusers or user.email in superusers or (admin_as_superuser and "group:admin" in principals):
+        principals.append("superuser:superuser")
 
-        return principals
-
-    # User not found, user disabled
-    return None
\ No newline at end of file
+    return principals
@@ -1,5 +1,6 @@
 """Handle incoming user events."""
 from pyramid.events import subscriber
+from websauna.system.auth.principalcache import invalidate_principals
 from websauna.system.user.events import UserAuthSensitiveOperation
 from websauna.utils.time import now
 
@@ -18,3 +19,5 @@ def user_auth_details_changes(event:UserAuthSensitiveOperation):
     # Update the timestamp which session validation checks on every request
     user.last_auth_sensitive_operation_at = now()
 
+    # Drop the cached session validation timestamp
+    invalidate_principals(event.request, [user.id])
@@ -1,6 +1,7 @@
 """Authentication tweens."""
 from pyramid.httpexceptions import HTTPFound
 from pyramid.registry import Registry
+from websauna.system.auth.principals import get_auth_state
 from websauna.system.core import messages
 from websauna.system.http import Request
 
@@ -9,6 +10,8 @@ class SessionInvalidationTweenFactory:
     """Tween to detect invalidated sessions and redirect user back to home.
 
     This tween checks if the current session is logged in user and there has been authentication sensitive changes to this user. In this case all user sessions should be logged out.
+
+    The check uses :py:func:`websauna.system.auth.principals.get_auth_state`, so that with the principal cache enabled the user is not loaded from the database.
     """
 
     def __init__(self, handler, registry:Registry):
@@ -16,13 +19,14 @@ class SessionInvalidationTweenFactory:
         self.registry = registry
 
     def __call__(self, request:Request):
-        user = request.user
-        if user:
+        user_id = request.unauthenticated_userid
+        state = get_auth_state(user_id, request) if user_id else None
+        if state and state.can_login:
             session_created_at = request.session["created_at"]
-            if not user.is_valid_session(session_created_at):
+            if not state.is_valid_session(session_created_at):
                 request.session.invalidate()
                 messages.add(request, kind="error", msg="Your have been logged out due to authentication changes.   ", msg_id="msg-session-invalidated")
                 return HTTPFound(request.application_url)
 
         response = self.handler(request)
-        return response
\ No newline at end of file
+        return response
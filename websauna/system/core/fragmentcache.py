@@ -0,0 +1,278 @@
+"""Cache rendered template fragments.
+
+Wrap an expensive part of a Jinja 2 template to ``{% cache %}`` tag::
+
+    {% cache "latest-news" %}
+        {% for item in get_latest_news() %}
+            ...
+        {% endfor %}
+    {% endcache %}
+
+The tag takes the cache key, optional time to live in seconds and optional ``vary_on`` list of values. Each different ``vary_on`` value gets its own cached copy::
+
+    {% cache "user-menu", 300, vary_on=[request.user.id] %}
+        ...
+    {% endcache %}
+
+Rendered HTML is stored in two levels
+
+* In-process LRU cache which is limited by the total size of the cached fragments
+
+* Redis, shared by all processes
+
+When the fragment content changes, drop the cached copies explicitly::
+
+    from websauna.system.core.fragmentcache import get_fragment_cache
+
+    get_fragment_cache(request.registry).invalidate_key("latest-news")
+
+Invalidation drops Redis and the local copies of the current process. Other processes keep serving their local copy up to ``websauna.fragment_cache_local_ttl`` seconds.
+
+Settings::
+
+    websauna.fragment_cache = true
+    websauna.fragment_cache_ttl = 60
+    websauna.fragment_cache_local_ttl = 10
+    # Maximum total length of fragments in the local cache, in characters
+    websauna.fragment_cache_max_size = 10000000
+    # Use Redis as the second level. Defaults to true if Redis sessions are configured.
+    websauna.fragment_cache_redis = true
+    # Redis database to use, defaults to redis.sessions.url
+    websauna.fragment_cache_url = redis://localhost:6379/1
+
+If Redis cannot be reached, fragments are rendered without the cache.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from jinja2 import Markup
+from jinja2 import nodes
+from jinja2.ext import Extension
+from pyramid.registry import Registry
+from pyramid.settings import asbool
+from pyramid.threadlocal import get_current_registry
+from redis import RedisError
+
+from websauna.compat.typing import Callable
+from websauna.compat.typing import Optional
+from websauna.system.core.interfaces import IFragmentCache
+from websauna.system.core.redis import get_redis
+
+
+logger = logging.getLogger(__name__)
+
+
+class FragmentCache:
+    """Two-level cache for rendered HTML fragments.
+
+    Keeps hit and miss counters, see :py:meth:`get_stats`.
+    """
+
+    def __init__(self, registry:Registry, ttl:int=60, local_ttl:int=10, max_size:int=10000000, use_redis:bool=True, url:str=None):
+        """
+        :param ttl: Default time to live of fragments in seconds
+        :param local_ttl: How long a fragment is kept in the process memory when Redis is used
+        :param max_size: Maximum total length of fragments kept in the process memory
+        :param use_redis: Use Redis as the shared second level cache
+        :param url: Redis connection URL
+        """
+        self.registry = registry
+        self.url = url
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.max_size = max_size
+        self.use_redis = use_redis
+        self.prefix = "{}:fragment:".format(registry.settings.get("websauna.site_id", "websauna"))
+
+        #: Cache key -> (expires at, html) in least recently used order
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def get_redis(self):
+        return get_redis(self.registry, url=self.url)
+
+    def get_cache_key(self, key:str, vary_on=None) -> str:
+        """Build the cache key for one variant of a fragment."""
+        if vary_on is None:
+            return key + ":"
+        data = json.dumps(vary_on, sort_keys=True, default=str)
+        return key + ":" + hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    def _remove_local(self, cache_key:str):
+        entry = self.entries.pop(cache_key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def _set_local(self, cache_key:str, html:str, ttl:int):
+        if len(html) > self.max_size:
+            return
+
+        with self.lock:
+            self._remove_local(cache_key)
+            self.entries[cache_key] = (time.time() + ttl, html)
+            self.size += len(html)
+
+            # Evict least recently used fragments
+            while self.size > self.max_size:
+                evicted_key, (expires, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def get(self, cache_key:str) -> Optional[str]:
+        """Get a cached fragment.
+
+        :return: HTML or None if not cached
+        """
+        with self.lock:
+            entry = self.entries.get(cache_key)
+            if entry is not None:
+                expires, html = entry
+                if expires > time.time():
+                    self.entries.move_to_end(cache_key)
+                    self.hits += 1
+                    return html
+                self._remove_local(cache_key)
+
+        if self.use_redis:
+            try:
+                data = self.get_redis().get(self.prefix + cache_key)
+            except RedisError as e:
+                logger.warning("Could not read fragment %s from Redis: %s", cache_key, e)
+                data = None
+            if data is not None:
+                html = data.decode("utf-8")
+                self._set_local(cache_key, html, self.local_ttl)
+                with self.lock:
+                    self.redis_hits += 1
+                return html
+
+        with self.lock:
+            self.misses += 1
+
+        return None
+
+    def set(self, cache_key:str, html:str, ttl:int=None):
+        """Store a rendered fragment."""
+        ttl = ttl or self.ttl
+
+        if self.use_redis:
+            try:
+                self.get_redis().setex(self.prefix + cache_key, ttl, html.encode("utf-8"))
+            except RedisError as e:
+                logger.warning("Could not store fragment %s to Redis: %s", cache_key, e)
+            self._set_local(cache_key, html, min(ttl, self.local_ttl))
+        else:
+            self._set_local(cache_key, html, ttl)
+
+    def render(self, key:str, ttl:Optional[int], vary_on, caller:Callable) -> str:
+        """Get a fragment from the cache or render it with ``caller``."""
+        cache_key = self.get_cache_key(key, vary_on)
+        html = self.get(cache_key)
+        if html is None:
+            html = str(caller())
+            self.set(cache_key, html, ttl)
+        return html
+
+    def invalidate(self, key:str, vary_on=None):
+        """Drop one variant of a cached fragment."""
+        cache_key = self.get_cache_key(key, vary_on)
+
+        with self.lock:
+            self._remove_local(cache_key)
+
+        if self.use_redis:
+            self.get_redis().delete(self.prefix + cache_key)
+
+    def invalidate_key(self, key:str):
+        """Drop all variants of a cached fragment."""
+        start = key + ":"
+
+        with self.lock:
+            for cache_key in [k for k in self.entries if k.startswith(start)]:
+                self._remove_local(cache_key)
+
+        if self.use_redis:
+            redis = self.get_redis()
+            keys = list(redis.scan_iter(match=self.prefix + start + "*"))
+            if keys:
+                redis.delete(*keys)
+
+    def get_stats(self) -> dict:
+        """Get hit and miss counters and the local cache usage."""
+        with self.lock:
+            return dict(hits=self.hits, redis_hits=self.redis_hits, misses=self.misses, entries=len(self.entries), size=self.size)
+
+
+class FragmentCacheExtension(Extension):
+    """Jinja 2 ``{% cache key, ttl, vary_on=[...] %}`` tag."""
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+
+        key = parser.parse_expression()
+        ttl = nodes.Const(None)
+        vary_on = nodes.Const(None)
+
+        while parser.stream.skip_if("comma"):
+            if parser.stream.current.type == "name" and parser.stream.look().type == "assign":
+                name = next(parser.stream).value
+                parser.stream.skip()
+                value = parser.parse_expression()
+                if name == "vary_on":
+                    vary_on = value
+                elif name == "ttl":
+                    ttl = value
+                else:
+                    parser.fail("Unknown cache tag argument: {}".format(name), lineno)
+            else:
+                ttl = parser.parse_expression()
+
+        body = parser.parse_statements(["name:endcache"], drop_needle=True)
+        call = self.call_method("_render", [nodes.ContextReference(), key, ttl, vary_on])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, context, key, ttl, vary_on, caller):
+        request = context.get("request")
+        registry = request.registry if request is not None else get_current_registry()
+
+        cache = get_fragment_cache(registry)
+        if cache is None:
+            return caller()
+
+        return Markup(cache.render(key, ttl, vary_on, caller))
+
+
+def get_fragment_cache(registry:Registry) -> Optional[FragmentCache]:
+    """Get the fragment cache or None if the cache is not enabled."""
+    return registry.queryUtility(IFragmentCache)
+
+
+def includeme(config):
+    """Set up the fragment cache from the settings and add ``{% cache %}`` tag to Jinja 2 renderers."""
+    settings = config.registry.settings
+
+    for renderer_name in (".html", ".txt"):
+        config.add_jinja2_extension(FragmentCacheExtension, name=renderer_name)
+
+    if not asbool(settings.get("websauna.fragment_cache", True)):
+        return
+
+    cache = FragmentCache(
+        config.registry,
+        ttl=int(settings.get("websauna.fragment_cache_ttl", 60)),
+        local_ttl=int(settings.get("websauna.fragment_cache_local_ttl", 10)),
+        max_size=int(settings.get("websauna.fragment_cache_max_size", 10000000)),
+        use_redis=asbool(settings.get("websauna.fragment_cache_redis", bool(settings.get("redis.sessions.url")))),
+        url=settings.get("websauna.fragment_cache_url") or settings.get("redis.sessions.url"),
+    )
+    config.registry.registerUtility(cache, IFragmentCache)
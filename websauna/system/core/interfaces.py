@@ -13,3 +13,10 @@ class ISecrets(Interface):
 
     Secrets is a dictionary which hold sensitive deployment data.
     """
+
+
+class IFragmentCache(Interface):
+    """Utility marker interface for the template fragment cache.
+
+    See :py:class:`websauna.system.core.fragmentcache.FragmentCache`.
+    """
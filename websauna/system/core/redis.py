@@ -1,5 +1,7 @@
 """Redis connection manager."""
 import logging
+import os
+import threading
 
 from redis import StrictRedis
 from redis import ConnectionError
@@ -8,17 +10,61 @@ from pyramid.config import Configurator
 from pyramid.registry import Registry
 from pyramid.threadlocal import get_current_registry
 
+from websauna.compat.typing import List
+
 
 logger = logging.getLogger(__name__)
 
 
+#: Settings which are passed to Redis clients created by :py:func:`get_redis`, mapped to their type
+POOL_SETTINGS = {
+    "websauna.redis_max_connections": ("max_connections", int),
+    "websauna.redis_socket_timeout": ("socket_timeout", float),
+    "websauna.redis_socket_connect_timeout": ("socket_connect_timeout", float),
+    "websauna.redis_health_check_interval": ("health_check_interval", int),
+}
+
+
+_lock = threading.Lock()
+
+
+def get_pool_options(registry:Registry) -> dict:
+    """Read connection pool options from the settings.
+
+    * ``websauna.redis_max_connections`` - max connections in one pool
+
+    * ``websauna.redis_socket_timeout`` - seconds to wait for a command to complete
+
+    * ``websauna.redis_socket_connect_timeout`` - seconds to wait for a connection to be established
+
+    * ``websauna.redis_health_check_interval`` - ping idle connections older than this many seconds before use (redis-py 3.3+)
+    """
+    settings = registry.settings or {}
+    options = {}
+    for key, (option, type_) in POOL_SETTINGS.items():
+        value = settings.get(key)
+        if value not in (None, ""):
+            options[option] = type_(value)
+    return options
+
+
+def _get_clients(registry:Registry) -> dict:
+    """Get the client cache of the registry, dropping clients inherited over fork()."""
+    pid = os.getpid()
+    cache = getattr(registry, "_redis_clients", None)
+    if cache is None or cache["pid"] != pid:
+        # Sockets of the parent process must not be shared with the child, so start with new pools
+        cache = {"pid": pid, "clients": {}}
+        registry._redis_clients = cache
+    return cache["clients"]
+
+
 def get_redis(registry:Registry=None, url:str=None, redis_client=StrictRedis, **redis_options) -> StrictRedis:
     """Get a connection to Redis.
 
     Compatible with *pyramid_redis_session*, see https://github.com/ericrasmussen/pyramid_redis_sessions/blob/master/pyramid_redis_sessions/connection.py
 
-    Default Redis connection handler. Once a connection is established it is
-    cached in ``registry``.
+    Default Redis connection handler. Clients are cached in ``registry`` per URL and options, so all callers share the same connection pool. Pool options are read from the settings, see :py:func:`get_pool_options`. Pools are not shared over ``fork()``.
 
     HTTP example:
 
@@ -42,15 +88,32 @@ def get_redis(registry:Registry=None, url:str=None, redis_client=StrictRedis, **
         logger.warn("Always pass registry explicitly to get_redis()")
         registry = get_current_registry()
 
-    # TODO: Cache connections by name
-    # attempt to get an existing connection from the registry
-    redis = None
+    options = get_pool_options(registry)
+    options.update(redis_options)
+
+    # Caller managed pools are not cached
+    if "connection_pool" in options and url is None:
+        return redis_client(**options)
+
+    try:
+        key = (redis_client, url, tuple(sorted(options.items())))
+        hash(key)
+    except TypeError:
+        # Unhashable options
+        return _create_redis(url, redis_client, options)
+
+    with _lock:
+        clients = _get_clients(registry)
+        redis = clients.get(key)
+        if redis is None:
+            redis = clients[key] = _create_redis(url, redis_client, options)
+
+    return redis
 
-    # if we found an active connection, return it
-    if redis is not None:
-        return redis
 
-    # otherwise create a new connection
+def _create_redis(url:str, redis_client, redis_options:dict) -> StrictRedis:
+    """Create a new Redis client with its own connection pool."""
+
     if url is not None:
         # remove defaults to avoid duplicating settings in the `url`
         redis_options.pop('password', None)
@@ -65,15 +128,32 @@ def get_redis(registry:Registry=None, url:str=None, redis_client=StrictRedis, **
         # connection pools are also no longer a valid option for
         # loading via URL
         redis_options.pop('connection_pool', None)
-        redis = redis_client.from_url(url, **redis_options)
+        return redis_client.from_url(url, **redis_options)
     else:
-        redis = redis_client(**redis_options)
+        return redis_client(**redis_options)
 
-    # TODO: Fix caching by redis options
-    # save the new connection in the registry
-    # setattr(registry, '_redis_sessions', redis)
 
-    return redis
+def get_redis_pool_stats(registry:Registry) -> List[dict]:
+    """Get connection pool usage of Redis clients created by :py:func:`get_redis`.
+
+    Useful for monitoring. Example output::
+
+        [{'host': 'localhost', 'port': 6379, 'db': 1, 'max_connections': 50, 'created_connections': 3, 'available_connections': 2, 'in_use_connections': 1}]
+    """
+    stats = []
+    for redis in list(_get_clients(registry).values()):
+        pool = redis.connection_pool
+        kwargs = pool.connection_kwargs
+        stats.append(dict(
+            host=kwargs.get("host") or kwargs.get("path"),
+            port=kwargs.get("port"),
+            db=kwargs.get("db"),
+            max_connections=pool.max_connections,
+            created_connections=getattr(pool, "_created_connections", None),
+            available_connections=len(getattr(pool, "_available_connections", [])),
+            in_use_connections=len(getattr(pool, "_in_use_connections", [])),
+        ))
+    return stats
 
 
 def is_sane_redis(config:Configurator) -> bool:
@@ -1,12 +1,150 @@
 """Session creation."""
+from pyramid.interfaces import ISession
+from pyramid.settings import asbool
 from pyramid_redis_sessions import session_factory_from_settings
+from zope.interface import implementer
+
+from websauna.system.http import Request
 from websauna.utils.time import now
 
 
+@implementer(ISession)
+class LazySession:
+    """A session which is created in Redis only when something is stored in it.
+
+    If the request does not carry a session cookie, reading from the session returns empty values without contacting Redis. The real session, and its cookie, is created on the first write: setting a key, adding a flash message or asking for a CSRF token. Requests with a session cookie load the session on the first access as usual.
+    """
+
+    def __init__(self, request:Request, factory, cookie_name:str):
+        """
+        :param factory: Creates the real session for a request
+        :param cookie_name: Name of the session cookie
+        """
+        self._request = request
+        self._factory = factory
+        self._session = None
+        self._has_cookie = cookie_name in request.cookies
+
+    def get_session(self, create:bool=True) -> ISession:
+        """Get the real session.
+
+        :param create: If False and the request has no session cookie, do not create a session and return None
+        """
+        if self._session is None and (create or self._has_cookie):
+            self._session = self._factory(self._request)
+        return self._session
+
+    @property
+    def materialized(self) -> bool:
+        """Has the real session been created for this request."""
+        return self._session is not None
+
+    # Reading
+
+    def __getitem__(self, key):
+        session = self.get_session(create=False)
+        if session is None:
+            raise KeyError(key)
+        return session[key]
+
+    def get(self, key, default=None):
+        session = self.get_session(create=False)
+        return default if session is None else session.get(key, default)
+
+    def __contains__(self, key):
+        session = self.get_session(create=False)
+        return session is not None and key in session
+
+    def __iter__(self):
+        return iter(self.get_session(create=False) or ())
+
+    def __len__(self):
+        return len(self.get_session(create=False) or ())
+
+    def keys(self):
+        session = self.get_session(create=False)
+        return session.keys() if session is not None else []
+
+    def values(self):
+        session = self.get_session(create=False)
+        return session.values() if session is not None else []
+
+    def items(self):
+        session = self.get_session(create=False)
+        return session.items() if session is not None else []
+
+    def peek_flash(self, queue=""):
+        session = self.get_session(create=False)
+        return session.peek_flash(queue) if session is not None else []
+
+    def pop_flash(self, queue=""):
+        session = self.get_session(create=False)
+        return session.pop_flash(queue) if session is not None else []
+
+    # Modifying an empty session is a no-op
+
+    def __delitem__(self, key):
+        session = self.get_session(create=False)
+        if session is None:
+            raise KeyError(key)
+        del session[key]
+
+    def pop(self, key, *default):
+        session = self.get_session(create=False)
+        if session is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        return session.pop(key, *default)
+
+    def clear(self):
+        session = self.get_session(create=False)
+        if session is not None:
+            session.clear()
+
+    def changed(self):
+        session = self.get_session(create=False)
+        if session is not None:
+            session.changed()
+
+    def invalidate(self):
+        session = self.get_session(create=False)
+        if session is not None:
+            session.invalidate()
+
+    # Writing creates the session
+
+    def __setitem__(self, key, value):
+        self.get_session()[key] = value
+
+    def setdefault(self, key, default=None):
+        return self.get_session().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self.get_session().update(*args, **kwargs)
+
+    def flash(self, msg, queue="", allow_duplicate=True):
+        self.get_session().flash(msg, queue=queue, allow_duplicate=allow_duplicate)
+
+    def new_csrf_token(self):
+        return self.get_session().new_csrf_token()
+
+    def get_csrf_token(self):
+        return self.get_session().get_csrf_token()
+
+    def __getattr__(self, name):
+        # created, new and session backend specific attributes
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.get_session(), name)
+
+
 def set_creation_time_aware_session_factory(config):
     """Setup a session factory that rememembers time when the session was created.
 
     We need this information to later invalidate session for the authentication change details.
+
+    If ``websauna.lazy_session`` setting is true sessions are wrapped in :py:class:`LazySession` and anonymous requests without a session cookie do not touch Redis.
     """
 
     settings = config.registry.settings
@@ -26,4 +164,12 @@ def set_creation_time_aware_session_factory(config):
             session["created_at"] = now()
         return session
 
-    config.set_session_factory(create_session)
+    if asbool(settings.get("websauna.lazy_session", False)):
+        cookie_name = settings.get("redis.sessions.cookie_name", "session")
+
+        def create_lazy_session(request):
+            return LazySession(request, create_session, cookie_name)
+
+        config.set_session_factory(create_lazy_session)
+    else:
+        config.set_session_factory(create_session)
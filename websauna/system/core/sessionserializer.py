@@ -0,0 +1,140 @@
+"""Compact session serialization with msgpack.
+
+*pyramid_redis_sessions* pickles session data by default. Pickled :py:class:`websauna.system.core.messages.FlashMessage` objects and ``datetime`` values are verbose and slow to load. This serializer uses `msgpack <http://msgpack.org/>`_ with extension types for them.
+
+Enable in the settings::
+
+    redis.sessions.serialize = websauna.system.core.sessionserializer.serialize
+    redis.sessions.deserialize = websauna.system.core.sessionserializer.deserialize
+
+Existing pickled sessions are still read, so the serializer can be switched on without logging out users. Tuples are stored as lists. Values msgpack cannot present, like sets or custom objects, are pickled inside the msgpack payload.
+
+Compare the serializers with::
+
+    python -m websauna.system.core.sessionserializer
+"""
+import datetime
+import pickle
+import struct
+import timeit
+
+import msgpack
+
+from websauna.system.core.messages import FlashMessage
+
+
+#: Payloads written by this serializer start with this header. Anything else is a legacy pickle.
+MAGIC = b"WS\x01"
+
+#: Extension type codes
+EXT_DATETIME = 1
+EXT_DATE = 2
+EXT_FLASH_MESSAGE = 3
+EXT_PICKLE = 127
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+#: Seconds and microseconds since epoch in wall clock time, optionally followed by UTC offset in seconds
+_DATETIME = struct.Struct(">qI")
+_INT32 = struct.Struct(">i")
+
+
+def _pack(obj) -> bytes:
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+
+def _unpack(data:bytes):
+    return msgpack.unpackb(data, ext_hook=_ext_hook, raw=False, strict_map_key=False)
+
+
+def _default(obj):
+    """Encode types msgpack does not know."""
+
+    if isinstance(obj, datetime.datetime):
+        # Integers keep microseconds exact
+        delta = obj.replace(tzinfo=None) - _EPOCH
+        data = _DATETIME.pack(delta.days * 86400 + delta.seconds, delta.microseconds)
+        offset = obj.utcoffset()
+        if offset is not None:
+            data += _INT32.pack(int(offset.total_seconds()))
+        return msgpack.ExtType(EXT_DATETIME, data)
+
+    if isinstance(obj, datetime.date):
+        return msgpack.ExtType(EXT_DATE, _INT32.pack(obj.toordinal()))
+
+    if isinstance(obj, FlashMessage):
+        return msgpack.ExtType(EXT_FLASH_MESSAGE, _pack([obj.kind, obj.plain, obj.rich, obj.msg_id, obj.extra]))
+
+    return msgpack.ExtType(EXT_PICKLE, pickle.dumps(obj, pickle.HIGHEST_PROTOCOL))
+
+
+def _ext_hook(code:int, data:bytes):
+    """Decode extension types."""
+
+    if code == EXT_DATETIME:
+        seconds, microseconds = _DATETIME.unpack_from(data)
+        value = _EPOCH + datetime.timedelta(seconds=seconds, microseconds=microseconds)
+        if len(data) > _DATETIME.size:
+            offset = _INT32.unpack_from(data, _DATETIME.size)[0]
+            tz = datetime.timezone.utc if offset == 0 else datetime.timezone(datetime.timedelta(seconds=offset))
+            value = value.replace(tzinfo=tz)
+        return value
+
+    if code == EXT_DATE:
+        return datetime.date.fromordinal(_INT32.unpack(data)[0])
+
+    if code == EXT_FLASH_MESSAGE:
+        msg = FlashMessage.__new__(FlashMessage)
+        msg.kind, msg.plain, msg.rich, msg.msg_id, msg.extra = _unpack(data)
+        return msg
+
+    if code == EXT_PICKLE:
+        return pickle.loads(data)
+
+    return msgpack.ExtType(code, data)
+
+
+def serialize(session_data:dict) -> bytes:
+    """Serialize session data for Redis."""
+    return MAGIC + _pack(session_data)
+
+
+def deserialize(data:bytes) -> dict:
+    """Deserialize session data from Redis.
+
+    Sessions written by the default pickle serializer are loaded with pickle.
+    """
+    if data.startswith(MAGIC):
+        return _unpack(data[len(MAGIC):])
+    return pickle.loads(data)
+
+
+def benchmark(rounds:int=10000):
+    """Print size and speed of this serializer against pickle for a typical logged in session."""
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    session_data = {
+        "managed_dict": {
+            "auth.userid": 1,
+            "created_at": now,
+            "_csrft_": "0123456789abcdef0123456789abcdef01234567",
+            "_f_success": [FlashMessage("You are now logged in", kind="success", msg_id="msg-you-are-logged-in")],
+        },
+        "created": 1460000000.0,
+        "timeout": 1200,
+    }
+
+    candidates = [
+        ("pickle", pickle.dumps, pickle.loads),
+        ("msgpack", serialize, deserialize),
+    ]
+
+    for name, dumps, loads in candidates:
+        data = dumps(session_data)
+        dump_time = timeit.timeit(lambda: dumps(session_data), number=rounds)
+        load_time = timeit.timeit(lambda: loads(data), number=rounds)
+        print("{:10} {:5d} bytes, serialize {:6.2f} us, deserialize {:6.2f} us".format(name, len(data), dump_time / rounds * 1000000, load_time / rounds * 1000000))
+
+
+if __name__ == "__main__":
+    benchmark()
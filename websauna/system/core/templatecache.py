@@ -0,0 +1,113 @@
+"""Persistent on-disk cache for compiled Jinja 2 and Chameleon templates.
+
+By default templates are compiled in the memory of each process on their first use, so the first requests after a deploy or a worker restart are slow. With the cache the compiled templates are written on the disk and shared by all processes. Jinja 2 stores its bytecode with :py:class:`jinja2.FileSystemBytecodeCache` and Chameleon, used by Deform widget templates, stores the compiled Python modules.
+
+Enable in the settings::
+
+    # Directory is created if it does not exist
+    websauna.template_cache = %(here)s/var/template-cache
+
+Fill the cache when building a release, so that workers do not need to compile anything::
+
+    ws-compile-templates production.ini
+"""
+import logging
+import os
+
+from pyramid.registry import Registry
+from pyramid_jinja2 import IJinja2Environment
+
+from websauna.compat.typing import Optional
+from websauna.compat.typing import Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_cache_directory(settings:dict) -> Optional[str]:
+    """Read the template cache directory from the settings.
+
+    :return: Absolute path or None if the cache is not enabled
+    """
+    directory = settings.get("websauna.template_cache")
+    if not directory:
+        return None
+    return os.path.abspath(directory)
+
+
+def configure_jinja2_cache(settings:dict, directory:str):
+    """Make *pyramid_jinja2* to create Jinja 2 environments with a file system bytecode cache.
+
+    Must be called before Jinja 2 renderers are added. Explicit ``jinja2.bytecode_caching`` settings are respected.
+    """
+    path = os.path.join(directory, "jinja2")
+    os.makedirs(path, exist_ok=True)
+    settings.setdefault("jinja2.bytecode_caching", "true")
+    settings.setdefault("jinja2.bytecode_caching_directory", path)
+
+
+def configure_chameleon_cache(directory:str):
+    """Make Chameleon to store compiled templates in the cache directory.
+
+    This is the same as setting ``CHAMELEON_CACHE`` environment variable, but it can be done after Chameleon has been imported. The setting is process wide.
+    """
+    from chameleon.loader import ModuleLoader
+    from chameleon.template import BaseTemplate
+
+    path = os.path.join(directory, "chameleon")
+    os.makedirs(path, exist_ok=True)
+    BaseTemplate.loader = ModuleLoader(path)
+
+
+def compile_jinja2_templates(registry:Registry) -> Tuple[int, int]:
+    """Compile all templates on the search paths of Jinja 2 renderers.
+
+    Each template is compiled by the environment of the renderer of its file extension, like ``.html`` or ``.txt``. Templates which do not compile, e.g. files written for another template engine, are skipped.
+
+    :return: Tuple (compiled count, failed count)
+    """
+    compiled = failed = 0
+
+    for name, env in registry.getUtilitiesFor(IJinja2Environment):
+        for template_name in env.list_templates(filter_func=lambda t: t.endswith(name)):
+            try:
+                env.get_template(template_name)
+                compiled += 1
+            except Exception as e:
+                logger.warning("Could not compile %s: %s", template_name, e)
+                failed += 1
+
+    return compiled, failed
+
+
+def compile_chameleon_templates() -> Tuple[int, int]:
+    """Compile all Deform widget templates on the Deform search path.
+
+    :return: Tuple (compiled count, failed count)
+    """
+    import deform
+
+    compiled = failed = 0
+    renderer = deform.Form.default_renderer
+    seen = set()
+
+    for search_path in renderer.loader.search_path:
+        for dirpath, dirnames, filenames in os.walk(search_path):
+            for filename in filenames:
+                if not filename.endswith(".pt"):
+                    continue
+
+                template_name = os.path.relpath(os.path.join(dirpath, filename), search_path)
+                if template_name in seen:
+                    continue
+                seen.add(template_name)
+
+                # Load through the renderer, so that templates shadowed by our search paths are resolved like when rendering forms
+                try:
+                    renderer.load(template_name).cook_check()
+                    compiled += 1
+                except Exception as e:
+                    logger.warning("Could not compile %s: %s", template_name, e)
+                    failed += 1
+
+    return compiled, failed
@@ -286,4 +286,7 @@ def includeme(config):
     include_filter(config, "to_json", to_json)
     include_filter(config, "fromtimestamp", fromtimestamp)
 
+    # {% cache %} tag
+    config.include("websauna.system.core.fragmentcache")
+
 
@@ -10,6 +10,9 @@ class Resource:
     Wraps underlying object into a traverse path. All resources are also tied to ``request`` object which gives them ability to query databases for further traversing through ``__getitem__()``.
     """
 
+    # Subclasses may declare __slots__ too for compact instances, see websauna.system.crud.Resource
+    __slots__ = ("__parent__", "__name__", "request")
+
     def __init__(self, request):
 
         #: Pointer to the parent object in traverse hierarchy. This is none until make_lineage is called.
@@ -1,6 +1,11 @@
 """CRUD based on SQLAlchemy, Deform and Pyramid traversal."""
 
 from abc import abstractmethod
+
+from pyramid.traversal import quote_path_segment
+
+from websauna.compat.typing import Iterable
+from websauna.compat.typing import List
 from websauna.system.core.traversal import Resource as _Resource
 
 from .urlmapper import Base64UUIDMapper
@@ -14,6 +19,9 @@ class Resource(_Resource):
     Presents an underlying model instance mapped to an URL path. ``__parent__`` attribute points to a CRUD instance.
     """
 
+    # Listings create one resource per row. Subclasses should declare empty __slots__ to keep instances compact.
+    __slots__ = ("obj",)
+
     def __init__(self, obj:object):
         """
         :param obj: The underlying object we wish to wrap for travering.
@@ -36,6 +44,13 @@ class Resource(_Resource):
         """Get the model class represented by this resource."""
         return self.__parent__.get_model()
 
+    def get_url(self, view_name:str=None) -> str:
+        """Get URL of this resource or its view.
+
+        Faster than ``request.resource_url()``, see :py:meth:`CRUD.get_resource_url`.
+        """
+        return self.__parent__.get_resource_url(self, view_name)
+
     def get_title(self) -> str:
         """Title used on view, edit, delete, pages.
 
@@ -76,6 +91,9 @@ class CRUD(_Resource):
     #: Mapper defines how objects are mapped to URL space. The default mapper assumes models have attribute ``uuid`` which is base64 encoded to URL. You can change this to :py:class:`websauna.system.crud.urlmapper.IdMapper` if you instead to want to use ``id`` as a running counter primary column in URLs. This is not recommended in security wise, though.
     mapper = Base64UUIDMapper()
 
+    #: Name of the string column matched against the search text in relationship autocomplete widgets, e.g. ``"email"``. The column value is also the label of the search results. If not set, items of this CRUD cannot be searched and relationship fields use a select widget, logging a warning if the table is bigger than ``websauna.autocomplete_threshold``. See :py:class:`websauna.system.crud.views.Autocomplete`.
+    search_column = None
+
     def make_resource(self, obj) -> Resource:
         """Take raw model instance and wrap it to Resource for traversing.
 
@@ -90,23 +108,56 @@ class CRUD(_Resource):
         raise NotImplementedError("Does not know how to wrap to resource: {}".format(obj))
 
     def wrap_to_resource(self, obj) -> Resource:
-        # Wrap object to a traversable part
-        instance = self.make_resource(obj)
+        """Wrap object to a traversable part.
+
+        Resources are reused, so wrapping the same object twice through this CRUD gives the same resource.
+        """
 
         path = self.mapper.get_path_from_object(obj)
         assert type(path) == str, "Object {} did not map to URL path correctly, got path {}".format(obj, path)
+
+        resources = self.__dict__.setdefault("_resources", {})
+        instance = resources.get(path)
+        if instance is not None and getattr(instance, "obj", None) is obj:
+            return instance
+
+        instance = self.make_resource(obj)
         instance.make_lineage(self, instance, path)
+        resources[path] = instance
         return instance
 
-    def traverse_to_object(self, path) -> Resource:
+    def wrap_many(self, objs:Iterable) -> List[Resource]:
+        """Wrap a list of objects, e.g. a listing page, to traversable resources.
+
+        Same as calling :py:meth:`wrap_to_resource` for each object, but paths are mapped for all objects at once.
+        """
+        objs = list(objs)
+        paths = self.mapper.get_paths_from_objects(objs)
+
+        resources = self.__dict__.setdefault("_resources", {})
+        result = []
+        for obj, path in zip(objs, paths):
+            instance = resources.get(path)
+            if instance is None or getattr(instance, "obj", None) is not obj:
+                instance = self.make_resource(obj)
+                instance.__parent__ = self
+                instance.__name__ = path
+                resources[path] = instance
+            result.append(instance)
+
+        return result
+
+    def traverse_to_object(self, path, id=None) -> Resource:
         """Wraps object to a traversable URL.
 
         Loads raw database object with id and puts it inside ``Instance`` object,
          with ``__parent__`` and ``__name__`` pointers.
+
+        :param id: Object id if it has already been decoded from the ``path``
         """
 
-        # First try if we get an view for the current instance with the name
-        id = self.mapper.get_id_from_path(path)
+        if id is None:
+            id = self.mapper.get_id_from_path(path)
         obj = self.fetch_object(id)
         return self.wrap_to_resource(obj)
 
@@ -125,10 +176,27 @@ class CRUD(_Resource):
         :param view_name: Traverse view name for the resource. E.g. ``show``, ``edit``.
         """
         res = self.wrap_to_resource(obj)
+        return self.get_resource_url(res, view_name)
+
+    def get_base_url(self) -> str:
+        """Get the URL of this CRUD, resolved once per CRUD instance."""
+        url = self.__dict__.get("_base_url")
+        if url is None:
+            url = self._base_url = self.request.resource_url(self)
+        return url
+
+    def get_resource_url(self, resource:Resource, view_name:str=None) -> str:
+        """Build URL for a resource of this CRUD.
+
+        Produces the same result as ``request.resource_url(resource, view_name)``, but the lineage is walked only once for the CRUD itself and the resource path is appended to it. Use when generating links for many items.
+
+        :param resource: Resource which parent is this CRUD
+        :param view_name: Traverse view name for the resource. E.g. ``show``, ``edit``.
+        """
+        url = self.get_base_url() + quote_path_segment(resource.__name__) + "/"
         if view_name:
-            return self.request.resource_url(res, view_name)
-        else:
-            return self.request.resource_url(res)
+            url += quote_path_segment(view_name)
+        return url
 
     def __getitem__(self, path) -> Resource:
         """Traverse to a model instance.
@@ -136,8 +204,9 @@ class CRUD(_Resource):
         :param path: Part of URL which is resolved to an object via ``mapper``.
         """
 
-        if self.mapper.is_id(path):
-            return self.traverse_to_object(path)
+        id = self.mapper.get_id_from_path_or_none(path)
+        if id is not None:
+            return self.traverse_to_object(path, id)
         else:
             # Signal that this id is not part of the CRUD database and may be a view
             raise KeyError
@@ -0,0 +1,161 @@
+"""Counting strategies for CRUD listings and admin panels.
+
+``SELECT count(*)`` must visit every matching row. On big tables this is a sequential scan on every page view. Counters let you trade the accuracy of the total item count for speed per model::
+
+    from websauna.system.crud.counter import CappedCounter
+
+    @model_admin(traverse_id="log")
+    class LogEntryAdmin(ModelAdmin):
+
+        model = LogEntry
+
+        # Show "10,000+ items" instead of counting millions of rows
+        counter = CappedCounter(limit=10000)
+
+Counters return :py:class:`Count` which behaves like ``int``, but tells templates whether the number is an estimate.
+
+Counters which can express the count as a SQL statement implement ``get_count_statement()`` and ``make_count()``, so that several counts can be combined to one query, see :py:mod:`websauna.system.admin.dashboard`.
+"""
+import json
+
+from sqlalchemy import func
+from sqlalchemy import inspect
+from sqlalchemy import select
+from sqlalchemy import text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Query
+from sqlalchemy.sql.expression import ClauseElement
+from sqlalchemy.sql.expression import Executable
+
+
+class Count(int):
+    """Total number of items, as returned by a counter.
+
+    This is an ``int`` and can be used in arithmetics, e.g. by paginator. The string presentation tells about capping, e.g. ``10,000+``.
+    """
+
+    def __new__(cls, value:int, estimate:bool=False, capped:bool=False):
+        """
+        :param estimate: True if the value was not exactly counted
+        :param capped: True if the counting stopped at ``value`` and there are more items
+        """
+        count = super(Count, cls).__new__(cls, value)
+        count.estimate = estimate or capped
+        count.capped = capped
+        return count
+
+    def __str__(self):
+        if self.capped:
+            return "{:,}+".format(int(self))
+        return str(int(self))
+
+
+class ExactCounter:
+    """Run ``SELECT count(*)`` for the query. The default."""
+
+    def count(self, query:Query) -> Count:
+        return Count(query.order_by(None).count())
+
+    def get_count_statement(self, query:Query):
+        """Get a select statement returning the count as a single value."""
+        return select([func.count()]).select_from(query.order_by(None).subquery())
+
+    def make_count(self, value:int) -> Count:
+        """Convert the result of the count statement."""
+        return Count(value)
+
+
+class CappedCounter:
+    """Count exactly up to a limit.
+
+    The database stops scanning after ``limit + 1`` rows. If there are more, the count is presented as e.g. ``10,000+``.
+    """
+
+    #: Stop counting after this many rows
+    limit = 10000
+
+    def __init__(self, limit:int=None):
+        if limit:
+            self.limit = limit
+
+    def count(self, query:Query) -> Count:
+        value = query.session.execute(self.get_count_statement(query)).scalar()
+        return self.make_count(value)
+
+    def get_count_statement(self, query:Query):
+        """Get a select statement returning the capped count as a single value."""
+        limited = query.order_by(None).limit(self.limit + 1).subquery()
+        return select([func.count()]).select_from(limited)
+
+    def make_count(self, value:int) -> Count:
+        """Convert the result of the count statement."""
+        if value > self.limit:
+            return Count(self.limit, capped=True)
+        return Count(value)
+
+
+class Explain(Executable, ClauseElement):
+    """``EXPLAIN (FORMAT JSON)`` of a select statement.
+
+    The statement is compiled together with ``EXPLAIN``, so that its bind parameters are passed to the database like for the statement itself.
+    """
+
+    # No SQL compilation caching for this construct on SQLAlchemy 1.4+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+class EstimateCounter:
+    """Use PostgreSQL planner statistics for the count.
+
+    * For unfiltered queries read ``pg_class.reltuples`` of the model table
+
+    * For filtered queries read the row estimate of ``EXPLAIN``
+
+    Statistics are updated by ``ANALYZE`` and autovacuum, so the value may be off. If the estimate is below ``exact_below`` the query is counted exactly, as small tables are cheap to count and tables which have not been analyzed yet report zero rows.
+    """
+
+    #: Do exact count if the estimate is less than this
+    exact_below = 10000
+
+    def __init__(self, exact_below:int=None):
+        if exact_below is not None:
+            self.exact_below = exact_below
+
+    def count(self, query:Query) -> Count:
+
+        if query.whereclause is None and len(query.column_descriptions) == 1:
+            estimate = self.get_table_estimate(query)
+        else:
+            estimate = self.get_plan_estimate(query)
+
+        if estimate < self.exact_below:
+            return ExactCounter().count(query)
+
+        return Count(estimate, estimate=True)
+
+    def get_table_estimate(self, query:Query) -> int:
+        """Read the number of rows in the table from the planner statistics."""
+        entity = query.column_descriptions[0]["entity"]
+        table = inspect(entity).local_table
+        stmt = text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)")
+        value = query.session.execute(stmt, dict(name=table.fullname)).scalar()
+        return max(value or 0, 0)
+
+    def get_plan_estimate(self, query:Query) -> int:
+        """Ask the query planner how many rows the query would return."""
+
+        plan = query.session.execute(Explain(query.order_by(None).statement)).scalar()
+
+        # psycopg2 decodes json columns, but EXPLAIN output may come as text
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        return int(plan[0]["Plan"]["Plan Rows"])
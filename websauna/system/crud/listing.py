@@ -1,5 +1,65 @@
+import re
+from inspect import getattr_static
+
+from jinja2 import Template
+from jinja2 import contextfunction
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.exc import UnmappedColumnError
+
+try:
+    # SQLAlchemy 1.2+
+    from sqlalchemy.orm import selectinload
+except ImportError:
+    from sqlalchemy.orm import subqueryload as selectinload
+
+from websauna.compat.typing import Callable
 from websauna.compat.typing import Optional
 from websauna.compat.typing import List
+from websauna.compat.typing import Set
+from websauna.compat.typing import Tuple
+from websauna.system.crud import Resource
+from websauna.utils.jsonb import JSONBProperty
+
+
+#: Column body templates shipped with Websauna. They read the cell value through ``column.get_value()`` only.
+BUILTIN_BODY_TEMPLATES = frozenset([
+    "crud/column_body.html",
+    "crud/column_body_controls.html",
+    "crud/column_body_friendly_time.html",
+])
+
+
+#: Column body templates using these tags cannot be inlined in a macro and are included instead
+_NOT_INLINABLE = re.compile(r"\{%-?\s*(extends|block)\b")
+
+
+def plan_attribute_load(model:type, name:str) -> Tuple[List, Optional[Set[str]]]:
+    """Figure out what must be loaded from the database to read a model attribute.
+
+    :return: Tuple (relationship names to eager load, column attribute names). Column attribute names is None if we cannot tell what the attribute reads.
+    """
+    mapper = inspect(model)
+
+    if name in mapper.column_attrs:
+        return [], {name}
+
+    if name in mapper.relationships:
+        attributes = set()
+        for column in mapper.relationships[name].local_columns:
+            try:
+                attributes.add(mapper.get_property_by_column(column).key)
+            except UnmappedColumnError:
+                pass
+        return [name], attributes
+
+    prop = getattr_static(model, name, None)
+    if isinstance(prop, JSONBProperty):
+        return [], {prop.data_field}
+
+    # Python property, hybrid, method, etc.
+    return [], None
 
 
 class Column:
@@ -19,7 +79,13 @@ class Column:
     #: Arrow formatting string
     format = "MM/DD/YYYY HH:mm"
 
-    def __init__(self, id, name=None, renderer=None, header_template=None, body_template=None, getter=None, format=None, navigate_view_name=None, navigate_url_getter=None):
+    #: List of model attribute names or SQLAlchemy loader options this column needs, see ``get_load_plan()``
+    load = None
+
+    #: Is this column included in CSV and JSON exports of the listing
+    exportable = True
+
+    def __init__(self, id, name=None, renderer=None, header_template=None, body_template=None, getter=None, format=None, navigate_view_name=None, navigate_url_getter=None, load=None):
         """
         :param id: Must match field id on the model
         :param name:
@@ -28,6 +94,7 @@ class Column:
         :param body_template:
         :param navigate_url_getter: callback(request, resource) to generate the target URL if the contents of this cell is clicked
         :param navigate_view_name: If set, make this column clickable and navigates to the traversed name. Options are "show", "edit", "delete"
+        :param load: Tell the listing what this column reads from the model, when it cannot be figured out automatically e.g. because of ``getter``. List of column and relationship names or SQLAlchemy loader options, like ``["author", "title"]`` or ``[joinedload("author").load_only("name")]``.
         :return:
         """
         self.id = id
@@ -35,6 +102,9 @@ class Column:
         self.renderer = renderer
         self.getter = getter
 
+        if load is not None:
+            self.load = load
+
         if format:
             self.format = format
 
@@ -56,16 +126,50 @@ class Column:
         Called in listing body.
         """
 
-        if self.getter:
-            val = self.getter(obj)
-        else:
-            val = getattr(obj, self.id)
+        val = self.get_raw_value(obj)
 
         if val is None:
             return ""
         else:
             return val
 
+    def get_raw_value(self, obj):
+        """Extract value from the object for this column, keeping ``None``.
+
+        Called by exports.
+        """
+        if self.getter:
+            return self.getter(obj)
+        else:
+            return getattr(obj, self.id)
+
+    def get_load_plan(self, model:type) -> Tuple[List, Optional[Set[str]]]:
+        """Tell what this column needs to have loaded from the database.
+
+        If ``load`` hint is given, use it. Otherwise, inspect the model attribute matching column ``id``. Relationships are eager loaded, so that rendering the listing does not issue a query per row. Columns with a ``getter``, ``navigate_url_getter`` or a custom body template may read anything, unless told otherwise with ``load``.
+
+        :return: Tuple (relationship names or loader options, column attribute names). Column attribute names is None if the column may read anything.
+        """
+
+        if self.load is not None:
+            loads = []
+            attributes = set()
+            for item in self.load:
+                if isinstance(item, str):
+                    item_loads, item_attributes = plan_attribute_load(model, item)
+                    loads += item_loads
+                    if item_attributes is None:
+                        return loads, None
+                    attributes |= item_attributes
+                else:
+                    loads.append(item)
+            return loads, attributes
+
+        if self.getter or self.navigate_url_getter or self.body_template not in BUILTIN_BODY_TEMPLATES:
+            return [], None
+
+        return plan_attribute_load(model, self.id)
+
     def get_navigate_target(self, resource, request):
         """Get URL where clicking the link in the listing should go.
 
@@ -96,6 +200,10 @@ class Column:
 
         view_name = view_name or self.navigate_view_name
 
+        if isinstance(target, Resource):
+            # Do not walk the lineage for every row
+            return target.get_url()
+
         return request.resource_url(target)
 
 
@@ -123,11 +231,23 @@ class StringPresentationColumn(Column):
         val = str(obj)
         return self.formatter(val)
 
+    def get_raw_value(self, obj):
+        return self.get_value(obj)
+
+    def get_load_plan(self, model:type):
+        # __str__ may read anything
+        if self.load is not None:
+            return super(StringPresentationColumn, self).get_load_plan(model)
+        return [], None
+
 
 class ControlsColumn(Column):
     """Render View / Edit / Delete buttons."""
+
+    exportable = False
+
     def __init__(self, id="controls", name="Actions", header_template="crud/column_header_controls.html", body_template="crud/column_body_controls.html"):
-        super(ControlsColumn, self).__init__(id=id, name=name, header_template=header_template, body_template=body_template)
+        super(ControlsColumn, self).__init__(id=id, name=name, header_template=header_template, body_template=body_template, load=[])
 
 
 class FriendlyTimeColumn(Column):
@@ -140,6 +260,32 @@ class FriendlyTimeColumn(Column):
         super(FriendlyTimeColumn, self).__init__(id=id, name=name, navigate_view_name=navigate_view_name, header_template=header_template, body_template=body_template)
 
 
+class RowRenderer:
+    """Render body cells of one listing row with a compiled row macro.
+
+    Usage in a template::
+
+        {% for instance in crud.wrap_many(batch) %}
+            {{ render_row(instance.obj, instance) }}
+        {% endfor %}
+
+    The row macro sees the context of the calling template, like ``crud``, ``view`` and the variables added by ``BeforeRender`` subscribers, in the same way as a ``{% include %}`` of the column template would.
+    """
+
+    def __init__(self, template:Template, columns:List[Column], request):
+        self.template = template
+        self.columns = columns
+        self.request = request
+        self.macro = None
+
+    @contextfunction
+    def __call__(self, context, obj, instance):
+        if self.macro is None:
+            # Bind the macro to the variables of the calling template once per rendering
+            self.macro = self.template.make_module(vars=context.get_all()).render_row
+        return self.macro(self.columns, obj, instance, self.request)
+
+
 class Table:
     """Describe table columns to a CRUD listing view."""
 
@@ -150,5 +296,101 @@ class Table:
         """
         self.columns = columns or []
 
+        # Compiled row templates keyed by (Jinja environment, column body templates)
+        self._row_templates = {}
+
     def get_columns(self):
         return self.columns
+
+    def get_load_options(self, model:type, required:Optional[List[str]]=None, columns:Optional[List[Column]]=None, collections:bool=True) -> List:
+        """Create SQLAlchemy loader options to render this table efficiently.
+
+        * Relationships shown in the columns are eager loaded: ``selectinload`` for collections, ``joinedload`` for many-to-one
+
+        * If we know all attributes the columns read, load only those columns
+
+        :param model: SQLAlchemy model class of the listed items
+        :param required: Attribute names needed besides the columns, e.g. for building item URLs
+        :param columns: Columns to plan for. Defaults to ``get_columns()``.
+        :param collections: Eager load collections. Set False for queries using ``yield_per()``, which cannot eager load collections.
+        :return: List of options for ``Query.options()``
+        """
+        mapper = inspect(model)
+
+        options = []
+        relationships = []
+        attributes = set(required or [])
+        complete = True
+
+        if columns is None:
+            columns = self.get_columns()
+
+        for column in columns:
+            loads, column_attributes = column.get_load_plan(model)
+
+            for load in loads:
+                if isinstance(load, str):
+                    if load not in relationships:
+                        relationships.append(load)
+                else:
+                    options.append(load)
+
+            if column_attributes is None:
+                complete = False
+            else:
+                attributes |= column_attributes
+
+        for name in relationships:
+            attr = getattr(model, name)
+            if mapper.relationships[name].uselist:
+                if collections:
+                    options.append(selectinload(attr))
+            else:
+                options.append(joinedload(attr))
+
+        if complete:
+            attributes |= {mapper.get_property_by_column(c).key for c in mapper.primary_key}
+            options.append(load_only(*[getattr(model, name) for name in sorted(attributes) if name in mapper.column_attrs]))
+
+        return options
+
+    def compile_row_template(self, env, columns:List[Column]) -> Template:
+        """Compile body templates of the columns to a single Jinja macro.
+
+        Instead of doing ``{% include column.body_template %}`` for every cell, the sources of the column body templates are pasted in one macro ``render_row(columns, obj, instance, request)``. Inside the macro each column template sees the same ``column``, ``obj``, ``instance`` and ``request`` variables as with the include. Each column template is rendered in its own ``{% with %}`` scope, so that variables set by one column do not leak to the next one.
+
+        :param env: Jinja environment used to look up the column templates
+        :return: Template defining ``render_row`` macro
+        """
+        parts = []
+        for i, column in enumerate(columns):
+            parts.append("{{% with column = columns[{}] %}}".format(i))
+            source, filename, uptodate = env.loader.get_source(env, column.body_template)
+            if _NOT_INLINABLE.search(source):
+                parts.append("{% include column.body_template %}")
+            else:
+                parts.append(source)
+            parts.append("{% endwith %}")
+
+        source = "{% macro render_row(columns, obj, instance, request) %}" + "".join(parts) + "{% endmacro %}"
+        return env.from_string(source)
+
+    def get_row_renderer(self, env, request, columns:Optional[List[Column]]=None) -> RowRenderer:
+        """Get a callable which renders body cells of one row.
+
+        The row template is compiled once per process and set of column templates. If the Jinja environment reloads templates (development), the template is compiled on every call so that the template changes are picked up.
+
+        :param env: Jinja environment
+        :param columns: Columns to render. Defaults to ``get_columns()``.
+        """
+        if columns is None:
+            columns = self.get_columns()
+
+        key = (id(env), tuple(c.body_template for c in columns))
+        template = self._row_templates.get(key)
+        if template is None:
+            template = self.compile_row_template(env, columns)
+            if not env.auto_reload:
+                self._row_templates[key] = template
+
+        return RowRenderer(template, columns, request)
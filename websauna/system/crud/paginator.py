@@ -1,7 +1,27 @@
 from urllib.parse import urlencode, urlsplit, parse_qsl, urlunsplit
+import base64
+import binascii
+import datetime
+import decimal
 import itertools
+import json
+import logging
 import math
+import uuid
 
+from sqlalchemy import and_, or_
+from sqlalchemy import inspect
+from sqlalchemy.orm import Query
+from sqlalchemy.orm import undefer
+from sqlalchemy.orm.exc import UnmappedColumnError
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+from websauna.compat.typing import List
+from websauna.compat.typing import Tuple
+
+
+logger = logging.getLogger(__name__)
 
 def merge_url_qs(url, **kw):
     """ Merge the query string elements of a URL with the ones in ``kw``.
@@ -19,6 +39,14 @@ def merge_url_qs(url, **kw):
         )
 
 
+def strip_url_qs(url, *keys):
+    """Remove the given query string elements from a URL."""
+    segments = urlsplit(url)
+    qs = [(k, v) for (k, v) in parse_qsl(segments.query, keep_blank_values=1) if k not in keys]
+    return urlunsplit(
+        (segments.scheme, segments.netloc, segments.path, urlencode(qs), segments.fragment)
+        )
+
 
 class Batch(object):
     """Present one paginator batch in the list rendering output.
@@ -26,7 +54,9 @@ class Batch(object):
     Originally courtesy of SubstanceD project.
 
     Given a sequence named ``seq``, and a Pyramid request, return an
-    object with the following attributes:
+    object with the following attributes. If ``seq`` is a SQLAlchemy
+    ``Query`` the batch is sliced in the database using ``OFFSET`` and
+    ``LIMIT``, so that only the rows of the current batch are loaded.
 
     ``items``
 
@@ -68,7 +98,9 @@ class Batch(object):
     ``last``
 
       The batch number computed from the sequence length of the last batch
-      (indexed from zero).
+      (indexed from zero). ``None`` if ``seqlen`` is an estimated
+      :py:class:`websauna.system.crud.counter.Count`. Then the next batch is
+      detected by fetching one extra item and ``last_url`` is ``None``.
 
     ``first_url``
 
@@ -173,15 +205,29 @@ class Batch(object):
             toggle_text = 'Multi-column'
 
         if seqlen is None:
-            # won't work if seq is a generator
-            seqlen = len(seq)
+            if isinstance(seq, Query):
+                seqlen = seq.count()
+            else:
+                # won't work if seq is a generator
+                seqlen = len(seq)
         start = num * size
         end = start + size
-        if end > seqlen:
-            end = seqlen
-        items = list(itertools.islice(seq, start, end))
+
+        if getattr(seqlen, "estimate", False):
+            # The total is capped or estimated, so it cannot tell where the listing ends. Look one row ahead instead.
+            items = self.get_items(seq, start, end + 1)
+            has_next = len(items) > size
+            items = items[:size]
+            end = start + len(items)
+            last = None
+        else:
+            if end > seqlen:
+                end = seqlen
+            items = self.get_items(seq, start, end)
+            has_next = seqlen > end
+            last = int(math.ceil(seqlen / float(size)) - 1)
+
         length = len(items)
-        last = int(math.ceil(seqlen / float(size)) - 1)
 
         first_url = None
         prev_url = None
@@ -193,9 +239,9 @@ class Batch(object):
             first_url = merge_url_qs(url, batch_size=size, batch_num=0)
         if start >= size:
             prev_url = merge_url_qs(url, batch_size=size, batch_num=num-1)
-        if seqlen > end:
+        if has_next:
             next_url = merge_url_qs(url, batch_size=size, batch_num=num+1)
-        if size and (num < last):
+        if size and last is not None and num < last:
             last_url = merge_url_qs(url, batch_size=size, batch_num=last)
 
         if prev_url or next_url:
@@ -223,6 +269,18 @@ class Batch(object):
         self.next_url = next_url
         self.last_url = last_url
 
+    def get_items(self, seq, start:int, end:int) -> list:
+        """Extract the items of this batch from the sequence.
+
+        SQLAlchemy queries get ``OFFSET`` and ``LIMIT`` applied, so the database returns only the rows on this batch. Any other sequence is sliced in Python.
+        """
+        if isinstance(seq, Query):
+            if end <= start:
+                return []
+            return seq.offset(start).limit(end - start).all()
+
+        return list(itertools.islice(seq, start, end))
+
     def make_columns(self, column_size=10, num_columns=4):
         """ Break ``self.items`` into a nested list representing columns."""
         columns = []
@@ -261,5 +319,307 @@ class DefaultPaginator:
             self.default_size = default_size
 
     def paginate(self, seq, request, count, url=None) -> Batch:
+        """Create a batch for the current page.
+
+        :param seq: SQLAlchemy query or a Python sequence. Queries are sliced in the database.
+        :param count: Total number of items in ``seq``
+        """
         batch = Batch(seq, request, seqlen=count, url=url, default_size=self.default_size)
         return batch
+
+
+
+class CursorDecodeError(Exception):
+    """Keyset pagination cursor passed in the URL was not valid."""
+
+
+class UnsupportedSortKeyError(Exception):
+    """Keyset pagination cannot seek on the sort order of the query, e.g. because it sorts by an SQL expression or a column of a joined model."""
+
+
+def _parse_datetime(value:str) -> datetime.datetime:
+    """Parse ``datetime.isoformat()`` output, including the UTC offset."""
+    if value[-6:-5] in ("+", "-") and value[-3:-2] == ":":
+        # Strip colon from UTC offset, so that strptime %z understands it
+        value = value[:-3] + value[-2:]
+        fmt = "%Y-%m-%dT%H:%M:%S.%f%z" if "." in value else "%Y-%m-%dT%H:%M:%S%z"
+    else:
+        fmt = "%Y-%m-%dT%H:%M:%S.%f" if "." in value else "%Y-%m-%dT%H:%M:%S"
+    return datetime.datetime.strptime(value, fmt)
+
+
+#: Python types which can be carried in a keyset pagination cursor, mapped to (type tag, to JSON, from JSON)
+_CURSOR_TYPES = [
+    (bool, "b", lambda v: v, lambda v: bool(v)),
+    (int, "i", lambda v: v, lambda v: int(v)),
+    (float, "f", lambda v: v, lambda v: float(v)),
+    (str, "s", lambda v: v, lambda v: str(v)),
+    (decimal.Decimal, "d", str, decimal.Decimal),
+    (uuid.UUID, "u", str, uuid.UUID),
+    (datetime.datetime, "t", lambda v: v.isoformat(), _parse_datetime),
+    (datetime.date, "D", lambda v: v.isoformat(), lambda v: datetime.datetime.strptime(v, "%Y-%m-%d").date()),
+]
+
+
+def encode_cursor(values:list) -> str:
+    """Encode sort key values of a row to an opaque URL-safe cursor string."""
+    data = []
+    for value in values:
+        if value is None:
+            data.append(["n", None])
+            continue
+
+        for type_, tag, dump, load in _CURSOR_TYPES:
+            if isinstance(value, type_):
+                data.append([tag, dump(value)])
+                break
+        else:
+            raise ValueError("Cannot use value {} of type {} in pagination cursor".format(value, type(value)))
+
+    text = json.dumps(data, separators=(",", ":"))
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor:str) -> list:
+    """Decode a cursor created by :py:func:`encode_cursor` back to sort key values.
+
+    :raise CursorDecodeError: If the cursor was tampered or mangled
+    """
+    loaders = {tag: load for type_, tag, dump, load in _CURSOR_TYPES}
+    loaders["n"] = lambda v: None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        return [loaders[tag](value) for tag, value in data]
+    except (ValueError, TypeError, KeyError, binascii.Error, decimal.InvalidOperation) as e:
+        raise CursorDecodeError("Bad pagination cursor: {}".format(cursor)) from e
+
+
+def get_order_keys(query:Query) -> List[Tuple[object, bool]]:
+    """Read ORDER BY clause of a query.
+
+    :return: List of (column, descending) tuples
+    """
+
+    # SQLAlchemy 1.4+ / older SQLAlchemy
+    clauses = getattr(query, "_order_by_clauses", None) or getattr(query, "_order_by", None) or []
+
+    keys = []
+    for clause in clauses:
+        descending = False
+        if isinstance(clause, UnaryExpression) and clause.modifier in (operators.nullsfirst_op, operators.nullslast_op):
+            # Keyset pagination decides the position of NULLs itself
+            clause = clause.element
+        if isinstance(clause, UnaryExpression) and clause.modifier in (operators.desc_op, operators.asc_op):
+            descending = clause.modifier is operators.desc_op
+            clause = clause.element
+        keys.append((clause, descending))
+    return keys
+
+
+class KeysetBatch:
+    """Present one page of keyset (seek) paginated listing.
+
+    Instead of skipping N rows with ``OFFSET``, the page is fetched with ``WHERE sort_key > last_seen_key``, which PostgreSQL can satisfy from an index. The latency of a deep page is the same as the latency of the first page.
+
+    The position is carried in an opaque cursor in ``batch_after`` or ``batch_before`` query parameter. Because there are no page numbers, ``num``, ``startitem``, ``enditem`` and ``last_url`` are ``None``.
+
+    The order of the listing is the ``ORDER BY`` of the incoming query, usually set by :py:meth:`websauna.system.crud.views.Listing.order_query`. The primary key is always added as the last sort key, so that rows with equal sort values are not skipped or repeated. Only columns of the listed model can be sort keys, see :py:class:`UnsupportedSortKeyError`.
+
+``NULL`` sorts after all other values of a nullable sort column, like PostgreSQL does by default: last in ascending and first in descending order.
+    """
+
+    after_param = "batch_after"
+
+    before_param = "batch_before"
+
+    def __init__(self, query:Query, request, url=None, default_size=20, seqlen=None):
+        if url is None:
+            url = request.url
+
+        try:
+            size = int(request.params.get('batch_size', default_size))
+        except (TypeError, ValueError):
+            size = default_size
+        if size < 1:
+            size = default_size
+
+        keys = self.get_keys(query)
+
+        after = self.read_cursor(request, self.after_param, len(keys))
+        before = self.read_cursor(request, self.before_param, len(keys)) if after is None else None
+        reverse = before is not None
+        cursor = before if reverse else after
+
+        # Sort key values are read from rows for cursors. Make sure listing load_only() did not leave them out.
+        query = query.order_by(None).options(*[undefer(attr) for attr, descending, nullable in keys])
+
+        if cursor is not None:
+            query = query.filter(self.get_condition(keys, cursor, reverse))
+
+        query = query.order_by(*[self.get_order_by(column, descending == reverse, nullable) for column, descending, nullable in keys])
+        items = query.limit(size + 1).all()
+
+        has_more = len(items) > size
+        items = items[:size]
+
+        if reverse:
+            items.reverse()
+            has_prev = has_more
+            has_next = True
+        else:
+            has_prev = cursor is not None
+            has_next = has_more
+
+        base_url = strip_url_qs(url, self.after_param, self.before_param)
+
+        first_url = None
+        prev_url = None
+        next_url = None
+
+        if cursor is not None:
+            first_url = merge_url_qs(base_url, batch_size=size)
+        if has_prev and items:
+            prev_url = merge_url_qs(base_url, batch_size=size, **{self.before_param: self.make_cursor(keys, items[0])})
+        if has_next and items:
+            next_url = merge_url_qs(base_url, batch_size=size, **{self.after_param: self.make_cursor(keys, items[-1])})
+
+        self.items = items
+        self.size = size
+        self.length = len(items)
+        self.seqlen = seqlen
+        self.num = None
+        self.startitem = None
+        self.enditem = None
+        self.last = None
+        self.required = bool(prev_url or next_url)
+        self.first_url = first_url
+        self.prev_url = prev_url
+        self.next_url = next_url
+        self.last_url = None
+
+    def get_keys(self, query:Query) -> List[Tuple[object, bool, bool]]:
+        """Resolve sort keys of the query, including the primary key tie breaker.
+
+        :return: List of (model attribute, descending, nullable) tuples
+        :raise UnsupportedSortKeyError: If the query is sorted by something else than columns of the model
+        """
+        entity = query.column_descriptions[0]["entity"]
+        mapper = inspect(entity)
+
+        keys = []
+        for column, descending in get_order_keys(query):
+            keys.append((column, self.get_attribute_name(mapper, column), descending))
+
+        for column in mapper.primary_key:
+            if not any(column is key[0] or column.key == key[0].key for key in keys):
+                keys.append((column, self.get_attribute_name(mapper, column), False))
+
+        result = []
+        for column, name, descending in keys:
+            attr = getattr(entity, name)
+            nullable = getattr(attr.property.columns[0], "nullable", True)
+            result.append((attr, descending, nullable))
+        return result
+
+    def get_attribute_name(self, mapper, column) -> str:
+        """Map sort column to the attribute name on the model."""
+        try:
+            return mapper.get_property_by_column(column).key
+        except UnmappedColumnError as e:
+            raise UnsupportedSortKeyError("Keyset pagination can sort only by columns of {}, got {}".format(mapper.class_.__name__, column)) from e
+
+    def read_cursor(self, request, param:str, length:int):
+        """Get sort key values from a request parameter, ignoring missing or bad cursors."""
+        cursor = request.params.get(param)
+        if not cursor:
+            return None
+
+        try:
+            values = decode_cursor(cursor)
+        except CursorDecodeError:
+            return None
+
+        if len(values) != length:
+            return None
+
+        return values
+
+    def make_cursor(self, keys, obj) -> str:
+        """Create cursor pointing to a row."""
+        return encode_cursor([getattr(obj, attr.key) for attr, descending, nullable in keys])
+
+    def get_order_by(self, column, ascending:bool, nullable:bool):
+        """Build ``ORDER BY`` term of one sort key, NULLs being the biggest values."""
+        if ascending:
+            clause = column.asc()
+            return clause.nullslast() if nullable else clause
+        else:
+            clause = column.desc()
+            return clause.nullsfirst() if nullable else clause
+
+    def get_condition(self, keys, values, reverse):
+        """Build ``WHERE`` clause selecting rows after (or before) the cursor row.
+
+        Expands to ``(a > :a) OR (a = :a AND b > :b) ...`` so that mixed ascending and descending keys work. Comparisons with ``NULL`` are written out with ``IS NULL``, as ``a > NULL`` would never match.
+        """
+        alternatives = []
+        for i, (column, descending, nullable) in enumerate(keys):
+            equals = [(keys[j][0].is_(None) if values[j] is None else keys[j][0] == values[j]) for j in range(i)]
+            value = values[i]
+            if descending == reverse:
+                # Seek towards bigger values. Nothing is bigger than NULL.
+                if value is None:
+                    continue
+                seek = or_(column > value, column.is_(None)) if nullable else column > value
+            else:
+                seek = column.isnot(None) if value is None else column < value
+            alternatives.append(and_(*(equals + [seek])))
+        return or_(*alternatives)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return self.length
+
+    def __bool__(self):
+        return True
+
+
+class KeysetPaginator:
+    """Keyset (seek) pagination for big CRUD listings.
+
+    Pages on the sort order of :py:meth:`websauna.system.crud.views.Listing.order_query` plus the primary key. Next and previous links carry an opaque cursor instead of a page number. Use this instead of :py:class:`DefaultPaginator` when deep pages of a big table become slow::
+
+        class UserListing(admin_views.Listing):
+
+            paginator = KeysetPaginator()
+
+    See :py:class:`KeysetBatch`.
+    """
+
+    template = "crud/paginator.html"
+
+    default_size = 20
+
+    def __init__(self, template=None, default_size=None):
+        if template:
+            self.template = template
+
+        if default_size:
+            self.default_size = default_size
+
+    def paginate(self, seq:Query, request, count, url=None) -> KeysetBatch:
+        """Create a batch for the current page.
+
+        :param seq: SQLAlchemy query
+        :param count: Total number of items in ``seq``, used for informative purposes only
+        """
+        assert isinstance(seq, Query), "KeysetPaginator can paginate only SQLAlchemy queries, got {}".format(seq)
+        try:
+            return KeysetBatch(seq, request, seqlen=count, url=url, default_size=self.default_size)
+        except UnsupportedSortKeyError as e:
+            logger.warning("Falling back to offset pagination: %s", e)
+            return Batch(seq, request, seqlen=count, url=url, default_size=self.default_size)
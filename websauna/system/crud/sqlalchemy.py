@@ -1,6 +1,21 @@
 from pyramid.interfaces import IRequest
 from . import CRUD as _CRUD
 from . import Resource as _Resource
+from .counter import Count
+from .counter import ExactCounter
+
+
+def get_object_cache(request:IRequest) -> dict:
+    """Get the request-scoped cache of objects loaded by CRUD traversing.
+
+    Breadcrumbs, resource buttons and views may traverse to the same object several times during one request. The cache makes sure the database is queried only once.
+
+    :return: Dictionary (CRUD class, model, mapping attribute, id) -> SQLAlchemy object
+    """
+    cache = getattr(request, "_crud_object_cache", None)
+    if cache is None:
+        cache = request._crud_object_cache = {}
+    return cache
 
 
 class Resource(_Resource):
@@ -9,6 +24,8 @@ class Resource(_Resource):
     Describe how to display SQLAlchemy objects in breadcrumbs.
     """
 
+    __slots__ = ()
+
     def get_title(self):
         """Title on show / edit / delete pages."""
         return "{} #{}".format(self.__parent__.title, self.obj.id)
@@ -20,6 +37,9 @@ class CRUD(_CRUD):
     A traversing endpoint which maps listing, add, edit and delete views for an SQLAlchemy model.
     """
 
+    #: How the total number of items is counted for listings and admin panels. See :py:mod:`websauna.system.crud.counter` for cheaper alternatives for big tables.
+    counter = ExactCounter()
+
     def __init__(self, request:IRequest, model:type=None):
         """Create a CRUD root resource for a given model.
 
@@ -50,6 +70,15 @@ class CRUD(_CRUD):
         dbsession = self.get_dbsession()
         return dbsession.query(model)
 
+    def get_count(self, query=None) -> Count:
+        """Count items using the ``counter`` of this CRUD.
+
+        :param query: Query to count. Defaults to ``get_query()``.
+        """
+        if query is None:
+            query = self.get_query()
+        return self.counter.count(query)
+
     def fetch_object(self, id):
         """Pull a raw object from the database.
 
@@ -64,9 +93,19 @@ class CRUD(_CRUD):
         column_instance = getattr(model, column_name, None)
         assert column_instance, "Model {} does not define column/attribute {} used for CRUD resource traversing".format(self.model, column_name)
 
+        cache = get_object_cache(self.request)
+        key = (self.__class__, model, column_name, id)
+
+        obj = cache.get(key)
+
+        # Make sure the object was not loaded by an earlier, now closed, session e.g. before a transaction retry
+        if obj is not None and obj in self.get_dbsession():
+            return obj
+
         obj = self.get_query().filter(column_instance==id).first()
         if not obj:
             raise KeyError("Object id {} was not found for CRUD {} using model {}".format(id, self, model))
 
+        cache[key] = obj
         return obj
 
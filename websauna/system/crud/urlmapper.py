@@ -1,5 +1,6 @@
 """Map URL traversing ids to database ids and vice versa."""
 import abc
+import base64
 
 from websauna.utils import slug
 from websauna.utils.slug import SlugDecodeError
@@ -22,6 +23,21 @@ class Mapper(abc.ABC):
         """Map traversable resource name to an database object id."""
         raise NotImplementedError()
 
+    def get_id_from_path_or_none(self, path):
+        """Map traversable resource name to an database object id if the path looks like an id.
+
+        Used by traversing, so that the path is parsed only once.
+
+        :return: Object id or None if the path cannot be an object id and may be a view name
+        """
+        if not self.is_id(path):
+            return None
+        return self.get_id_from_path(path)
+
+    def get_paths_from_objects(self, objs:list) -> list:
+        """Map a list of database objects to traversable URL paths."""
+        return [self.get_path_from_object(obj) for obj in objs]
+
 
 class IdMapper(Mapper):
     """Use object/column attribute id to map functions.
@@ -65,6 +81,14 @@ class IdMapper(Mapper):
     def get_id_from_path(self, path):
         return self.transform_to_id(path)
 
+    def get_paths_from_objects(self, objs:list) -> list:
+        attr = self.mapping_attribute
+        transform = self.transform_to_path
+        try:
+            return [transform(getattr(obj, attr)) for obj in objs]
+        except AttributeError as e:
+            raise CannotMapException("Could not find attribute {} on objects. The default behavior is to look for attribute/column uuid. If you need to change this behavior define mapper in your CRUD class.".format(attr)) from e
+
 
 class Base64UUIDMapper(IdMapper):
     """Map objects to URLs using their UUID property."""
@@ -90,3 +114,29 @@ class Base64UUIDMapper(IdMapper):
         except SlugDecodeError:
             # bytes is not 16-char string
             return False
+
+    def get_paths_from_objects(self, objs:list) -> list:
+        """Encode slugs for a list of objects without per object checks."""
+
+        # transform_to_path overridden
+        if self.transform_to_path is not slug.uuid_to_slug:
+            return super(Base64UUIDMapper, self).get_paths_from_objects(objs)
+
+        attr = self.mapping_attribute
+        encode = base64.urlsafe_b64encode
+        try:
+            return [encode(getattr(obj, attr).bytes).decode("ascii").rstrip("=") for obj in objs]
+        except AttributeError as e:
+            raise CannotMapException("Could not find UUID attribute {} on objects.".format(attr)) from e
+
+    def get_id_from_path_or_none(self, path):
+        """Decode the slug only once when traversing."""
+
+        # is_id() overridden in the constructor
+        if "is_id" in self.__dict__:
+            return super(Base64UUIDMapper, self).get_id_from_path_or_none(path)
+
+        try:
+            return self.transform_to_id(path)
+        except SlugDecodeError:
+            return None
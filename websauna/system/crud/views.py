@@ -1,14 +1,25 @@
 """Default CRUD views."""
+import csv
+import datetime
+import io
+import json
+
 import colander
 from abc import abstractmethod
 
+from pyramid.httpexceptions import HTTPBadRequest
 from pyramid.httpexceptions import HTTPFound
+from pyramid.httpexceptions import HTTPNotFound
 from pyramid.renderers import render
 from pyramid.request import Request
 from pyramid.response import Response
 from pyramid.view import view_config
 from pyramid_deform import CSRFSchema
+from pyramid_jinja2 import IJinja2Environment
+from sqlalchemy import func
+from sqlalchemy import inspect
 from sqlalchemy.orm import Query
+from sqlalchemy.orm import Session
 
 from websauna.compat import typing
 
@@ -18,10 +29,20 @@ from websauna.system.core import messages
 from websauna.system.form.csrf import add_csrf
 from websauna.system.form.fieldmapper import DefaultFieldMapper, EditMode
 from websauna.system.form.resourceregistry import ResourceRegistry
+from websauna.system.http.conditional import check_validators
+from websauna.system.http.conditional import make_etag
 
 from . import sqlalchemy, Resource
 from . import paginator
 from . import CRUD
+from .counter import Count
+from websauna.utils.slug import SlugDecodeError
+from websauna.utils.slug import slug_to_uuid
+from websauna.utils.slug import uuid_to_slug
+
+
+#: CSV cells starting with these are taken as formulas by spreadsheet applications
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
 
 
 class ResourceButton:
@@ -118,7 +139,22 @@ class Listing(CRUDView):
     #: How the result of this list should be split to pages
     paginator = paginator.DefaultPaginator()
 
-    resource_buttons = [TraverseLinkButton(id="add", name="Add", view_name="add", permission="add")]
+    #: Override the counting strategy of the CRUD for this listing. See :py:mod:`websauna.system.crud.counter`.
+    counter = None
+
+    resource_buttons = [
+        TraverseLinkButton(id="export", name="Export", view_name="export", permission="export", tooltip="Download all items as CSV."),
+        TraverseLinkButton(id="add", name="Add", view_name="add", permission="add"),
+    ]
+
+    #: Supported export formats as format name -> (content type, file extension, method name)
+    export_formats = {
+        "csv": ("text/csv", "csv", "export_csv"),
+        "jsonl": ("application/x-ndjson", "jsonl", "export_jsonl"),
+    }
+
+    #: How many rows the export fetches from the server-side cursor at a time
+    export_batch_size = 1000
 
     def __init__(self, context, request):
         """
@@ -141,25 +177,189 @@ class Listing(CRUDView):
         """
         return self.context.get_query()
 
-    def get_count(self, query:Query):
-        """Calculate total item count based on query."""
-        return query.count()
+    def filter_query(self, query:Query) -> Query:
+        """Filter the listing by query string parameters.
+
+        ``?related_<relationship>=<uuid slug>`` lists only items whose relationship refers to the given object, e.g. users of a group with ``?related_groups=...``. :py:class:`websauna.system.form.widgets.RelatedItemsWidget` links to the filtered listing.
+        """
+        model = self.get_model()
+        relationships = inspect(model).relationships
+
+        for key, value in self.request.params.items():
+
+            if not key.startswith("related_"):
+                continue
+
+            name = key[len("related_"):]
+            rel = relationships.get(name)
+            if rel is None or not hasattr(rel.mapper.class_, "uuid"):
+                raise HTTPBadRequest("Cannot filter by relationship: {}".format(name))
+
+            try:
+                uuid_ = slug_to_uuid(value)
+            except SlugDecodeError:
+                raise HTTPBadRequest("Bad id: {}".format(value))
+
+            attr = getattr(model, name)
+            criterion = rel.mapper.class_.uuid == uuid_
+            query = query.filter(attr.any(criterion) if rel.uselist else attr.has(criterion))
+
+        return query
+
+    def get_count(self, query:Query) -> Count:
+        """Calculate total item count based on query.
+
+        Uses ``counter`` of this view if set, otherwise the counter of the CRUD.
+        """
+        if self.counter:
+            return self.counter.count(query)
+        return self.get_crud().get_count(query)
 
     def order_query(self, query:Query):
         """Sort the query."""
         return query
 
+    def get_load_options(self) -> typing.List:
+        """Get SQLAlchemy loader options for the listing query.
+
+        By default let the table eager load relationships its columns show and load only columns it needs. Override this to return an empty list to turn off the optimization.
+        """
+        mapping_attribute = getattr(self.get_crud().mapper, "mapping_attribute", None)
+        required = [mapping_attribute] if mapping_attribute else []
+        return self.table.get_load_options(self.get_model(), required=required)
+
+    def get_row_renderer(self, columns:typing.List) -> typing.Callable:
+        """Get the compiled renderer for table body rows.
+
+        See :py:meth:`websauna.system.crud.listing.Table.get_row_renderer`.
+        """
+        env = self.request.registry.queryUtility(IJinja2Environment, name=".html")
+        return self.table.get_row_renderer(env, self.request, columns)
+
     def get_title(self) -> str:
         """Get the user-readable name of the listing view (breadcrumbs, etc.)"""
         return "All {}".format(self.get_crud().plural_name)
 
     def paginate(self, query, template_context):
-        """Create template variables for paginatoin results."""
-        total_items =  self.get_count(query)
+        """Create template variables for pagination results.
+
+        Only the items on the current page are loaded from the database. They are available as ``batch`` template variable.
+        """
+        total_items = self.get_count(query)
         batch = self.paginator.paginate(query, self.request, total_items)
         template_context["batch"] = batch
         template_context["count"] = total_items
 
+    def get_export_columns(self) -> typing.List:
+        """Get table columns which appear in the export."""
+        return [c for c in self.table.get_columns() if c.exportable]
+
+    def get_export_load_options(self) -> typing.List:
+        """Get SQLAlchemy loader options for the export query.
+
+        Like :py:meth:`get_load_options`, but for the export columns. Many-to-one relationships are joined and only the needed columns are loaded. Collections are left lazy, because they cannot be eager loaded with ``yield_per()``.
+        """
+        mapping_attribute = getattr(self.get_crud().mapper, "mapping_attribute", None)
+        required = [mapping_attribute] if mapping_attribute else []
+        return self.table.get_load_options(self.get_model(), required=required, columns=self.get_export_columns(), collections=False)
+
+    def get_csv_value(self, column, obj) -> object:
+        """Get the value of a CSV cell.
+
+        Text starting with a character that spreadsheet applications read as a formula is prefixed with ``'``, so that user entered data is not executed when the export is opened.
+        """
+        value = column.get_value(obj)
+        if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+            return "'" + value
+        return value
+
+    def get_export_session(self, dbsession:Session) -> Session:
+        """Create a session for reading the export rows.
+
+        The response body is streamed after the view returns and the request transaction has been committed. Thus, rows are read with a separate session which is closed when the streaming ends.
+        """
+        return Session(bind=dbsession.get_bind())
+
+    def iter_export_objects(self, query:Query) -> typing.Iterable:
+        """Iterate over all objects of the query using a server-side cursor.
+
+        Only ``export_batch_size`` rows are held in memory at a time.
+        """
+        session = self.get_export_session(query.session)
+        try:
+            query = query.with_session(session).execution_options(stream_results=True).yield_per(self.export_batch_size)
+            for obj in query:
+                yield obj
+        finally:
+            session.close()
+
+    def export_csv(self, query:Query) -> typing.Iterable[bytes]:
+        """Stream the listing as CSV, one chunk per database batch."""
+        columns = self.get_export_columns()
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+
+        def flush():
+            data = buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+            return data
+
+        writer.writerow([c.name or c.id for c in columns])
+        yield flush()
+
+        for i, obj in enumerate(self.iter_export_objects(query), 1):
+            writer.writerow([self.get_csv_value(c, obj) for c in columns])
+            if i % self.export_batch_size == 0:
+                yield flush()
+
+        yield flush()
+
+    def export_jsonl(self, query:Query) -> typing.Iterable[bytes]:
+        """Stream the listing as JSON lines, one object per line keyed by column ids. Missing values are written as ``null``."""
+        columns = self.get_export_columns()
+
+        def default(value):
+            if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+                return value.isoformat()
+            return str(value)
+
+        lines = []
+        for obj in self.iter_export_objects(query):
+            lines.append(json.dumps({c.id: c.get_raw_value(obj) for c in columns}, default=default))
+            if len(lines) >= self.export_batch_size:
+                yield ("\n".join(lines) + "\n").encode("utf-8")
+                lines = []
+
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+    @view_config(context=sqlalchemy.CRUD, name="export", permission='export')
+    def export(self):
+        """Download all items of the listing as CSV (default) or JSON lines (``?format=jsonl``).
+
+        Requires ``export`` permission, which the admin grants to ``group:admin``. Other CRUDs must grant it explicitly in their ``__acl__``.
+
+        The response is streamed. Memory usage does not depend on the number of rows and the first bytes go out before the whole table is read.
+        """
+        format = self.request.params.get("format", "csv")
+        if format not in self.export_formats:
+            raise HTTPBadRequest("Unknown export format: {}".format(format))
+
+        content_type, extension, method = self.export_formats[format]
+
+        query = self.get_query()
+        query = self.filter_query(query)
+        query = self.order_query(query)
+        query = query.options(*self.get_export_load_options())
+
+        filename = "{}.{}".format(self.context.__name__ or "export", extension)
+
+        response = Response(content_type=content_type, charset="utf-8")
+        response.content_disposition = 'attachment; filename="{}"'.format(filename)
+        response.app_iter = getattr(self, method)(query)
+        return response
+
     @view_config(context=sqlalchemy.CRUD, name="listing", renderer="crud/listing.html", permission='view')
     def listing(self):
         """View for listing model contents in CRUD."""
@@ -179,24 +379,86 @@ class Listing(CRUDView):
                 raise RuntimeError("header_template missing for column: {}".format(c))
 
         query = self.get_query()
+        query = self.filter_query(query)
         query = self.order_query(query)
+        query = query.options(*self.get_load_options())
         base_template = self.base_template
 
         # This is to support breadcrums with titled views
         current_view_name = title = self.get_title()
 
         title = self.context.title
-        count =  self.get_count(query)
+
         # Base listing template variables
-        template_vars = dict(title=title, columns=columns, base_template=base_template, query=query, crud=crud, current_view_name=current_view_name, resource_buttons=self.get_resource_buttons(), count=count)
+        template_vars = dict(title=title, columns=columns, base_template=base_template, query=query, crud=crud, current_view_name=current_view_name, resource_buttons=self.get_resource_buttons(), paginator=self.paginator, render_row=self.get_row_renderer(columns))
 
-        # Include pagination template context
-        # self.paginate(query, template_vars)
+        # Include pagination template context: batch and count
+        self.paginate(query, template_vars)
 
         return template_vars
 
 
 
+class Autocomplete(CRUDView):
+    """JSON search endpoint for choosing items of this CRUD in relationship widgets.
+
+    See :py:class:`websauna.system.form.widgets.RelationshipAutocompleteWidget`. The search is a case insensitive prefix match. On large tables back it with an index, e.g. ``CREATE INDEX ix_user_email_lower ON users (lower(email) text_pattern_ops)``.
+
+    The response is ``{"results": [{"id": uuid slug, "text": label}], "more": bool}``. Pass ``page`` parameter to get more results.
+
+    The search column is set explicitly with ``search_column`` of the CRUD. Without it the endpoint answers 404, so that it cannot be used to probe values of arbitrary columns.
+    """
+
+    #: How many items are returned at once
+    page_size = 20
+
+    def __init__(self, context, request):
+        self.context = context
+        self.request = request
+
+    def get_search_column(self):
+        """Get the column we are matching.
+
+        :raise HTTPNotFound: If the CRUD does not define ``search_column``
+        """
+        name = self.context.search_column
+        if not name:
+            raise HTTPNotFound("{} does not have search_column".format(self.context))
+        return getattr(self.context.get_model(), name)
+
+    def filter_query(self, query:Query, search:str) -> Query:
+        """Filter items by the search text."""
+        column = self.get_search_column()
+        search = search.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return query.filter(func.lower(column).like(search + "%", escape="\\")).order_by(func.lower(column))
+
+    def get_label(self, obj) -> str:
+        """Get the text shown for a search result, by default the value of the search column."""
+        value = getattr(obj, self.context.search_column)
+        return "" if value is None else str(value)
+
+    def get_id(self, obj) -> str:
+        return uuid_to_slug(obj.uuid)
+
+    @view_config(context=sqlalchemy.CRUD, name="autocomplete", renderer="json", permission='view')
+    def autocomplete(self):
+        search = self.request.params.get("q", "")
+
+        try:
+            page = max(int(self.request.params.get("page", 1)), 1)
+        except ValueError:
+            raise HTTPBadRequest("Bad page")
+
+        query = self.filter_query(self.context.get_query(), search)
+
+        # Fetch one extra to tell if there are more results
+        items = query.offset((page - 1) * self.page_size).limit(self.page_size + 1).all()
+
+        results = [dict(id=self.get_id(obj), text=self.get_label(obj)) for obj in items[:self.page_size]]
+        return dict(results=results, more=len(items) > self.page_size)
+
+
+
 class FormView(CRUDView):
     """A base class for views which utilize ColanderAlchemy to view/edit SQLAlchemy model instances."""
 
@@ -209,6 +471,12 @@ class FormView(CRUDView):
     #: Field mapper defines how form fields are generated from the SQLAlchemy model. For more information see py:mod:`websauna.system.crud.field`.
     field_mapper = DefaultFieldMapper()
 
+    #: Generate the schema once per view class, model and edit mode and give a copy of it to each request. Only turn on if the output of ``field_mapper`` does not depend on the request or the context: the shared schema is mapped with ``None`` request and context. Request dependent parts, like vocabularies, can be made ``colander.deferred``. :py:class:`websauna.system.form.fieldmapper.DefaultFieldMapper` can be cached. Admin views turn this on. Views overriding :py:meth:`create_schema` are never cached.
+    cache_schema = False
+
+    #: Prototype schemas by (view class, model, edit mode, includes). Only class level ``includes`` are cached, so the size is bounded by the number of view classes.
+    _schema_prototypes = {}
+
     def __init__(self, context:Resource, request:Request):
         """
         :param context: Instance of ``traverse.Resource()`` or its subclasses
@@ -235,13 +503,13 @@ class FormView(CRUDView):
 
         :param nested: Recurse to SQLAlchemy relationships and try to build widgets and subforms for them. TODO: This is likely to go away.
         """
-        model = self.get_model()
-        includes = self.includes
-
-        schema = self.field_mapper.map(mode, self.request, self.context, model, includes, nested=nested)
+        schema = self.get_schema_prototype(mode, nested)
 
-        # Make sure we have CSRF token
-        add_csrf(schema)
+        if schema is None:
+            schema = self.create_schema(mode, nested)
+        else:
+            # customize_schema() modifies the schema in place
+            schema = schema.clone()
 
         self.customize_schema(schema)
 
@@ -251,6 +519,45 @@ class FormView(CRUDView):
         form = deform.Form(schema, buttons=buttons, resource_registry=ResourceRegistry(self.request))
         return form
 
+    def create_schema(self, mode:EditMode, nested=None) -> colander.Schema:
+        """Map the model to a Colander schema using ``field_mapper``."""
+        schema = self.field_mapper.map(mode, self.request, self.context, self.get_model(), self.includes, nested=nested)
+
+        # Make sure we have CSRF token
+        add_csrf(schema)
+
+        return schema
+
+    def get_schema_prototype(self, mode:EditMode, nested=None) -> typing.Optional[colander.Schema]:
+        """Get the cached schema for this view, creating it on the first call.
+
+        The returned schema is shared between requests and must not be modified.
+
+        :return: Schema or None if ``cache_schema`` is off, ``includes`` is not set on the class level or ``create_schema()`` is overridden
+        """
+        includes = self.includes
+        if not self.cache_schema or includes is not getattr(type(self), "includes", None):
+            return None
+
+        if type(self).create_schema is not FormView.create_schema:
+            return None
+
+        # includes may contain SchemaNode instances
+        key = (type(self), self.get_model(), mode, nested, tuple(i if isinstance(i, str) else id(i) for i in includes))
+        schema = self._schema_prototypes.get(key)
+        if schema is None:
+            schema = self._schema_prototypes[key] = self.create_schema_prototype(mode, nested)
+        return schema
+
+    def create_schema_prototype(self, mode:EditMode, nested=None) -> colander.Schema:
+        """Map the model to a Colander schema shared by all requests.
+
+        The field mapper is given no request or context, so that the shared schema does not keep the first request, its database session and objects alive.
+        """
+        schema = self.field_mapper.map(mode, None, None, self.get_model(), self.includes, nested=nested)
+        add_csrf(schema)
+        return schema
+
     @abstractmethod
     def get_form(self):
         """Create the form object for a view.
@@ -303,16 +610,41 @@ class Show(FormView):
 
     resource_buttons = [TraverseLinkButton(id="edit", name="Edit", view_name="edit")]
 
+    #: Answer conditional GET requests with ``304 Not Modified`` based on :py:meth:`get_validators`. Turned off by default, because changes in related items shown on the page do not change the modification time of the object.
+    conditional_get = False
+
     def get_title(self):
         return "#{}".format(self.get_object().id)
 
     def get_form(self):
         return self.create_form(EditMode.show, buttons=())
 
+    def get_validators(self) -> typing.Tuple[typing.Optional[str], typing.Optional[datetime.datetime]]:
+        """Get ETag and Last-Modified of the page.
+
+        The default implementation uses ``updated_at``, or ``created_at`` for never modified objects, like in :py:class:`websauna.system.user.usermixin.UserMixin`. The ETag includes the current user, as the page shows actions allowed for the user.
+
+        :return: Tuple (etag, last modified). (None, None) if the object does not have a modification time.
+        """
+        obj = self.get_object()
+        modified = getattr(obj, "updated_at", None) or getattr(obj, "created_at", None)
+        if modified is None:
+            return None, None
+
+        user = self.request.user
+        etag = make_etag(obj.__class__.__name__, self.context.__name__, modified.isoformat(), user and user.id)
+        return etag, modified
+
     @view_config(context=sqlalchemy.Resource, name="show", renderer="crud/show.html", permission='view')
     def show(self):
         """View for showing an individual object."""
 
+        if self.conditional_get:
+            etag, last_modified = self.get_validators()
+            not_modified = check_validators(self.request, etag, last_modified, vary=("Cookie",))
+            if not_modified:
+                return not_modified
+
         obj = self.context.get_object()
         base_template = self.base_template
 
@@ -0,0 +1,43 @@
+"""ws-compile-templates script.
+
+Compile all Jinja 2 and Deform Chameleon templates to the on-disk template cache, see :py:mod:`websauna.system.core.templatecache`.
+"""
+import os
+import sys
+
+from websauna.system.core.templatecache import compile_chameleon_templates
+from websauna.system.core.templatecache import compile_jinja2_templates
+from websauna.system.core.templatecache import get_cache_directory
+from websauna.system.devop.cmdline import init_websauna
+
+
+def usage(argv):
+    cmd = os.path.basename(argv[0])
+    print('usage: %s <config_uri>\n'
+          '(example: "%s production.ini")' % (cmd, cmd))
+    sys.exit(1)
+
+
+def main(argv=sys.argv):
+
+    if len(argv) < 2:
+        usage(argv)
+
+    config_uri = argv[1]
+    request = init_websauna(config_uri)
+
+    directory = get_cache_directory(request.registry.settings)
+    if not directory:
+        sys.exit("websauna.template_cache is not set in {}".format(config_uri))
+
+    compiled, failed = compile_jinja2_templates(request.registry)
+    print("Compiled {} Jinja 2 templates, {} failed".format(compiled, failed))
+
+    compiled, failed = compile_chameleon_templates()
+    print("Compiled {} Chameleon templates, {} failed".format(compiled, failed))
+
+    print("Template cache: {}".format(directory))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,7 @@ import logging
 import itertools
 import colander
 from colanderalchemy.schema import SQLAlchemySchemaNode, _creation_order
-from websauna.system.form.sqlalchemy import ModelSetResultList, ModelSet, ModelSchemaType
+from websauna.system.form.sqlalchemy import ModelSetResultList, ModelSet, ModelSchemaType, RelatedItems, LazyRelatedItems
 from websauna.utils.jsonb import JSONBProperty
 
 import colander
@@ -93,6 +93,10 @@ class PropertyAwareSQLAlchemySchemaNode(SQLAlchemySchemaNode):
         self.relationship_overrides = relationship_overrides
         self.nested = nested
         self.automatic_relationships = automatic_relationships
+
+        # dictify() and objectify() plans, shared with clones
+        self._plans = {}
+
         self.add_nodes(self.includes, self.excludes, self.overrides, nested)
 
     def add_nodes(self, includes, excludes, overrides, nested):
@@ -142,74 +146,137 @@ class PropertyAwareSQLAlchemySchemaNode(SQLAlchemySchemaNode):
             if node is not None:
                 self.add(node)
 
-    def dictify(self, obj):
-        """Extended to handle JSON properties."""
+    def get_dictify_plan(self, cls:type) -> list:
+        """Resolve how to read each child node from an object of a class.
 
-        dict_ = {}
-        for node in self:
+        The plan is computed once per object class and set of child nodes, and shared with the clones of this schema. Each entry is ``(kind, none_value)`` where kind is one of
+
+        * ``"value"`` - column, JSONB property or relationship which node handles full objects: read the attribute as is
+
+        * ``"list"`` - to-many relationship: dictify each item with the child schema
+
+        * ``"object"`` - to-one relationship: dictify the object with the child schema
+
+        * ``"related"`` - read-only to-many relationship: pass :py:class:`websauna.system.form.sqlalchemy.LazyRelatedItems` without loading the collection
+
+        * ``None`` - the node is not part of the SQLAlchemy model
+
+        ``none_value`` is what ``None`` attribute value is presented in appstruct.
+        """
 
+        signature = ("dictify", cls, tuple((node.name, type(node.typ)) for node in self.children))
+        plans = self._plans
+        plan = plans.get(signature)
+        if plan is not None:
+            return plan
+
+        column_attrs = self.inspector.column_attrs
+        relationships = self.inspector.relationships
+
+        plan = []
+        for node in self.children:
             name = node.name
+
             try:
-                if JSONBProperty.is_json_property(obj, name):
-                    value = getattr(obj, name)
+                is_json = JSONBProperty.is_json_property(cls, name)
+            except AttributeError:
+                is_json = False
+
+            if is_json or name in column_attrs:
+                kind = "value"
+            elif name in relationships:
+                # Classic colanderalchemy
+                if isinstance(node.typ, RelatedItems):
+                    kind = "related"
+                elif isinstance(node.typ, ModelSchemaType):
+                    # We know this node is good to pass through as is, don't try to dictify subitems
+                    kind = "value"
+                elif relationships[name].uselist:
+                    kind = "list"
                 else:
-                    getattr(self.inspector.column_attrs, name)
-                    value = getattr(obj, name)
+                    kind = "object"
+            else:
+                # The given node isn't part of the SQLAlchemy model
+                msg = 'SQLAlchemySchemaNode.dictify: %s not found on %s'
+                logger.debug(msg, name, self)
+                kind = None
+
+            plan.append((kind, self.get_none_value(node)))
+
+        plans[signature] = plan
+        return plan
+
+    def get_none_value(self, node:colander.SchemaNode):
+        """How ``None`` attribute value is presented in appstruct for a node."""
+
+        # SQLAlchemy mostly converts values into Python types
+        #  appropriate for appstructs, but not always.  The biggest
+        #  problems are around `None` values so we're dealing with
+        #  those here.  All types should accept `colander.null` so
+        #  we mostly change `None` into that.
+
+        if isinstance(node.typ, colander.String):
+            # colander has an issue with `None` on a String type
+            #  where it translates it into "None".  Let's check
+            #  for that specific case and turn it into a
+            #  `colander.null`.
+            return colander.null
+
+        # A specific case this helps is with Integer where
+        #  `None` is an invalid value.  We call serialize()
+        #  to test if we have a value that will work later
+        #  for serialization and then allow it if it doesn't
+        #  raise an exception.  Hopefully this also catches
+        #  issues with user defined types and future issues.
+        try:
+            node.serialize(None)
+        except:
+            return colander.null
+        else:
+            return None
 
-            except AttributeError:
+    def dictify(self, obj):
+        """Extended to handle JSON properties."""
 
+        dict_ = {}
+        plan = self.get_dictify_plan(obj.__class__)
 
-                try:
-                    # Classic colanderalchemy
-                    prop = getattr(self.inspector.relationships, name)
+        for node, (kind, none_value) in zip(self.children, plan):
 
-                    # We know this node is good to pass through as is, don't try to dictify subitems
-                    if isinstance(node.typ, ModelSchemaType):
-                        value = getattr(obj, name)
+            if kind is None:
+                continue
 
-                    elif prop.uselist:
-                        value = [self[name].children[0].dictify(o)
-                                 for o in getattr(obj, name)]
-                    else:
-                        o = getattr(obj, name)
-                        value = None if o is None else self[name].dictify(o)
-                except AttributeError:
-                    # The given node isn't part of the SQLAlchemy model
-                    msg = 'SQLAlchemySchemaNode.dictify: %s not found on %s'
-                    logger.debug(msg, name, self)
-                    continue
+            name = node.name
 
-            # SQLAlchemy mostly converts values into Python types
-            #  appropriate for appstructs, but not always.  The biggest
-            #  problems are around `None` values so we're dealing with
-            #  those here.  All types should accept `colander.null` so
-            #  we mostly change `None` into that.
-
-            if value is None:
-                if isinstance(node.typ, colander.String):
-                    # colander has an issue with `None` on a String type
-                    #  where it translates it into "None".  Let's check
-                    #  for that specific case and turn it into a
-                    #  `colander.null`.
-                    dict_[name] = colander.null
-                else:
-                    # A specific case this helps is with Integer where
-                    #  `None` is an invalid value.  We call serialize()
-                    #  to test if we have a value that will work later
-                    #  for serialization and then allow it if it doesn't
-                    #  raise an exception.  Hopefully this also catches
-                    #  issues with user defined types and future issues.
-                    try:
-                        node.serialize(value)
-                    except:
-                        dict_[name] = colander.null
-                    else:
-                        dict_[name] = value
-            else:
-                dict_[name] = value
+            if kind == "related":
+                dict_[name] = LazyRelatedItems(obj, name)
+                continue
+
+            try:
+                value = getattr(obj, name)
+            except AttributeError:
+                # E.g. JSONBProperty without data
+                continue
+
+            if kind == "list":
+                value = [node.children[0].dictify(o) for o in value]
+            elif kind == "object":
+                value = None if value is None else node.dictify(value)
+
+            dict_[name] = none_value if value is None else value
 
         return dict_
 
+    def get_objectify_plan(self) -> dict:
+        """Map attribute names to mapped properties of the model, computed once per schema.
+
+        :return: Dict of name -> (property, is relationship)
+        """
+        plan = self._plans.get("objectify")
+        if plan is None:
+            plan = self._plans["objectify"] = {prop.key: (prop, hasattr(prop, 'mapper')) for prop in self.inspector.attrs}
+        return plan
+
     def objectify(self, dict_, context=None):
         """Extended to handle JSON properties."""
 
@@ -220,12 +287,13 @@ class PropertyAwareSQLAlchemySchemaNode(SQLAlchemySchemaNode):
         if sqlalchemy.inspect(dict_, raiseerr=False) is not None:
             return dict_
 
+        plan = self.get_objectify_plan()
+
         for attr in dict_:
-            if mapper.has_property(attr):
-                prop = mapper.get_property(attr)
+            if attr in plan:
+                prop, is_relationship = plan[attr]
 
-                if hasattr(prop, 'mapper'):
-                    cls = prop.mapper.class_
+                if is_relationship:
                     value = dict_[attr]
 
                     if prop.uselist:
@@ -618,16 +686,11 @@ class PropertyAwareSQLAlchemySchemaNode(SQLAlchemySchemaNode):
         return node
 
     def clone(self):
-        cloned = self.__class__(self.class_,
-                                self.includes,
-                                self.excludes,
-                                self.overrides,
-                                self.unknown,
-                                self.nested,
-                                self.type_overrides,
-                                self.relationship_overrides,
-                                self.automatic_relationships,
-                                **self.kwargs)
+        """Copy the schema tree without introspecting the model again.
+
+        ColanderAlchemy's ``clone()`` reconstructs the node from the model. ``bind()`` clones, so that would run the whole mapping again for every bound form.
+        """
+        cloned = object.__new__(self.__class__)
         cloned.__dict__.update(self.__dict__)
         cloned.children = [node.clone() for node in self.children]
         return cloned
@@ -14,11 +14,15 @@ from sqlalchemy.dialects.postgresql import UUID as PostgreSQLUUID, JSONB, INET
 from sqlalchemy.orm import RelationshipProperty, Mapper
 from sqlalchemy.sql.type_api import TypeEngine
 from websauna.system.crud import Resource
+from websauna.system.crud.counter import CappedCounter
 from websauna.system.form.colander import PropertyAwareSQLAlchemySchemaNode, TypeOverridesHandling
-from websauna.system.form.sqlalchemy import get_uuid_vocabulary_for_model, UUIDModelSet, UUIDForeignKeyValue
+from websauna.system.form.sqlalchemy import get_uuid_vocabulary_for_model, RelatedItems, UUIDForeignKeyValue
 from websauna.system.form.widgets import FriendlyUUIDWidget
+from websauna.system.form.widgets import RelationshipAutocompleteWidget
+from websauna.system.form.widgets import RelatedItemsWidget
 from websauna.system.http import Request
 
+from websauna.compat.typing import Callable
 from websauna.compat.typing import List
 from websauna.compat.typing import Tuple
 from websauna.compat.typing import Optional
@@ -73,6 +77,9 @@ class DefaultFieldMapper(ColumnToFieldMapper):
     See :py:class:`colanderalchemy.schema.SQLAlchemySchemaNode` for more information.
     """
 
+    #: Override ``websauna.autocomplete_threshold`` setting, see :py:meth:`get_autocomplete_threshold`
+    autocomplete_threshold = None
+
     def map_standard_relationship(self, mode, request, node, model, name, rel) -> colander.SchemaNode:
         """Build a widget for choosing a relationship with target.
 
@@ -87,7 +94,6 @@ class DefaultFieldMapper(ColumnToFieldMapper):
 
         # For now, we automatically deal with this only if the model provides uuid
         if hasattr(remote_model, "uuid"):
-            dbsession = request.dbsession
             # TODO: We probably need a mechanism for system wide empty default label
 
             required = not column.nullable
@@ -102,18 +108,89 @@ class DefaultFieldMapper(ColumnToFieldMapper):
             else:
                 missing = None
 
-            vocabulary = get_uuid_vocabulary_for_model(dbsession, remote_model, default_choice=default_choice)
+            # Vocabulary is read from the database when the schema is bound to a request, so that the schema itself can be cached
+            def vocabulary(node, kw):
+                return get_uuid_vocabulary_for_model(kw["request"].dbsession, remote_model, default_choice=default_choice)
 
             if rel.uselist:
-                # Show out all relationships
+                # Show the count and the first related items, the collection itself is not loaded
                 if mode == EditMode.show:
-                    return colander.SchemaNode(UUIDModelSet(remote_model), name=name, missing=missing, widget=deform.widget.CheckboxChoiceWidget(values=vocabulary))
+                    return colander.SchemaNode(RelatedItems(remote_model), name=name, missing=colander.drop, widget=RelatedItemsWidget())
             else:
                 # Select from a single relationship
-                return colander.SchemaNode(UUIDForeignKeyValue(remote_model), name=name, missing=missing, widget=deform.widget.SelectWidget(values=vocabulary))
+                @colander.deferred
+                def widget(node, kw):
+                    return self.get_relationship_widget(kw["request"], remote_model, lambda: vocabulary(node, kw))
+
+                return colander.SchemaNode(UUIDForeignKeyValue(remote_model), name=name, missing=missing, widget=widget)
 
         return TypeOverridesHandling.drop
 
+    def get_relationship_widget(self, request:Request, model:type, vocabulary:Callable) -> deform.widget.Widget:
+        """Choose the widget for picking the target of a single relationship.
+
+        Big tables get :py:class:`websauna.system.form.widgets.RelationshipAutocompleteWidget` if their model admin sets ``search_column``. Otherwise all rows are listed in a select widget.
+
+        :param vocabulary: Callable returning the select widget values
+        """
+        if self.is_large_model(request, model):
+            model_admin = self.get_autocomplete_model_admin(request, model)
+            url = self.get_autocomplete_url(request, model) if model_admin is not None else None
+            if url:
+                return RelationshipAutocompleteWidget(url=url, model=model, label_column=model_admin.search_column)
+            self.warn_select_all(model)
+        return deform.widget.SelectWidget(values=vocabulary())
+
+    def warn_select_all(self, model:type):
+        """Tell, once per model, that a big table is loaded to a select widget as nobody can search it."""
+        warned = self.__dict__.setdefault("_select_all_warned", set())
+        if model in warned:
+            return
+        warned.add(model)
+        logger.warning("%s has more rows than the autocomplete threshold, but no model admin with search_column. Relationship widgets load all of its rows.", model.__name__)
+
+    def get_autocomplete_threshold(self, request:Request) -> int:
+        """Related tables with more rows than this get a search widget instead of a select listing all rows.
+
+        Read from ``websauna.autocomplete_threshold`` setting, 100 by default.
+        """
+        if self.autocomplete_threshold is not None:
+            return self.autocomplete_threshold
+        return int(request.registry.settings.get("websauna.autocomplete_threshold", 100))
+
+    def is_large_model(self, request:Request, model:type) -> bool:
+        """Are there too many rows in the model table to list them all in a select widget."""
+        threshold = self.get_autocomplete_threshold(request)
+        return CappedCounter(limit=threshold).count(request.dbsession.query(model)).capped
+
+    def get_autocomplete_model_admin(self, request:Request, model:type):
+        """Get the model admin which searches items of a model.
+
+        :return: Model admin or None if the model does not have a model admin or the model admin does not set ``search_column``
+        """
+        model_admin_id = getattr(request.registry, "model_admin_ids_by_model", {}).get(model)
+        if not model_admin_id:
+            return None
+
+        model_admin = request.admin["models"][model_admin_id]
+        if not model_admin.search_column:
+            return None
+
+        return model_admin
+
+    def get_autocomplete_url(self, request:Request, model:type) -> Optional[str]:
+        """Get the JSON search endpoint for choosing items of a model.
+
+        By default use :py:class:`websauna.system.crud.views.Autocomplete` of the model admin.
+
+        :return: URL or None if no search endpoint is available
+        """
+        model_admin = self.get_autocomplete_model_admin(request, model)
+        if model_admin is None:
+            return None
+
+        return request.resource_url(model_admin, "autocomplete")
+
     def map_relationship(self, mode: EditMode, request: Request, node: colander.SchemaNode, model: type, name: str, rel: RelationshipProperty, mapper: Mapper):
 
         # Ok this is something we can handle, a single reference to another
@@ -75,43 +75,65 @@ More info
 """
 
 import time
+
+from websauna.compat.typing import Iterable
+from websauna.compat.typing import List
+from websauna.compat.typing import Tuple
 from websauna.system.core.redis import get_redis
 
 
-def _check(redis, key, window=60, limit=50):
+#: Trim expired hits, add a hit, count and set expiration in one round trip.
+#: KEYS[1] is the counter key. ARGV is the current time, window in seconds and limit. Returns the hit count including this hit.
+CHECK_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+
+-- Hits at the same timestamp need unique members
+local count = redis.call('ZCARD', key)
+redis.call('ZADD', key, now, ARGV[1] .. ':' .. count)
+redis.call('EXPIRE', key, math.ceil(window))
+
+return count + 1
+"""
+
 
-    # Expire old keys (hits)
-    expires = time.time() - window
-    redis.zremrangebyscore(key, '-inf', expires)
+def _get_script(redis):
+    """Get registered check script for a Redis client."""
+    script = getattr(redis, "_rolling_window_script", None)
+    if script is None:
+        script = redis._rolling_window_script = redis.register_script(CHECK_SCRIPT)
+    return script
 
-    # Add a hit on the very moment
-    now = time.time()
-    redis.zadd(key, now, now)
+
+def _check(redis, key, window=60, limit=50):
+    hits = _get_script(redis)(keys=[key], args=[repr(time.time()), window])
 
     # If we currently have more keys than limit,
     # then limit the action
-    if redis.zcard(key) > limit:
-        return True
-
-    return False
+    return hits > limit
 
 
-def _get(redis, key):
+def _get(redis, key, window=60):
     """ Get the current hits per rolling time window.
 
     :param redis: Redis client
 
     :param key: Redis key name we use to keep counter
 
+    :param window: Rolling time window in seconds
+
     :return: int, how many hits we have within the current rolling time window
     """
-    return redis.zcard(key)
+    return redis.zcount(key, "({}".format(time.time() - window), "+inf")
 
 
 def check(registry, key, window=60, limit=10):
     """Do a rolling time window counter hit.
 
-    Use ``key`` to store the current hit rate in Redis.
+    Use ``key`` to store the current hit rate in Redis. The key expires when there have been no hits within the window.
 
     :param registry: Pyramid registry e.g. request.registry
     :param key: Redis key name we use to keep counter
@@ -124,17 +146,43 @@ def check(registry, key, window=60, limit=10):
     return _check(redis, key, window, limit)
 
 
-def get(registry, key):
-    """Get the current hits per rolling time window.
+def check_many(registry, limiters:Iterable[Tuple[str, int, int]]) -> List[bool]:
+    """Do hits on several rolling time window counters in one round trip.
+
+    Useful when the same action is limited e.g. per IP, per user and globally::
 
-     Use ``key`` to store the current hit rate in Redis.
+        ip_limited, user_limited, global_limited = rollingwindow.check_many(request.registry, [
+            ("login_ip_" + request.client_addr, 3600, 50),
+            ("login_user_" + email, 3600, 10),
+            ("login", 60, 500),
+        ])
 
     :param registry: Pyramid registry e.g. request.registry
-    :param key: Redis key name we use to keep counter
-    :return: int, how many hits we have within the current rolling time window
+    :param limiters: List of (key, window, limit) tuples, see :py:func:`check`
+    :return: List of booleans, True if the limit of the corresponding counter has been reached
     """
+    limiters = list(limiters)
     redis = get_redis(registry)
-    return _check(redis, key)
+    script = _get_script(redis)
+    now = repr(time.time())
+
+    pipe = redis.pipeline(transaction=False)
+    for key, window, limit in limiters:
+        script(keys=[key], args=[now, window], client=pipe)
 
+    hits = pipe.execute()
+    return [count > limit for count, (key, window, limit) in zip(hits, limiters)]
+
+
+def get(registry, key, window=60):
+    """Get the current hits per rolling time window.
 
+     Use ``key`` to store the current hit rate in Redis. This does not record a hit.
 
+    :param registry: Pyramid registry e.g. request.registry
+    :param key: Redis key name we use to keep counter
+    :param window: Rolling time window in seconds. Default 60 seconds.
+    :return: int, how many hits we have within the current rolling time window
+    """
+    redis = get_redis(registry)
+    return _get(redis, key, window)
@@ -0,0 +1,149 @@
+"""Sliding window counter and rate limit using Redis.
+
+A memory bounded alternative for :py:mod:`websauna.system.form.rollingwindow`. The rolling window stores every hit as a sorted set member, so a flood against a throttle with a large limit and a long window consumes a lot of Redis memory. The sliding window counter divides the window to fixed sub-buckets and stores only a hit count per bucket in a Redis hash. Memory use per key is bounded by the number of buckets.
+
+The count is approximated: the hits of the oldest bucket, which is only partially inside the window, are weighted by the overlapping fraction. With evenly spread hits the error is small. The worst case error is the number of hits in one bucket, so use more buckets for better accuracy.
+
+The API is the same as in :py:mod:`websauna.system.form.rollingwindow`. To use this with :py:func:`websauna.system.form.throttle.create_throttle_validator`::
+
+    from websauna.system.form import slidingwindow
+
+    validator = create_throttle_validator("email_login", 5000, counter=slidingwindow)
+"""
+
+import time
+
+from websauna.compat.typing import Iterable
+from websauna.compat.typing import List
+from websauna.compat.typing import Tuple
+from websauna.system.core.redis import get_redis
+
+
+#: How many sub-buckets the window is divided to
+DEFAULT_BUCKETS = 60
+
+
+#: Redis key prefix used by :py:func:`websauna.system.form.throttle.create_throttle_validator`. Different from the rolling window keys, which are sorted sets, so that a throttle can be switched between counters.
+THROTTLE_KEY_PREFIX = "throttle_sw_"
+
+
+#: Count a hit in the current bucket, drop expired buckets and sum the window.
+#: KEYS[1] is the counter key. ARGV is the current time, window in seconds, bucket size in seconds and hit increment. Returns the approximated hit count.
+CHECK_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local size = tonumber(ARGV[3])
+local increment = tonumber(ARGV[4])
+
+local start = now - window
+local oldest = math.floor(start / size)
+
+if increment > 0 then
+    redis.call('HINCRBY', key, math.floor(now / size), increment)
+    redis.call('EXPIRE', key, math.ceil(window + size))
+end
+
+local total = 0
+local data = redis.call('HGETALL', key)
+for i = 1, #data, 2 do
+    local bucket = tonumber(data[i])
+    local count = tonumber(data[i + 1])
+    if bucket < oldest then
+        if increment > 0 then
+            redis.call('HDEL', key, data[i])
+        end
+    elseif bucket == oldest then
+        -- Only part of the oldest bucket is inside the window
+        total = total + count * ((oldest + 1) * size - start) / size
+    else
+        total = total + count
+    end
+end
+
+return math.floor(total + 0.5)
+"""
+
+
+def _get_script(redis):
+    """Get registered check script for a Redis client."""
+    script = getattr(redis, "_sliding_window_script", None)
+    if script is None:
+        script = redis._sliding_window_script = redis.register_script(CHECK_SCRIPT)
+    return script
+
+
+def _get_args(window, buckets, increment, now=None):
+    now = time.time() if now is None else now
+    return [repr(now), window, repr(window / buckets), increment]
+
+
+def _check(redis, key, window=60, limit=50, buckets=DEFAULT_BUCKETS, now=None):
+    hits = _get_script(redis)(keys=[key], args=_get_args(window, buckets, 1, now))
+    return hits > limit
+
+
+def _get(redis, key, window=60, buckets=DEFAULT_BUCKETS, now=None):
+    """ Get the current approximated hits per sliding time window.
+
+    :param redis: Redis client
+
+    :param key: Redis key name we use to keep counter
+
+    :return: int, how many hits we have within the current sliding time window
+    """
+    return _get_script(redis)(keys=[key], args=_get_args(window, buckets, 0, now))
+
+
+def check(registry, key, window=60, limit=10, buckets=DEFAULT_BUCKETS):
+    """Do a sliding time window counter hit.
+
+    Use ``key`` to store the current hit rate in Redis. The key expires when there have been no hits within the window.
+
+    :param registry: Pyramid registry e.g. request.registry
+    :param key: Redis key name we use to keep counter
+    :param window: Sliding time window in seconds. Default 60 seconds.
+    :param limit: Allowed operations per time window. Default 10 hits.
+    :param buckets: How many sub-buckets the window is divided to
+
+    :return: True is the maximum limit has been reached for the current time window
+    """
+    redis = get_redis(registry)
+    return _check(redis, key, window, limit, buckets)
+
+
+def check_many(registry, limiters:Iterable[Tuple[str, int, int]], buckets=DEFAULT_BUCKETS) -> List[bool]:
+    """Do hits on several sliding time window counters in one round trip.
+
+    See :py:func:`websauna.system.form.rollingwindow.check_many`.
+
+    :param registry: Pyramid registry e.g. request.registry
+    :param limiters: List of (key, window, limit) tuples, see :py:func:`check`
+    :return: List of booleans, True if the limit of the corresponding counter has been reached
+    """
+    limiters = list(limiters)
+    redis = get_redis(registry)
+    script = _get_script(redis)
+    now = time.time()
+
+    pipe = redis.pipeline(transaction=False)
+    for key, window, limit in limiters:
+        script(keys=[key], args=_get_args(window, buckets, 1, now), client=pipe)
+
+    hits = pipe.execute()
+    return [count > limit for count, (key, window, limit) in zip(hits, limiters)]
+
+
+def get(registry, key, window=60, buckets=DEFAULT_BUCKETS):
+    """Get the current hits per sliding time window.
+
+    This does not record a hit.
+
+    :param registry: Pyramid registry e.g. request.registry
+    :param key: Redis key name we use to keep counter
+    :param window: Sliding time window in seconds. Default 60 seconds.
+    :param buckets: How many sub-buckets the window is divided to
+    :return: int, how many hits we have within the current sliding time window
+    """
+    redis = get_redis(registry)
+    return _get(redis, key, window, buckets)
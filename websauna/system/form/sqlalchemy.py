@@ -3,10 +3,12 @@ import colander
 from abc import abstractmethod
 from colander.compat import is_nonstr_iter
 from sqlalchemy import Column
-from sqlalchemy.orm import Query, Session
+from sqlalchemy import inspect
+from sqlalchemy.orm import Query, Session, object_session
 
 from websauna.compat.typing import List
 from websauna.compat.typing import Tuple
+from websauna.compat.typing import Iterable
 from websauna.compat.typing import Union
 from websauna.compat.typing import Callable
 from websauna.utils.slug import slug_to_uuid, uuid_to_slug
@@ -231,3 +233,74 @@ class UUIDModelSet(ModelSet):
         """
         return [uuid_to_slug(getattr(i, self.match_column)) for i in appstruct]
 
+
+
+class LazyRelatedItems:
+    """Items of a to-many relationship of an object, not loaded until asked.
+
+    This is the appstruct of :py:class:`RelatedItems`.
+    """
+
+    def __init__(self, obj: object, name: str):
+        """
+        :param obj: SQLAlchemy object owning the relationship
+        :param name: Relationship attribute name
+        """
+        self.obj = obj
+        self.name = name
+
+    @property
+    def relationship(self):
+        return inspect(self.obj.__class__).relationships[self.name]
+
+    def get_loaded(self) -> Union[Query, List]:
+        """Get the query of the related items, or the items if they are already in memory."""
+
+        obj = self.obj
+        dbsession = object_session(obj)
+
+        # Don't query what has been loaded already, e.g. by eager loading. New objects cannot be queried.
+        if self.name in obj.__dict__ or dbsession is None:
+            return list(getattr(obj, self.name))
+
+        rel = self.relationship
+        query = dbsession.query(rel.mapper.class_).with_parent(obj, self.name)
+        if rel.order_by:
+            query = query.order_by(*rel.order_by)
+        return query
+
+    def get_preview(self, limit: int) -> Tuple[List, int]:
+        """Load the first items and the total count of the items.
+
+        The count is queried only if there are more than ``limit`` items.
+
+        :return: tuple (first items, total count)
+        """
+        items = self.get_loaded()
+
+        if isinstance(items, Query):
+            query = items
+            items = query.limit(limit + 1).all()
+            if len(items) > limit:
+                return items[:limit], query.order_by(None).count()
+
+        return items[:limit], len(items)
+
+    def __iter__(self) -> Iterable:
+        return iter(self.get_loaded())
+
+
+class RelatedItems(ModelSchemaType, colander.SchemaType):
+    """Read-only presentation of a to-many relationship.
+
+    The related collection is not loaded when the object is dictified. Instead, the appstruct is :py:class:`LazyRelatedItems` and widget decides how many items it needs. Use with :py:class:`websauna.system.form.widgets.RelatedItemsWidget`.
+    """
+
+    def serialize(self, node, appstruct):
+        if appstruct in (colander.null, None):
+            return colander.null
+        return appstruct
+
+    def deserialize(self, node, cstruct):
+        # Read-only, there is nothing to write back
+        return colander.null
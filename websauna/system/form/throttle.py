@@ -9,7 +9,7 @@ from . import rollingwindow
 logger = logging.getLogger(__name__)
 
 
-def create_throttle_validator(name:str, max_actions_in_time_window:int, time_window_in_seconds:int=3600):
+def create_throttle_validator(name:str, max_actions_in_time_window:int, time_window_in_seconds:int=3600, counter=rollingwindow):
     """Creates a Colander form validator which prevents form submissions exceed certain rate.
 
     Form submissions are throttled system wide. This prevents abuse of the system by flooding it with requests.
@@ -39,6 +39,8 @@ def create_throttle_validator(name:str, max_actions_in_time_window:int, time_win
 
     :param time_window_in_seconds: Time in window in seconds. Default one hour, 3600 seconds.
 
+    :param counter: Module or object providing ``check(registry, key, window, limit)`` and optionally ``THROTTLE_KEY_PREFIX``. Default :py:mod:`websauna.system.form.rollingwindow` counts exactly, but stores every hit. For large limits use memory bounded :py:mod:`websauna.system.form.slidingwindow`.
+
     :return: Function to be passed to ``validator`` Colander schema construction parameter.
     """
 
@@ -49,9 +51,12 @@ def create_throttle_validator(name:str, max_actions_in_time_window:int, time_win
 
         limit = max_actions_in_time_window
 
+        # Each counter stores its data in a different Redis type, so they cannot share keys
+        key = getattr(counter, "THROTTLE_KEY_PREFIX", "throttle_") + name
+
         def inner(node, value):
             # Check we don't have many invites going out
-            if rollingwindow.check(request.registry, "throttle_" + name, window=time_window_in_seconds, limit=limit):
+            if counter.check(request.registry, key, window=time_window_in_seconds, limit=limit):
 
                 # Alert devops through Sentry
                 logger.warn("Excessive form submissions on %s", name)
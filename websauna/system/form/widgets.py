@@ -3,8 +3,10 @@
 Mostly for high level integration.
 """
 
+import colander
 import deform
 from deform.widget import _normalize_choices
+from websauna.utils.slug import slug_to_uuid
 from websauna.utils.slug import uuid_to_slug
 
 
@@ -23,3 +25,130 @@ class FriendlyUUIDWidget(deform.widget.TextInputWidget):
         return values
 
 
+
+
+class RelationshipAutocompleteWidget(deform.widget.Widget):
+    """Search-as-you-type choice of one related object.
+
+    Used instead of a select widget when the related table is too large to be listed in full. Choices are loaded from a JSON endpoint, see :py:class:`websauna.system.crud.views.Autocomplete`. Only the label of the currently selected object is looked up when the form is rendered.
+
+    For :py:class:`websauna.system.form.sqlalchemy.UUIDForeignKeyValue` Colander type.
+    """
+
+    template = 'autocomplete'
+
+    readonly_template = 'readonly/autocomplete'
+
+    #: Text shown in the empty search input
+    placeholder = "Type to search"
+
+    #: Milliseconds to wait after a key press before searching
+    delay = 250
+
+    #: Attribute shown as the label of the selected object. If not set use ``str(obj)``.
+    label_column = None
+
+    def __init__(self, url:str, model:type, **kw):
+        """
+        :param url: URL of the JSON endpoint. It is passed ``q`` parameter and it must return ``{"results": [{"id": ..., "text": ...}]}``.
+        :param model: SQLAlchemy model of the related object
+        :param label_column: Attribute shown as the label, the same the endpoint uses for its results
+        """
+        super(RelationshipAutocompleteWidget, self).__init__(url=url, model=model, **kw)
+
+    def get_label(self, field, cstruct:str) -> str:
+        """Look up the label of the selected object."""
+        if not cstruct:
+            return ""
+
+        dbsession = field.schema.bindings["request"].dbsession
+        obj = dbsession.query(self.model).filter_by(uuid=slug_to_uuid(cstruct)).first()
+        if obj is None:
+            return ""
+
+        if self.label_column:
+            value = getattr(obj, self.label_column)
+            return "" if value is None else str(value)
+
+        return str(obj)
+
+    def serialize(self, field, cstruct, **kw):
+        if cstruct in (colander.null, None):
+            cstruct = ""
+        readonly = kw.get('readonly', self.readonly)
+        template = readonly and self.readonly_template or self.template
+        values = self.get_template_values(field, cstruct, kw)
+        values["label"] = self.get_label(field, cstruct)
+        return field.renderer(template, **values)
+
+    def deserialize(self, field, pstruct):
+        if pstruct in (colander.null, None, ""):
+            return colander.null
+        return pstruct
+
+
+class RelatedItemsWidget(deform.widget.Widget):
+    """Read-only list of the items of a to-many relationship.
+
+    Only the item count and the first ``limit`` items are loaded. If there are more items, a link to the admin listing of the related model, filtered to the items of this object, is shown. See :py:meth:`websauna.system.crud.views.Listing.filter_query`.
+
+    For :py:class:`websauna.system.form.sqlalchemy.RelatedItems` Colander type.
+    """
+
+    template = readonly_template = 'readonly/related_items'
+
+    readonly = True
+
+    #: How many items are shown
+    limit = 10
+
+    def get_model_admin(self, request, model:type):
+        """Get the admin resource of a model or None if the model has no admin."""
+        model_admin_id = getattr(request.registry, "model_admin_ids_by_model", {}).get(model)
+        admin = getattr(request, "admin", None)
+        if not model_admin_id or admin is None:
+            return None
+        return admin["models"][model_admin_id]
+
+    def get_listing_url(self, request, items) -> str:
+        """Link to the listing of all related items.
+
+        The relationship needs a backref or ``back_populates`` on the related model and the object must have ``uuid``.
+
+        :param items: :py:class:`websauna.system.form.sqlalchemy.LazyRelatedItems`
+        :return: URL or None if the listing cannot be filtered by this object
+        """
+        rel = items.relationship
+        reverse = rel.back_populates or rel.backref
+        if isinstance(reverse, tuple):
+            reverse = reverse[0]
+
+        if not reverse or getattr(items.obj, "uuid", None) is None:
+            return None
+
+        model_admin = self.get_model_admin(request, rel.mapper.class_)
+        if model_admin is None:
+            return None
+
+        return request.resource_url(model_admin, "listing", query={"related_" + reverse: uuid_to_slug(items.obj.uuid)})
+
+    def serialize(self, field, cstruct, **kw):
+        request = field.schema.bindings["request"]
+
+        if cstruct in (colander.null, None):
+            items, count, listing_url = [], 0, None
+            model_admin = None
+        else:
+            items, count = cstruct.get_preview(self.limit)
+            listing_url = self.get_listing_url(request, cstruct) if count > len(items) else None
+            model_admin = self.get_model_admin(request, cstruct.relationship.mapper.class_)
+
+        links = [(str(item), model_admin.get_object_url(item) if model_admin else None) for item in items]
+
+        values = self.get_template_values(field, cstruct, kw)
+        values.update(dict(links=links, count=count, listing_url=listing_url))
+        return field.renderer(self.readonly_template, **values)
+
+    def deserialize(self, field, pstruct):
+        return colander.null
+
@@ -0,0 +1,131 @@
+"""Conditional GET with ETag and Last-Modified validators.
+
+When the client already has the current version of a page, answer ``304 Not Modified`` instead of sending the page again. If the validators can be derived without rendering, e.g. from the modification time of a model, check them in the beginning of the view and skip rendering altogether::
+
+    from websauna.system.http.conditional import check_validators
+
+    @view_config(route_name="news_item", renderer="news_item.html")
+    def news_item(request):
+        item = ...
+        not_modified = check_validators(request, make_etag("news", item.id, item.updated_at), item.updated_at)
+        if not_modified:
+            return not_modified
+        ...
+
+Otherwise use :py:func:`conditional_get` view decorator, which can also hash the rendered body::
+
+    @view_config(route_name="about", renderer="about.html", decorator=conditional_get())
+    def about(request):
+        ...
+
+If the page depends on the logged in user, pass ``vary=("Cookie",)`` and add the user to the ETag. See :py:mod:`websauna.system.http.header`.
+"""
+import datetime
+import functools
+import hashlib
+
+from pyramid.httpexceptions import HTTPNotModified
+from pyramid.response import Response
+from websauna.system.http import Request
+from websauna.system.http.header import add_vary_callback
+
+from websauna.compat.typing import Callable
+from websauna.compat.typing import Optional
+from websauna.compat.typing import Tuple
+
+
+#: Flash message queues rendered by site/messages.html
+FLASH_QUEUES = ("error", "warning", "info", "success", "")
+
+
+def make_etag(*parts) -> str:
+    """Create an ETag value from parts which identify the version of the page, like model id and modification time."""
+    data = "\0".join(str(p) for p in parts)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def has_flash_messages(request:Request) -> bool:
+    """Are there pending flash messages which would be rendered on the page."""
+    return any(request.session.peek_flash(queue) for queue in FLASH_QUEUES)
+
+
+def is_not_modified(request:Request, etag:Optional[str]=None, last_modified:Optional[datetime.datetime]=None) -> bool:
+    """Does the client already have this version of the page.
+
+    ``If-None-Match`` takes precedence over ``If-Modified-Since``.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return False
+
+    if etag is not None and request.if_none_match:
+        return etag in request.if_none_match
+
+    if last_modified is not None and request.if_modified_since:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+
+    return False
+
+
+def add_validators_callback(etag:Optional[str], last_modified:Optional[datetime.datetime]):
+    def inner(request, response):
+        if response.status_code not in (200, 304):
+            return
+        if etag is not None:
+            response.etag = etag
+        if last_modified is not None:
+            response.last_modified = last_modified
+    return inner
+
+
+def check_validators(request:Request, etag:Optional[str]=None, last_modified:Optional[datetime.datetime]=None, vary:Tuple[str, ...]=()) -> Optional[Response]:
+    """Set validators on the response and answer the conditional request.
+
+    Pages with pending flash messages are always rendered.
+
+    :param etag: ETag of the current version of the page, see :py:func:`make_etag`
+    :param last_modified: Modification time of the current version of the page
+    :param vary: Request headers the page depends on, like ``Cookie``
+    :return: ``304 Not Modified`` response to return from the view or None if the page must be rendered
+    """
+    if vary:
+        request.add_response_callback(add_vary_callback(*vary))
+
+    if etag is None and last_modified is None:
+        return None
+
+    request.add_response_callback(add_validators_callback(etag, last_modified))
+
+    if is_not_modified(request, etag, last_modified) and not has_flash_messages(request):
+        return HTTPNotModified()
+
+    return None
+
+
+def conditional_get(validators:Optional[Callable]=None, vary:Tuple[str, ...]=()):
+    """View decorator to answer conditional GET requests.
+
+    :param validators: Callable ``(context, request)`` returning ``(etag, last_modified)`` tuple. It is called before the view. If not given, the ETag is the MD5 hash of the rendered body, so the page is still rendered, but not sent.
+    :param vary: Request headers the page depends on, like ``Cookie``
+    """
+    def inner(view):
+        @functools.wraps(view)
+        def wrapped(context, request):
+            if validators is not None:
+                etag, last_modified = validators(context, request)
+                not_modified = check_validators(request, etag, last_modified, vary)
+                if not_modified:
+                    return not_modified
+                return view(context, request)
+
+            if vary:
+                request.add_response_callback(add_vary_callback(*vary))
+
+            response = view(context, request)
+            # Hash only bodies which are already in the memory, not streamed files
+            if response.status_code == 200 and response.etag is None and isinstance(response.app_iter, (list, tuple)):
+                response.md5_etag()
+                # WebOb answers 304 when it serves the response
+                response.conditional_response = True
+            return response
+        return wrapped
+    return inner
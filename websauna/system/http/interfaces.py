@@ -0,0 +1,8 @@
+from zope.interface import Interface
+
+
+class IPageCacheStorage(Interface):
+    """Utility marker interface for the storage of the full page cache.
+
+    See :py:mod:`websauna.system.http.pagecache`.
+    """
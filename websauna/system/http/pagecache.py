@@ -0,0 +1,291 @@
+"""Full page cache for anonymous visitors.
+
+Public pages are often the same for every anonymous visitor. The page cache tween stores complete responses of such pages and serves them without running traversal, the view or template rendering.
+
+Views opt in with :py:func:`cache_page` decorator::
+
+    from websauna.system.http.pagecache import cache_page
+
+    @view_config(route_name="home", renderer="home.html", decorator=cache_page(60, stale=300))
+    def home(request):
+        ...
+
+Only requests and responses which cannot carry anything personal are cached
+
+* The request is ``GET`` or ``HEAD`` and it does not have a session cookie or ``Authorization`` header
+
+* The response is ``200 OK``, it does not set cookies and it is not marked ``private`` or ``no-store``
+
+* No user was logged in and no session, which could carry flash messages, was created
+
+Cached copies are keyed by the URL and the request headers named in the ``Vary`` header of the response. As only requests without a session cookie are served from the cache, ``Cookie`` is left out of the key.
+
+A page older than ``max_age`` seconds is stale. Within the following ``stale`` seconds one request at a time regenerates the page while the other requests are served the stale copy.
+
+Enable in the settings::
+
+    # memory, redis or a dotted name of a callable taking the registry and returning the storage
+    websauna.page_cache = redis
+
+``memory`` keeps the pages in the process memory and is suitable for development and single process deployments.
+
+Drop cached copies of a page with :py:func:`invalidate_page`.
+"""
+import base64
+import functools
+import hashlib
+import json
+import threading
+import time
+
+from pyramid.path import DottedNameResolver
+from pyramid.registry import Registry
+from pyramid.response import Response
+from pyramid.tweens import INGRESS
+from websauna.system.core.redis import get_redis
+from websauna.system.http import Request
+from websauna.system.http.interfaces import IPageCacheStorage
+
+from websauna.compat.typing import Optional
+
+
+#: How long one request may take to regenerate a stale page before another request starts doing the same
+REFRESH_LOCK_TIMEOUT = 30
+
+
+class MemoryStorage:
+    """Keep cached pages in the process memory."""
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key:str) -> Optional[dict]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.time():
+            self.entries.pop(key, None)
+            return None
+        return value
+
+    def set(self, key:str, value:dict, ttl:int):
+        now = time.time()
+        with self.lock:
+            self.entries[key] = (now + ttl, value)
+            # Purge expired pages now and then, so that one off URLs do not pile up
+            if len(self.entries) % 1000 == 0:
+                for k, (expires, v) in list(self.entries.items()):
+                    if expires < now:
+                        self.entries.pop(k, None)
+
+    def add(self, key:str, ttl:int) -> bool:
+        """Set a marker key if it is not set yet.
+
+        :return: True if the key was set
+        """
+        with self.lock:
+            if self.get(key) is not None:
+                return False
+            self.entries[key] = (time.time() + ttl, {})
+            return True
+
+    def delete(self, *keys:str):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+
+class RedisStorage:
+    """Keep cached pages in Redis, shared by all processes."""
+
+    def __init__(self, registry:Registry):
+        self.registry = registry
+
+    def get(self, key:str) -> Optional[dict]:
+        data = get_redis(self.registry).get(key)
+        if data is None:
+            return None
+        return json.loads(data.decode("utf-8"))
+
+    def set(self, key:str, value:dict, ttl:int):
+        get_redis(self.registry).setex(key, ttl, json.dumps(value))
+
+    def add(self, key:str, ttl:int) -> bool:
+        return bool(get_redis(self.registry).set(key, "1", nx=True, ex=ttl))
+
+    def delete(self, *keys:str):
+        get_redis(self.registry).delete(*keys)
+
+
+def cache_page(max_age:int, stale:int=0):
+    """View decorator to store the responses of the view in the page cache.
+
+    :param max_age: How many seconds the page is served from the cache
+    :param stale: How many seconds a stale page is served while it is being regenerated
+    """
+    def inner(view):
+        @functools.wraps(view)
+        def wrapped(context, request):
+            request._page_cache = (max_age, stale)
+            return view(context, request)
+        return wrapped
+    return inner
+
+
+def get_storage(registry:Registry) -> Optional[IPageCacheStorage]:
+    """Get the page cache storage or None if the page cache is not enabled."""
+    return registry.queryUtility(IPageCacheStorage)
+
+
+def _get_prefix(registry:Registry) -> str:
+    return "{}:page:".format(registry.settings.get("websauna.site_id", "websauna"))
+
+
+def get_vary_key(registry:Registry, url:str) -> str:
+    """Key of the entry telling which request headers cached copies of the page vary on."""
+    return _get_prefix(registry) + "vary:" + hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def get_page_key(request:Request, url:str, vary:list) -> str:
+    """Key of the cached copy of the page for this request."""
+    data = json.dumps([url] + [request.headers.get(name, "") for name in vary])
+    return _get_prefix(request.registry) + hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def invalidate_page(request:Request, url:str):
+    """Drop cached copies of a page.
+
+    :param url: Full URL of the page, including the query string, e.g. ``request.route_url("home")``
+    """
+    storage = get_storage(request.registry)
+    if storage is not None:
+        storage.delete(get_vary_key(request.registry, url))
+
+
+def is_cacheable_request(request:Request, cookie_name:str) -> bool:
+    """Can the request be served from the cache."""
+    return request.method in ("GET", "HEAD") and cookie_name not in request.cookies and "Authorization" not in request.headers
+
+
+def has_session(request:Request) -> bool:
+    """Was a session created or loaded for the request.
+
+    A session is where flash messages live. With :py:class:`websauna.system.core.session.LazySession` a request without a session cookie only gets a session when something, like a flash message, is stored in it.
+    """
+    session = request.__dict__.get("session")
+    if session is None:
+        return False
+    return getattr(session, "materialized", True)
+
+
+def is_cacheable_response(request:Request, response:Response) -> bool:
+    """Can the response be stored in the cache."""
+
+    if response.status_code != 200:
+        return False
+
+    if "Set-Cookie" in response.headers:
+        return False
+
+    if "*" in (response.vary or ()):
+        return False
+
+    cache_control = response.cache_control
+    if cache_control.private or cache_control.no_store:
+        return False
+
+    if request.__dict__.get("user") is not None:
+        return False
+
+    return not has_session(request)
+
+
+class PageCacheTweenFactory:
+    """Tween to serve cached pages for anonymous visitors and store the pages of views decorated with :py:func:`cache_page`."""
+
+    def __init__(self, handler, registry:Registry):
+        self.handler = handler
+        self.registry = registry
+        self.cookie_name = registry.settings.get("redis.sessions.cookie_name", "session")
+
+    def get_response(self, entry:dict) -> Response:
+        response = Response(status=entry["status"], headerlist=[tuple(h) for h in entry["headers"]], body=base64.b64decode(entry["body"]))
+        # Answer 304 Not Modified if the page has validators, see websauna.system.http.conditional
+        response.conditional_response = True
+        return response
+
+    def store(self, storage:IPageCacheStorage, request:Request, url:str, response:Response):
+        max_age, stale = request._page_cache
+        ttl = max_age + stale
+        if ttl <= 0:
+            return
+
+        vary = sorted(set(response.vary or ()) - {"Cookie"})
+
+        entry = {
+            "status": response.status,
+            "headers": [(name, value) for name, value in response.headerlist],
+            "body": base64.b64encode(response.body).decode("ascii"),
+            "fresh_until": time.time() + max_age,
+        }
+
+        storage.set(get_vary_key(self.registry, url), {"vary": vary}, ttl)
+        storage.set(get_page_key(request, url, vary), entry, ttl)
+
+    def __call__(self, request:Request):
+        storage = get_storage(self.registry)
+        if storage is None or not is_cacheable_request(request, self.cookie_name):
+            return self.handler(request)
+
+        url = request.url
+        vary_key = get_vary_key(self.registry, url)
+        lock_key = None
+
+        vary_entry = storage.get(vary_key)
+        if vary_entry is not None:
+            entry = storage.get(get_page_key(request, url, vary_entry["vary"]))
+            if entry is not None:
+                if entry["fresh_until"] > time.time():
+                    return self.get_response(entry)
+
+                # Let one request regenerate the stale page and serve the stale copy to others meanwhile
+                lock_key = vary_key + ":refresh"
+                if not storage.add(lock_key, REFRESH_LOCK_TIMEOUT):
+                    return self.get_response(entry)
+
+        try:
+            response = self.handler(request)
+
+            if request.method == "GET" and getattr(request, "_page_cache", None):
+                # Run response callbacks now, so that we see cookies and Vary headers they add. Pyramid would run them after all tweens.
+                request._process_response_callbacks(response)
+                if is_cacheable_response(request, response):
+                    self.store(storage, request, url, response)
+        finally:
+            # Let the next request retry the refresh right away if this one failed
+            if lock_key:
+                storage.delete(lock_key)
+
+        return response
+
+
+def includeme(config):
+    """Set up the page cache storage from ``websauna.page_cache`` setting and add the tween."""
+    settings = config.registry.settings
+    storage_name = settings.get("websauna.page_cache", "")
+
+    if storage_name in ("", "off", "false"):
+        return
+
+    if storage_name == "memory":
+        storage = MemoryStorage()
+    elif storage_name == "redis":
+        storage = RedisStorage(config.registry)
+    else:
+        resolver = DottedNameResolver()
+        storage = resolver.resolve(storage_name)(config.registry)
+
+    config.registry.registerUtility(storage, IPageCacheStorage)
+    config.add_tween("websauna.system.http.pagecache.PageCacheTweenFactory", under=INGRESS)
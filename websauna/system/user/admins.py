@@ -17,12 +17,16 @@ class UserAdmin(ModelAdmin):
 
     mapper = Base64UUIDMapper()
 
+    search_column = "email"
+
     class Resource(ModelAdmin.Resource):
         """Wrap one SQLAlhcemy user mode to admin resource.
 
         ``get_object()`` returns :py:class:`websauna.system.user.model.User`.
         """
 
+        __slots__ = ()
+
         def get_title(self):
             return self.get_object().friendly_name
 
@@ -39,9 +43,13 @@ class GroupAdmin(ModelAdmin):
 
     mapper = Base64UUIDMapper()
 
+    search_column = "name"
+
     class Resource(ModelAdmin.Resource):
         """Wrap one SQLAlhcemy group model to admin resource.
 
         ``get_object()`` returns :py:class:`websauna.system.user.model.Group`.
         """
 
+        __slots__ = ()
+
@@ -8,11 +8,16 @@ from pyramid_layout.panel import panel_config
 from pyramid.httpexceptions import HTTPFound
 from pyramid.view import view_config
 
+from websauna.system.admin import dashboard
 from websauna.system.admin.utils import get_admin_url_for_sqlalchemy_object
+from websauna.system.auth.principalcache import get_group_member_ids
+from websauna.system.auth.principalcache import invalidate_principals
 from websauna.system.core import messages
 from websauna.system.crud.views import TraverseLinkButton
 from websauna.system.form.fieldmapper import EditMode
 from websauna.system.form.fields import defer_widget_values
+from websauna.system.form.sqlalchemy import RelatedItems
+from websauna.system.form.widgets import RelatedItemsWidget
 from websauna.system.user.models import User
 from websauna.system.user.schemas import group_vocabulary, GroupSet, validate_unique_user_email
 from websauna.viewconfig import view_overrides
@@ -35,9 +40,14 @@ def user_admin_panel(context, request):
     model = model_admin.get_model()
 
     title = model_admin.title
-    count = dbsession.query(model).count()
-    latest_user = dbsession.query(model).order_by(model.id.desc()).first()
-    latest_user_url = get_admin_url_for_sqlalchemy_object(admin, latest_user)
+    count = dashboard.get_count(request, model_admin)
+
+    def get_latest_user_id():
+        return dbsession.query(model.id).order_by(model.id.desc()).limit(1).scalar()
+
+    latest_user_id = dashboard.get_cached(request, "latest-user", get_latest_user_id)
+    latest_user = dbsession.query(model).get(latest_user_id) if latest_user_id else None
+    latest_user_url = get_admin_url_for_sqlalchemy_object(admin, latest_user) if latest_user else None
 
     return locals()
 
@@ -62,6 +72,10 @@ class UserListing(admin_views.Listing):
     def listing(self):
         return super(UserListing, self).listing()
 
+    @view_config(context=UserAdmin, route_name="admin", name="export", permission='view')
+    def export(self):
+        return super(UserListing, self).export()
+
 
 class UserShow(admin_views.Show):
     """Show one user."""
@@ -80,7 +94,7 @@ class UserShow(admin_views.Show):
                 "last_login_ip",
                 colander.SchemaNode(colander.String(), name="registration_source", missing=colander.drop),
                 colander.SchemaNode(colander.String(), name="social"),
-                colander.SchemaNode(GroupSet(), name="groups", widget=defer_widget_values(deform.widget.CheckboxChoiceWidget, group_vocabulary, css_class="groups"))
+                colander.SchemaNode(RelatedItems(), name="groups", missing=colander.drop, widget=RelatedItemsWidget(css_class="groups"))
                 ]
 
     def get_title(self):
@@ -121,6 +135,9 @@ class UserEdit(admin_views.Edit):
 
         if e:
             self.request.registry.notify(e)
+        else:
+            # Group membership may have changed
+            invalidate_principals(self.request, [user.id])
 
     def get_title(self):
         return "{} #{}".format(self.get_object().friendly_name, self.get_object().id)
@@ -233,6 +250,15 @@ class GroupEdit(admin_views.Edit):
         "description"
     ]
 
+    def save_changes(self, form:deform.Form, appstruct:dict, group):
+        """Group name is part of principals of all group members."""
+        name_changes = appstruct["name"] != group.name
+
+        super(GroupEdit, self).save_changes(form, appstruct, group)
+
+        if name_changes:
+            invalidate_principals(self.request, get_group_member_ids(self.request.dbsession, group))
+
     @view_config(context=GroupAdmin.Resource, route_name="admin", name="edit", renderer="crud/edit.html", permission='edit')
     def edit(self):
         return super(GroupEdit, self).edit()
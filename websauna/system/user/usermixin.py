@@ -122,19 +122,28 @@ class UserMixin:
         # TODO: is_active defined in Horus
         return self.enabled and self.is_activated
 
-    def is_in_group(self, name):
+    def get_group_names(self) -> frozenset:
+        """Names of the groups this user belongs to.
 
-        # TODO: groups - defined in Horus
-        for g in self.groups:
-            if g.name == name:
-                return True
-        return False
-
-    def is_admin(self):
-        """Does this user the see the main admin interface link.
-
-        TODO: This is very suboptimal, wasted database cycles, etc. Change this.
+        The names are computed once and reused while the ``groups`` relationship stays loaded and unmodified. Authentication loads groups together with the user, so checking the groups of the logged in user does not hit the database.
         """
+        cached = self.__dict__.get("_group_names")
+        if cached:
+            groups, length, names = cached
+            if self.__dict__.get("groups") is groups and len(groups) == length and not inspection.inspect(self).attrs.groups.history.has_changes():
+                return names
+
+        groups = self.groups
+        names = frozenset(g.name for g in groups)
+        self._group_names = (groups, len(groups), names)
+        return names
+
+    def is_in_group(self, name) -> bool:
+        """Is this user member of a named group."""
+        return name in self.get_group_names()
+
+    def is_admin(self) -> bool:
+        """Does this user the see the main admin interface link."""
         return self.is_in_group(GroupMixin.DEFAULT_ADMIN_GROUP_NAME)
 
     def is_valid_session(self, session_created_at:datetime.datetime) -> bool:
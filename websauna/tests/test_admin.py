@@ -1,6 +1,12 @@
 import time
 
 import transaction
+from pyramid import testing
+
+from websauna.system.admin.admin import Admin
+from websauna.system.admin.events import AdminConstruction
+from websauna.system.admin.utils import get_admin
+from websauna.system.core.traversal import Resource
 from websauna.system.user.utils import get_site_creator
 
 from websauna.tests.utils import create_user, EMAIL, PASSWORD, create_logged_in_user
@@ -71,3 +77,70 @@ def test_context_sensitive_shell(web_server, browser, dbsession, init):
 
     # Back to home screen
     assert b.is_element_visible_by_css("#nav-logout")
+
+
+def test_admin_structure_shared(init):
+    """Admin menus are built once and shared between requests."""
+
+    registry = init.config.registry
+
+    request = testing.DummyRequest()
+    request.registry = registry
+    admin = get_admin(request)
+    assert get_admin(request) is admin
+
+    other = testing.DummyRequest()
+    other.registry = registry
+    other_admin = get_admin(other)
+    assert other_admin is not admin
+    assert other_admin.get_admin_menu_entry() is admin.get_admin_menu_entry()
+
+    data_menu = admin.get_admin_menu().get_entry("admin-menu-data").submenu
+    assert "admin-menu-data-user" in data_menu.entries
+
+    # Model admins are bound to the request
+    assert admin["models"]["user"].request is request
+    assert other_admin["models"]["user"].request is other
+
+
+
+class LegacyResource(Resource):
+    """Admin child which an old style subscriber creates itself."""
+
+    title = "Legacy"
+
+
+def test_admin_legacy_child_instance(init):
+    """Resource instances put to admin children by old style subscribers are bound to each request."""
+
+    registry = init.config.registry
+
+    def subscriber(event):
+        admin = event.admin
+        admin.children["legacy"] = LegacyResource(admin.request)
+
+    registry.registerHandler(subscriber, (AdminConstruction,))
+    old_prototype = getattr(registry, "admin_prototype", None)
+    try:
+        registry.admin_prototype = Admin(None, registry)
+
+        request = testing.DummyRequest()
+        request.registry = registry
+        admin = Admin(request)
+
+        other = testing.DummyRequest()
+        other.registry = registry
+        other_admin = Admin(other)
+
+        legacy = admin["legacy"]
+        assert isinstance(legacy, LegacyResource)
+        assert legacy.request is request
+        assert legacy.__parent__ is admin
+        assert legacy.__name__ == "legacy"
+        assert admin["legacy"] is legacy
+
+        assert other_admin["legacy"].request is other
+        assert other_admin["legacy"] is not legacy
+    finally:
+        registry.unregisterHandler(subscriber, (AdminConstruction,))
+        registry.admin_prototype = old_prototype
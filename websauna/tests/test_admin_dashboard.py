@@ -0,0 +1,69 @@
+"""Admin dashboard statistics."""
+import uuid
+
+import transaction
+from pyramid import testing
+
+from websauna.system.admin import dashboard
+from websauna.system.admin.utils import get_admin
+from websauna.system.user.models import Group
+from websauna.tests.utils import create_user
+
+
+def test_count_model_admins(dbsession, init):
+    """All model admins are counted in one query."""
+
+    with transaction.manager:
+        create_user(dbsession, init.config.registry)
+        create_user(dbsession, init.config.registry, email="example2@example.com")
+
+    request = testing.DummyRequest()
+    request.registry = init.config.registry
+    request.dbsession = dbsession
+
+    with transaction.manager:
+        model_admins = list(get_admin(request)["models"].items())
+        counts = dashboard.count_model_admins(dbsession, model_admins)
+        assert counts["user"] == 2
+        assert counts["group"] == dbsession.query(Group).count()
+
+
+def test_cached_statistic(init):
+    """Statistics are computed once within the cache lifetime."""
+
+    request = testing.DummyRequest()
+    request.registry = init.config.registry
+
+    calls = []
+
+    def create():
+        calls.append(1)
+        return len(calls)
+
+    key = "test-{}".format(uuid.uuid4())
+    assert dashboard.get_cached(request, key, create) == 1
+    assert dashboard.get_cached(request, key, create) == 1
+    assert len(calls) == 1
+
+
+def test_cached_statistic_redis_down(init):
+    """Statistics are computed and kept in the process if Redis cannot be reached."""
+
+    registry = init.config.registry
+    request = testing.DummyRequest()
+    request.registry = registry
+
+    calls = []
+
+    def create():
+        calls.append(1)
+        return len(calls)
+
+    registry.settings["websauna.admin_dashboard_cache_url"] = "redis://localhost:1/0"
+    try:
+        key = "test-{}".format(uuid.uuid4())
+        assert dashboard.get_cached(request, key, create) == 1
+        assert dashboard.get_cached(request, key, create) == 1
+        assert len(calls) == 1
+    finally:
+        del registry.settings["websauna.admin_dashboard_cache_url"]
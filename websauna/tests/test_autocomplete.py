@@ -0,0 +1,98 @@
+"""Relationship autocomplete endpoint."""
+import logging
+
+import pytest
+import transaction
+from pyramid import testing
+from pyramid.httpexceptions import HTTPNotFound
+from pyramid.registry import Registry
+
+from websauna.system.crud.sqlalchemy import CRUD
+from websauna.system.crud.sqlalchemy import Resource
+from websauna.system.crud.views import Autocomplete
+from websauna.system.form import fieldmapper
+from websauna.system.user.models import User
+from websauna.tests.utils import create_user
+
+
+class UserCRUD(CRUD):
+    Resource = Resource
+    search_column = "email"
+
+
+class UserAutocomplete(Autocomplete):
+    page_size = 2
+
+
+def test_autocomplete(dbsession, init):
+    """Search items by prefix and page through them."""
+
+    with transaction.manager:
+        for i in range(3):
+            create_user(dbsession, init.config.registry, email="foo{}@example.com".format(i))
+        create_user(dbsession, init.config.registry, email="bar@example.com")
+
+    with transaction.manager:
+        request = testing.DummyRequest(params={"q": "FOO"})
+        request.dbsession = dbsession
+        result = UserAutocomplete(UserCRUD(request, model=User), request).autocomplete()
+        assert [r["text"] for r in result["results"]] == ["foo0@example.com", "foo1@example.com"]
+        assert result["more"]
+
+        request = testing.DummyRequest(params={"q": "foo", "page": "2"})
+        request.dbsession = dbsession
+        result = UserAutocomplete(UserCRUD(request, model=User), request).autocomplete()
+        assert len(result["results"]) == 1
+        assert not result["more"]
+
+        # Wildcards are matched literally
+        request = testing.DummyRequest(params={"q": "%"})
+        request.dbsession = dbsession
+        result = UserAutocomplete(UserCRUD(request, model=User), request).autocomplete()
+        assert result["results"] == []
+
+
+def test_autocomplete_requires_search_column(dbsession, init):
+    """CRUDs without an explicit search column cannot be searched."""
+
+    request = testing.DummyRequest(params={"q": "a"})
+    request.dbsession = dbsession
+
+    with pytest.raises(HTTPNotFound):
+        UserAutocomplete(CRUD(request, model=User), request).autocomplete()
+
+
+def test_select_all_warning(dbsession, init):
+    """Loading a big table to a select widget is logged once."""
+
+    class Handler(logging.Handler):
+        def __init__(self):
+            super(Handler, self).__init__()
+            self.messages = []
+
+        def emit(self, record):
+            self.messages.append(record.getMessage())
+
+    with transaction.manager:
+        create_user(dbsession, init.config.registry)
+
+    mapper = fieldmapper.DefaultFieldMapper()
+    mapper.autocomplete_threshold = 0
+
+    # No model admins
+    request = testing.DummyRequest()
+    request.dbsession = dbsession
+    request.registry = Registry()
+
+    handler = Handler()
+    fieldmapper.logger.addHandler(handler)
+    try:
+        with transaction.manager:
+            for i in range(2):
+                widget = mapper.get_relationship_widget(request, User, lambda: [("", "---")])
+                assert widget.values == [("", "---")]
+    finally:
+        fieldmapper.logger.removeHandler(handler)
+
+    assert len(handler.messages) == 1
+    assert "User" in handler.messages[0]
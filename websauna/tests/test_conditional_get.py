@@ -0,0 +1,34 @@
+"""Conditional GET with ETag and Last-Modified."""
+import datetime
+
+from pyramid.request import Request
+
+from websauna.system.http.conditional import check_validators
+from websauna.system.http.conditional import make_etag
+
+
+def test_check_validators(init):
+    """Matching validators are answered with 304 before rendering."""
+
+    modified = datetime.datetime(2016, 1, 1, 12, 0, 0, 500, tzinfo=datetime.timezone.utc)
+    etag = make_etag("Article", 1, modified.isoformat())
+
+    def check(**headers):
+        request = Request.blank("/", headers=headers)
+        request.registry = init.config.registry
+        return request, check_validators(request, etag, modified, vary=("Cookie",))
+
+    request, response = check(**{"If-None-Match": '"{}"'.format(etag)})
+    assert response.status_code == 304
+    request._process_response_callbacks(response)
+    assert response.etag == etag
+    assert "Cookie" in response.vary
+
+    request, response = check(**{"If-None-Match": '"foo"', "If-Modified-Since": "Fri, 01 Jan 2016 12:00:00 GMT"})
+    assert response is None
+
+    request, response = check(**{"If-Modified-Since": "Fri, 01 Jan 2016 12:00:00 GMT"})
+    assert response.status_code == 304
+
+    request, response = check(**{"If-Modified-Since": "Fri, 01 Jan 2016 11:00:00 GMT"})
+    assert response is None
@@ -0,0 +1,78 @@
+"""Listing item counting strategies."""
+import transaction
+from sqlalchemy import bindparam
+
+from websauna.system.crud.counter import CappedCounter
+from websauna.system.crud.counter import EstimateCounter
+from websauna.system.crud.counter import ExactCounter
+from websauna.system.user.models import User
+from websauna.tests.utils import create_user
+
+
+def create_users(dbsession, registry, count):
+    with transaction.manager:
+        for i in range(count):
+            create_user(dbsession, registry, email="example{}@example.com".format(i))
+
+
+def test_exact_count(dbsession, init):
+    """Exact counter gives the number of rows."""
+    create_users(dbsession, init.config.registry, 3)
+
+    with transaction.manager:
+        count = ExactCounter().count(dbsession.query(User))
+        assert count == 3
+        assert not count.estimate
+        assert str(count) == "3"
+
+
+def test_capped_count(dbsession, init):
+    """Capped counter stops counting at the limit."""
+    create_users(dbsession, init.config.registry, 3)
+
+    with transaction.manager:
+        count = CappedCounter(limit=2).count(dbsession.query(User))
+        assert count == 2
+        assert count.capped
+        assert count.estimate
+        assert str(count) == "2+"
+
+        count = CappedCounter(limit=3).count(dbsession.query(User))
+        assert count == 3
+        assert not count.capped
+
+
+def test_estimate_count_small_table(dbsession, init):
+    """Estimates fall back to exact counting for small tables."""
+    create_users(dbsession, init.config.registry, 3)
+
+    with transaction.manager:
+        count = EstimateCounter().count(dbsession.query(User))
+        assert count == 3
+        assert not count.estimate
+
+        count = EstimateCounter().count(dbsession.query(User).filter(User.email == "example1@example.com"))
+        assert count == 1
+
+
+def test_plan_estimate(dbsession, init):
+    """Planner estimate can be read for a filtered query."""
+    create_users(dbsession, init.config.registry, 3)
+
+    with transaction.manager:
+        counter = EstimateCounter(exact_below=0)
+        query = dbsession.query(User).filter(User.email == "example1@example.com")
+        assert counter.get_plan_estimate(query) >= 0
+
+
+def test_plan_estimate_literals_and_in(dbsession, init):
+    """Colons in values and expanding IN parameters do not confuse EXPLAIN."""
+    create_users(dbsession, init.config.registry, 3)
+
+    with transaction.manager:
+        counter = EstimateCounter(exact_below=0)
+        query = dbsession.query(User).filter(User.username == "a :word", User.id.in_([1, 2, 3]))
+        assert counter.get_plan_estimate(query) >= 0
+
+        query = dbsession.query(User).filter(User.id.in_(bindparam("ids", expanding=True))).params(ids=[1, 2])
+        assert counter.get_plan_estimate(query) >= 0
@@ -0,0 +1,68 @@
+"""CRUD traversing to objects."""
+import pytest
+import transaction
+from pyramid import testing
+
+from websauna.system.core.root import Root
+from websauna.system.crud.sqlalchemy import CRUD
+from websauna.system.crud.sqlalchemy import Resource
+from websauna.system.user.models import User
+from websauna.tests.utils import create_user
+from websauna.utils.slug import uuid_to_slug
+
+
+class UserCRUD(CRUD):
+    Resource = Resource
+
+
+def test_traverse_object_once_per_request(dbsession, init):
+    """Traversing twice to the same object reuses the loaded object and resource."""
+
+    with transaction.manager:
+        u = create_user(dbsession, init.config.registry)
+        slug = uuid_to_slug(u.uuid)
+
+    request = testing.DummyRequest()
+    request.dbsession = dbsession
+
+    with transaction.manager:
+        crud = UserCRUD(request, model=User)
+        resource = crud[slug]
+        assert resource.get_object().email == "example@example.com"
+
+        # Another CRUD instance for the same request hits the cache
+        crud2 = UserCRUD(request, model=User)
+        assert crud2[slug].get_object() is resource.get_object()
+        assert crud[slug] is resource
+
+        # View names are not mistaken for ids
+        with pytest.raises(KeyError):
+            crud["listing"]
+
+
+def test_wrap_many(dbsession, init):
+    """Listing rows are wrapped in bulk and their URLs match the traversal URLs."""
+
+    with transaction.manager:
+        create_user(dbsession, init.config.registry)
+        create_user(dbsession, init.config.registry, email="example2@example.com")
+
+    request = testing.DummyRequest()
+    request.dbsession = dbsession
+
+    with transaction.manager:
+        crud = UserCRUD(request, model=User)
+        crud.make_lineage(Root(request), crud, "users")
+
+        users = dbsession.query(User).order_by(User.id).all()
+        resources = crud.wrap_many(users)
+
+        assert [r.get_object() for r in resources] == users
+        assert [r.__name__ for r in resources] == [uuid_to_slug(u.uuid) for u in users]
+        assert resources[0] is crud.wrap_to_resource(users[0])
+        assert not hasattr(resources[0], "__dict__")
+
+        for r in resources:
+            assert r.get_url() == request.resource_url(r)
+            assert r.get_url("edit") == request.resource_url(r, "edit")
+
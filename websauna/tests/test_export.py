@@ -0,0 +1,120 @@
+"""Streaming CRUD listing export."""
+import json
+
+import transaction
+from sqlalchemy import inspect
+from pyramid import testing
+
+from websauna.system.crud import listing
+from websauna.system.crud import views
+from websauna.system.crud.sqlalchemy import CRUD
+from websauna.system.user.models import User
+from websauna.tests.utils import create_user
+
+
+class UserExportListing(views.Listing):
+
+    export_batch_size = 2
+
+    table = listing.Table(
+        columns=[
+            listing.Column("id", "Id"),
+            listing.Column("email", "Email"),
+            listing.ControlsColumn(),
+        ]
+    )
+
+    def order_query(self, query):
+        return query.order_by(User.id)
+
+
+def create_listing(dbsession):
+    request = testing.DummyRequest()
+    request.dbsession = dbsession
+    crud = CRUD(request, model=User)
+    crud.__name__ = "user"
+    return UserExportListing(crud, request)
+
+
+def test_export_csv(dbsession, init):
+    """All rows are exported as CSV in several chunks."""
+
+    with transaction.manager:
+        for i in range(5):
+            create_user(dbsession, init.config.registry, email="example{}@example.com".format(i))
+
+    view = create_listing(dbsession)
+    query = view.order_query(view.get_query())
+    chunks = list(view.export_csv(query))
+
+    # Header and a chunk per every two rows
+    assert len(chunks) > 3
+
+    lines = b"".join(chunks).decode("utf-8").splitlines()
+    assert lines[0] == "Id,Email"
+    assert lines[1].endswith(",example0@example.com")
+    assert len(lines) == 6
+
+
+def test_export_jsonl(dbsession, init):
+    """All rows are exported as JSON lines."""
+
+    with transaction.manager:
+        for i in range(3):
+            create_user(dbsession, init.config.registry, email="example{}@example.com".format(i))
+
+    view = create_listing(dbsession)
+    query = view.order_query(view.get_query())
+    lines = b"".join(view.export_jsonl(query)).decode("utf-8").splitlines()
+
+    assert [json.loads(l)["email"] for l in lines] == ["example0@example.com", "example1@example.com", "example2@example.com"]
+    assert "controls" not in json.loads(lines[0])
+
+
+def test_export_jsonl_null(dbsession, init):
+    """Missing values are exported as JSON null."""
+
+    class NullListing(UserExportListing):
+        table = listing.Table(
+            columns=[
+                listing.Column("email", "Email"),
+                listing.Column("last_login_at", "Last login"),
+            ]
+        )
+
+    with transaction.manager:
+        create_user(dbsession, init.config.registry)
+
+    request = testing.DummyRequest()
+    request.dbsession = dbsession
+    view = NullListing(CRUD(request, model=User), request)
+    query = view.order_query(view.get_query())
+    lines = b"".join(view.export_jsonl(query)).decode("utf-8").splitlines()
+
+    assert json.loads(lines[0])["last_login_at"] is None
+
+
+def test_export_csv_escapes_formulas(dbsession, init):
+    """Text which spreadsheets would run as a formula is escaped."""
+
+    with transaction.manager:
+        create_user(dbsession, init.config.registry, email="=1+1@example.com")
+
+    view = create_listing(dbsession)
+    query = view.order_query(view.get_query())
+    lines = b"".join(view.export_csv(query)).decode("utf-8").splitlines()
+    assert lines[1].endswith(",'=1+1@example.com")
+
+
+def test_export_load_options(dbsession, init):
+    """Export loads only the exported columns."""
+
+    with transaction.manager:
+        create_user(dbsession, init.config.registry)
+
+    view = create_listing(dbsession)
+    query = view.get_query().options(*view.get_export_load_options())
+    with transaction.manager:
+        u = query.first()
+        assert "email" in inspect(u).dict
+        assert "username" not in inspect(u).dict
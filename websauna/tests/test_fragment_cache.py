@@ -0,0 +1,67 @@
+"""Template fragment cache."""
+import uuid
+
+from jinja2 import Environment
+from pyramid import testing
+
+from websauna.system.core.fragmentcache import FragmentCache
+from websauna.system.core.fragmentcache import FragmentCacheExtension
+from websauna.system.core.fragmentcache import get_fragment_cache
+
+
+def test_cache_tag(init):
+    """Fragment is rendered once and varies on the given values."""
+
+    registry = init.config.registry
+    cache = get_fragment_cache(registry)
+    assert cache
+
+    env = Environment(extensions=[FragmentCacheExtension])
+    template = env.from_string('{% cache key, 60, vary_on=[color] %}{{ calls.append(1) or color }}{% endcache %}')
+
+    key = "test-{}".format(uuid.uuid4())
+    calls = []
+    request = testing.DummyRequest()
+    request.registry = registry
+
+    assert template.render(request=request, key=key, color="red", calls=calls) == "red"
+    assert template.render(request=request, key=key, color="red", calls=calls) == "red"
+    assert template.render(request=request, key=key, color="blue", calls=calls) == "blue"
+    assert len(calls) == 2
+
+    cache.invalidate_key(key)
+    assert template.render(request=request, key=key, color="red", calls=calls) == "red"
+    assert len(calls) == 3
+
+
+def test_local_eviction(init):
+    """Least recently used fragments are dropped when the local cache is full."""
+
+    cache = FragmentCache(init.config.registry, max_size=10, use_redis=False)
+    cache.set(cache.get_cache_key("a"), "12345")
+    cache.set(cache.get_cache_key("b"), "12345")
+    assert cache.get(cache.get_cache_key("a")) == "12345"
+
+    cache.set(cache.get_cache_key("c"), "12345")
+    assert cache.get(cache.get_cache_key("b")) is None
+    assert cache.get(cache.get_cache_key("a")) == "12345"
+    assert cache.get_stats()["hits"] == 2
+    assert cache.get_stats()["misses"] == 1
+    assert cache.get_stats()["size"] == 10
+
+
+def test_redis_down(init):
+    """Fragments are rendered without the shared cache if Redis cannot be reached."""
+
+    cache = FragmentCache(init.config.registry, url="redis://localhost:1/0")
+    calls = []
+
+    def caller():
+        calls.append(1)
+        return "hello"
+
+    assert cache.render("down", 60, None, caller) == "hello"
+    assert cache.render("down", 60, None, caller) == "hello"
+
+    # The second render came from the local cache
+    assert len(calls) == 1
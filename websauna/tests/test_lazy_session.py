@@ -0,0 +1,37 @@
+"""Lazily created sessions."""
+from pyramid import testing
+
+from websauna.system.core.session import LazySession
+
+
+def test_lazy_session():
+    """Session is not created before something is stored in it."""
+
+    created = []
+
+    def factory(request):
+        session = testing.DummySession()
+        created.append(session)
+        return session
+
+    request = testing.DummyRequest()
+    session = LazySession(request, factory, "session")
+
+    assert session.get("auth.userid") is None
+    assert "created_at" not in session
+    assert session.pop_flash() == []
+    session.invalidate()
+    assert not created
+
+    session.flash("Hello")
+    assert len(created) == 1
+    assert session.pop_flash() == ["Hello"]
+
+
+def test_lazy_session_with_cookie():
+    """Existing sessions are loaded on first access."""
+
+    request = testing.DummyRequest(cookies={"session": "xxx"})
+    session = LazySession(request, lambda request: testing.DummySession(foo="bar"), "session")
+    assert session["foo"] == "bar"
+    assert session.materialized
@@ -0,0 +1,70 @@
+"""Listing eager loading planner."""
+import transaction
+
+from sqlalchemy import inspect
+
+from websauna.system.crud import listing
+from websauna.system.user.models import User
+from websauna.tests.utils import create_user
+
+
+def test_load_only_shown_columns(dbsession, init):
+    """Listing loads only the columns of the table and eager loads relationships."""
+
+    with transaction.manager:
+        create_user(dbsession, init.config.registry, admin=True)
+
+    table = listing.Table(columns=[
+        listing.Column("email", "Email"),
+        listing.Column("groups", "Groups"),
+        listing.ControlsColumn(),
+    ])
+
+    with transaction.manager:
+        options = table.get_load_options(User, required=["uuid"])
+        u = dbsession.query(User).options(*options).first()
+        state = inspect(u)
+        assert "email" in state.dict
+        assert "uuid" in state.dict
+        assert "groups" in state.dict
+        assert "username" not in state.dict
+
+
+def test_getter_disables_load_only(dbsession, init):
+    """Columns with getters without a load hint load all columns."""
+
+    with transaction.manager:
+        create_user(dbsession, init.config.registry)
+
+    table = listing.Table(columns=[
+        listing.Column("name", "Name", getter=lambda obj: obj.username),
+    ])
+
+    with transaction.manager:
+        u = dbsession.query(User).options(*table.get_load_options(User)).first()
+        assert "username" in inspect(u).dict
+
+    table = listing.Table(columns=[
+        listing.Column("name", "Name", getter=lambda obj: obj.username, load=["username"]),
+    ])
+
+    with transaction.manager:
+        u = dbsession.query(User).options(*table.get_load_options(User)).first()
+        assert "username" in inspect(u).dict
+        assert "email" not in inspect(u).dict
+
+
+def test_custom_body_template_disables_load_only(dbsession, init):
+    """Custom column templates and URL getters without a load hint load all columns."""
+
+    with transaction.manager:
+        create_user(dbsession, init.config.registry)
+
+    for column in [listing.Column("email", "Email", body_template="myapp/email_column.html"),
+                   listing.Column("email", "Email", navigate_url_getter=lambda request, resource: "mailto:" + resource.obj.username)]:
+
+        table = listing.Table(columns=[column])
+
+        with transaction.manager:
+            u = dbsession.query(User).options(*table.get_load_options(User)).first()
+            assert "username" in inspect(u).dict
@@ -0,0 +1,26 @@
+"""Compiled listing row rendering."""
+from jinja2 import DictLoader
+from jinja2 import Environment
+
+from websauna.system.crud import listing
+
+
+def test_custom_column_template_context():
+    """Custom column templates see the context of the listing template and do not leak variables to each other."""
+
+    env = Environment(loader=DictLoader({
+        "crud/column_body.html": "<td>{{ column.get_value(obj) }}</td>",
+        "myapp/custom.html": "{% set label = 'x' %}<td>{{ crud }} {{ site_name }} {{ obj }}</td>",
+        "myapp/other.html": "<td>{{ label }}</td>",
+        "listing.html": "{% for obj in items %}<tr>{{ render_row(obj, obj) }}</tr>{% endfor %}",
+    }))
+
+    table = listing.Table(columns=[
+        listing.Column("id", "Id", getter=lambda obj: obj),
+        listing.Column("custom", "Custom", body_template="myapp/custom.html"),
+        listing.Column("other", "Other", body_template="myapp/other.html"),
+    ])
+
+    render_row = table.get_row_renderer(env, request=None)
+    html = env.get_template("listing.html").render(items=[1, 2], crud="Users", site_name="Example", render_row=render_row)
+    assert html == "<tr><td>1</td><td>Users Example 1</td><td></td></tr><tr><td>2</td><td>Users Example 2</td><td></td></tr>"
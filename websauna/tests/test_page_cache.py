@@ -0,0 +1,86 @@
+"""Full page cache for anonymous visitors."""
+import pytest
+from pyramid.request import Request
+from pyramid.response import Response
+
+from websauna.system.http.interfaces import IPageCacheStorage
+from websauna.system.http.pagecache import MemoryStorage
+from websauna.system.http.pagecache import PageCacheTweenFactory
+from websauna.system.http.pagecache import cache_page
+from websauna.system.http.pagecache import invalidate_page
+
+
+def test_page_cache(init):
+    """Anonymous requests are served from the cache, others hit the view."""
+
+    registry = init.config.registry
+    registry.registerUtility(MemoryStorage(), IPageCacheStorage)
+
+    calls = []
+
+    @cache_page(60)
+    def view(context, request):
+        calls.append(1)
+        response = Response("Hello {}".format(len(calls)))
+        if "set" in request.params:
+            response.set_cookie("foo", "bar")
+        return response
+
+    tween = PageCacheTweenFactory(lambda request: view(None, request), registry)
+
+    def get(url, **kwargs):
+        request = Request.blank(url, **kwargs)
+        request.registry = registry
+        return tween(request)
+
+    try:
+        assert get("/").text == "Hello 1"
+        assert get("/").text == "Hello 1"
+        assert get("/", headers={"Cookie": "session=x"}).text == "Hello 2"
+        assert get("/?set=1").text == "Hello 3"
+        assert get("/?set=1").text == "Hello 4"
+
+        request = Request.blank("/")
+        request.registry = registry
+        invalidate_page(request, "http://localhost/")
+        assert get("/").text == "Hello 5"
+    finally:
+        registry.unregisterUtility(provided=IPageCacheStorage)
+
+
+def test_page_cache_refresh_error(init):
+    """A failed refresh of a stale page releases the refresh lock."""
+
+    registry = init.config.registry
+    registry.registerUtility(MemoryStorage(), IPageCacheStorage)
+
+    calls = []
+    fail = []
+
+    @cache_page(0, stale=60)
+    def view(context, request):
+        if fail:
+            raise RuntimeError("Refresh failed")
+        calls.append(1)
+        return Response("Hello {}".format(len(calls)))
+
+    tween = PageCacheTweenFactory(lambda request: view(None, request), registry)
+
+    def get(url):
+        request = Request.blank(url)
+        request.registry = registry
+        return tween(request)
+
+    try:
+        assert get("/").text == "Hello 1"
+
+        # The page is stale right away and regenerating it fails
+        fail.append(1)
+        with pytest.raises(RuntimeError):
+            get("/")
+        fail.clear()
+
+        # The next request regenerates the page instead of getting the stale copy
+        assert get("/").text == "Hello 2"
+    finally:
+        registry.unregisterUtility(provided=IPageCacheStorage)
@@ -23,3 +23,159 @@ def xxx_test_crud_zero_items(web_server, browser, dbsession, init):
 
     crud = prepare_crud()
 
+
+
+def test_batch_slices_query_in_database(dbsession, init):
+    """Batch fetches only the rows of the current page from a query."""
+
+    from pyramid import testing
+    from websauna.system.crud.paginator import DefaultPaginator
+    from websauna.system.user.models import User
+    from websauna.tests.utils import create_user
+
+    with transaction.manager:
+        for i in range(12):
+            create_user(dbsession, init.config.registry, email="example{}@example.com".format(i))
+
+    request = testing.DummyRequest(params={"batch_num": "2", "batch_size": "5"})
+
+    with transaction.manager:
+        query = dbsession.query(User).order_by(User.id)
+        count = query.count()
+        batch = DefaultPaginator().paginate(query, request, count, url="http://localhost/listing")
+
+        assert batch.seqlen == 12
+        assert len(batch) == 2
+        assert [u.email for u in batch] == ["example10@example.com", "example11@example.com"]
+        assert batch.prev_url
+        assert not batch.next_url
+
+
+def test_keyset_pagination(dbsession, init):
+    """Walk through a listing forward and backward using keyset cursors."""
+
+    from urllib.parse import urlsplit, parse_qsl
+    from pyramid import testing
+    from websauna.system.crud.paginator import KeysetPaginator
+    from websauna.system.user.models import User
+    from websauna.tests.utils import create_user
+
+    with transaction.manager:
+        for i in range(7):
+            create_user(dbsession, init.config.registry, email="example{}@example.com".format(i))
+
+    def get_page(params):
+        request = testing.DummyRequest(params=params)
+        query = dbsession.query(User).order_by(User.created_at.desc())
+        return KeysetPaginator(default_size=3).paginate(query, request, 7, url="http://localhost/listing")
+
+    def params(url):
+        return dict(parse_qsl(urlsplit(url).query))
+
+    with transaction.manager:
+        first = get_page({})
+        assert [u.email for u in first] == ["example6@example.com", "example5@example.com", "example4@example.com"]
+        assert not first.prev_url
+
+        second = get_page(params(first.next_url))
+        assert [u.email for u in second] == ["example3@example.com", "example2@example.com", "example1@example.com"]
+
+        third = get_page(params(second.next_url))
+        assert [u.email for u in third] == ["example0@example.com"]
+        assert not third.next_url
+
+        back = get_page(params(third.prev_url))
+        assert [u.email for u in back] == [u.email for u in second]
+
+        # Tampered cursor falls back to the first page
+        assert [u.email for u in get_page({"batch_after": "xxx"})] == [u.email for u in first]
+
+
+def test_batch_pages_past_capped_count(dbsession, init):
+    """Estimated counts do not cut the listing short."""
+
+    from pyramid import testing
+    from websauna.system.crud.counter import CappedCounter
+    from websauna.system.crud.paginator import DefaultPaginator
+    from websauna.system.user.models import User
+    from websauna.tests.utils import create_user
+
+    with transaction.manager:
+        for i in range(12):
+            create_user(dbsession, init.config.registry, email="example{}@example.com".format(i))
+
+    with transaction.manager:
+        query = dbsession.query(User).order_by(User.id)
+        count = CappedCounter(limit=5).count(query)
+        assert count.capped
+
+        request = testing.DummyRequest(params={"batch_num": "1", "batch_size": "5"})
+        batch = DefaultPaginator().paginate(query, request, count, url="http://localhost/listing")
+        assert [u.email for u in batch] == ["example{}@example.com".format(i) for i in range(5, 10)]
+        assert batch.next_url
+        assert not batch.last_url
+
+        request = testing.DummyRequest(params={"batch_num": "2", "batch_size": "5"})
+        batch = DefaultPaginator().paginate(query, request, count, url="http://localhost/listing")
+        assert [u.email for u in batch] == ["example10@example.com", "example11@example.com"]
+        assert not batch.next_url
+
+
+def test_keyset_pagination_nullable_key(dbsession, init):
+    """Rows with NULL sort key are not lost between pages."""
+
+    import datetime
+    from urllib.parse import urlsplit, parse_qsl
+    from pyramid import testing
+    from websauna.system.crud.paginator import KeysetPaginator
+    from websauna.system.user.models import User
+    from websauna.tests.utils import create_user
+
+    with transaction.manager:
+        for i in range(7):
+            u = create_user(dbsession, init.config.registry, email="example{}@example.com".format(i))
+            if i % 3 == 0:
+                u.last_login_at = datetime.datetime(2016, 1, 1 + i, tzinfo=datetime.timezone.utc)
+
+    def get_page(params):
+        request = testing.DummyRequest(params=params)
+        query = dbsession.query(User).order_by(User.last_login_at.desc())
+        return KeysetPaginator(default_size=3).paginate(query, request, 7, url="http://localhost/listing")
+
+    def params(url):
+        return dict(parse_qsl(urlsplit(url).query))
+
+    with transaction.manager:
+        pages = [get_page({})]
+        while pages[-1].next_url:
+            pages.append(get_page(params(pages[-1].next_url)))
+
+        emails = [u.email for page in pages for u in page]
+
+        # NULLs first in descending order, then the logged in users
+        assert emails == ["example{}@example.com".format(i) for i in (1, 2, 4, 5, 6, 3, 0)]
+
+        back = get_page(params(pages[-1].prev_url))
+        assert [u.email for u in back] == [u.email for u in pages[-2]]
+
+
+def test_keyset_pagination_expression_fallback(dbsession, init):
+    """Sorting by an SQL expression falls back to offset pagination."""
+
+    from pyramid import testing
+    from sqlalchemy import func
+    from websauna.system.crud.paginator import Batch
+    from websauna.system.crud.paginator import KeysetPaginator
+    from websauna.system.user.models import User
+    from websauna.tests.utils import create_user
+
+    with transaction.manager:
+        for i in range(3):
+            create_user(dbsession, init.config.registry, email="example{}@example.com".format(i))
+
+    with transaction.manager:
+        request = testing.DummyRequest()
+        query = dbsession.query(User).order_by(func.lower(User.email))
+        batch = KeysetPaginator(default_size=2).paginate(query, request, 3, url="http://localhost/listing")
+        assert isinstance(batch, Batch)
+        assert [u.email for u in batch] == ["example0@example.com", "example1@example.com"]
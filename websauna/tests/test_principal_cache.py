@@ -0,0 +1,89 @@
+"""Cross-request principal cache."""
+import transaction
+from pyramid import testing
+from pyramid.threadlocal import manager
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from websauna.system.auth.principalcache import PrincipalCache
+from websauna.system.auth.principalcache import invalidate_deleted_groups
+from websauna.system.auth.principals import get_auth_state
+from websauna.system.auth.interfaces import IPrincipalCache
+from websauna.system.user.models import Group
+from websauna.tests.utils import create_user
+
+
+def test_principal_cache(dbsession, init):
+    """Second request reads principals from Redis and invalidation drops them."""
+
+    registry = init.config.registry
+    cache = PrincipalCache(registry)
+    registry.registerUtility(cache, IPrincipalCache)
+
+    try:
+        with transaction.manager:
+            u = create_user(dbsession, registry, admin=True)
+            user_id = u.id
+
+        cache.invalidate(user_id)
+
+        request = testing.DummyRequest()
+        request.dbsession = dbsession
+        request.registry = registry
+
+        with transaction.manager:
+            state = get_auth_state(user_id, request)
+            assert "group:admin" in state.principals
+            assert state.can_login
+
+        cached = cache.get(user_id)
+        assert cached == state
+
+        # No database access needed
+        request = testing.DummyRequest()
+        request.registry = registry
+        assert get_auth_state(user_id, request) == state
+
+        cache.invalidate(user_id)
+        assert cache.get(user_id) is None
+    finally:
+        registry.unregisterUtility(cache, IPrincipalCache)
+
+
+def test_principal_cache_group_delete(dbsession, init):
+    """Deleting a group drops cached principals of its members."""
+
+    registry = init.config.registry
+    cache = PrincipalCache(registry)
+    registry.registerUtility(cache, IPrincipalCache)
+    event.listen(Session, "before_flush", invalidate_deleted_groups)
+
+    request = testing.DummyRequest()
+    request.dbsession = dbsession
+    request.registry = registry
+
+    try:
+        with transaction.manager:
+            u = create_user(dbsession, registry, admin=True)
+            user_id = u.id
+
+        with transaction.manager:
+            state = get_auth_state(user_id, request)
+            assert "group:admin" in state.principals
+
+        assert cache.get(user_id) == state
+
+        # The group is deleted during a request
+        manager.push({"registry": registry, "request": request})
+        try:
+            with transaction.manager:
+                admin_group = dbsession.query(Group).filter_by(name="admin").one()
+                admin_group.users = []
+                dbsession.delete(admin_group)
+        finally:
+            manager.pop()
+
+        assert cache.get(user_id) is None
+    finally:
+        event.remove(Session, "before_flush", invalidate_deleted_groups)
+        registry.unregisterUtility(cache, IPrincipalCache)
@@ -0,0 +1,16 @@
+"""Redis connection management."""
+from websauna.system.core.redis import get_redis
+from websauna.system.core.redis import get_redis_pool_stats
+
+
+def test_redis_client_is_shared(init):
+    """Callers share one client and connection pool."""
+
+    registry = init.config.registry
+    redis = get_redis(registry)
+    assert get_redis(registry) is redis
+    assert get_redis(registry, db=2) is not redis
+
+    redis.set("websauna_pool_test", 1)
+    stats = get_redis_pool_stats(registry)
+    assert any(s["created_connections"] for s in stats)
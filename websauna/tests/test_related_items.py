@@ -0,0 +1,47 @@
+"""Read-only presentation of to-many relationships."""
+import transaction
+from pyramid import testing
+
+from websauna.system.crud.sqlalchemy import CRUD
+from websauna.system.crud.sqlalchemy import Resource
+from websauna.system.crud.views import Listing
+from websauna.system.form.sqlalchemy import LazyRelatedItems
+from websauna.system.user.models import Group
+from websauna.system.user.models import User
+from websauna.tests.utils import create_user
+from websauna.utils.slug import uuid_to_slug
+
+
+class UserCRUD(CRUD):
+    Resource = Resource
+
+
+def test_related_items_preview(dbsession, init):
+    """Only the first items and the count are loaded."""
+
+    with transaction.manager:
+        g = Group(name="members")
+        dbsession.add(g)
+        for i in range(3):
+            u = create_user(dbsession, init.config.registry, email="member{}@example.com".format(i))
+            u.groups.append(g)
+        create_user(dbsession, init.config.registry, email="outsider@example.com")
+
+    with transaction.manager:
+        g = dbsession.query(Group).one()
+
+        items, count = LazyRelatedItems(g, "users").get_preview(2)
+        assert len(items) == 2
+        assert count == 3
+        assert "users" not in g.__dict__
+
+        items, count = LazyRelatedItems(g, "users").get_preview(10)
+        assert len(items) == 3
+        assert count == 3
+
+        # Link target of the widget lists the members only
+        request = testing.DummyRequest(params={"related_groups": uuid_to_slug(g.uuid)})
+        request.dbsession = dbsession
+        listing = Listing(UserCRUD(request, model=User), request)
+        query = listing.filter_query(dbsession.query(User))
+        assert sorted(u.email for u in query) == ["member0@example.com", "member1@example.com", "member2@example.com"]
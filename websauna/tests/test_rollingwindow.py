@@ -0,0 +1,34 @@
+"""Rolling time window limiter."""
+from websauna.system.core.redis import get_redis
+from websauna.system.form import rollingwindow
+
+
+def test_check(init):
+    """Limit is hit after the allowed number of hits and the key expires."""
+
+    registry = init.config.registry
+    redis = get_redis(registry)
+    redis.delete("test_rolling_window")
+
+    assert not rollingwindow.check(registry, "test_rolling_window", window=60, limit=2)
+    assert not rollingwindow.check(registry, "test_rolling_window", window=60, limit=2)
+    assert rollingwindow.check(registry, "test_rolling_window", window=60, limit=2)
+
+    # Reading does not record a hit
+    assert rollingwindow.get(registry, "test_rolling_window", window=60) == 3
+    assert rollingwindow.get(registry, "test_rolling_window", window=60) == 3
+
+    assert 0 < redis.ttl("test_rolling_window") <= 60
+
+
+def test_check_many(init):
+    """Check several limiters in one go."""
+
+    registry = init.config.registry
+    redis = get_redis(registry)
+    redis.delete("test_rolling_a", "test_rolling_b")
+
+    limiters = [("test_rolling_a", 60, 1), ("test_rolling_b", 60, 2)]
+    assert rollingwindow.check_many(registry, limiters) == [False, False]
+    assert rollingwindow.check_many(registry, limiters) == [True, False]
+    assert rollingwindow.check_many(registry, limiters) == [True, True]
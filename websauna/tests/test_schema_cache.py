@@ -0,0 +1,151 @@
+"""Cached form schemas."""
+import transaction
+from pyramid import testing
+
+from websauna.system.crud.sqlalchemy import CRUD
+from websauna.system.crud.sqlalchemy import Resource
+from websauna.system.crud.views import Show
+from websauna.system.form.colander import TypeOverridesHandling
+from websauna.system.form.fieldmapper import DefaultFieldMapper
+from websauna.system.form.fieldmapper import EditMode
+from websauna.system.user.models import User
+from websauna.tests.utils import create_user
+from websauna.utils.slug import uuid_to_slug
+
+
+class UserCRUD(CRUD):
+    Resource = Resource
+
+
+class UserShow(Show):
+    includes = ["id", "email", "username"]
+    cache_schema = True
+
+
+class RequestDependentFieldMapper(DefaultFieldMapper):
+    """Show username only if asked."""
+
+    def __init__(self):
+        self.requests = []
+
+    def map(self, mode, request, context, model, includes, nested=None):
+        self.requests.append(request)
+        return super(RequestDependentFieldMapper, self).map(mode, request, context, model, includes, nested)
+
+    def map_column(self, mode, request, node, model, name, column, column_type):
+        if name == "username" and "username" not in request.params:
+            return TypeOverridesHandling.drop, {}
+        return super(RequestDependentFieldMapper, self).map_column(mode, request, node, model, name, column, column_type)
+
+
+def test_schema_prototype_reused(dbsession, init):
+    """Schema is generated once and each form gets its own bound copy."""
+
+    with transaction.manager:
+        u = create_user(dbsession, init.config.registry)
+        slug = uuid_to_slug(u.uuid)
+
+    with transaction.manager:
+        schemas = []
+        for i in range(2):
+            request = testing.DummyRequest()
+            request.dbsession = dbsession
+            resource = UserCRUD(request, model=User)[slug]
+            view = UserShow(resource, request)
+            prototype = view.get_schema_prototype(EditMode.show)
+            form = view.create_form(EditMode.show)
+            assert form.schema is not prototype
+            assert form.schema.bindings["request"] is request
+            schemas.append((prototype, form.schema))
+
+        assert schemas[0][0] is schemas[1][0]
+        assert schemas[0][1] is not schemas[1][1]
+        assert [c.name for c in schemas[1][1].children][:3] == ["id", "email", "username"]
+
+
+def test_dictify_plan_shared(dbsession, init):
+    """Bound copies of a schema reuse the dictify plan."""
+
+    with transaction.manager:
+        u = create_user(dbsession, init.config.registry)
+        u.full_name = "Mikko"
+        slug = uuid_to_slug(u.uuid)
+
+    with transaction.manager:
+        request = testing.DummyRequest()
+        request.dbsession = dbsession
+        resource = UserCRUD(request, model=User)[slug]
+        view = UserShow(resource, request)
+        prototype = view.get_schema_prototype(EditMode.show)
+
+        appstruct = view.create_form(EditMode.show).schema.dictify(resource.get_object())
+        assert appstruct["email"] == "example@example.com"
+
+        plans = prototype._plans
+        assert len(plans) == 1
+        view.create_form(EditMode.show).schema.dictify(resource.get_object())
+        assert len(plans) == 1
+
+
+def test_request_dependent_mapper_not_cached(dbsession, init):
+    """Schemas are mapped per request unless caching is turned on, and shared schemas do not hold a request."""
+
+    with transaction.manager:
+        u = create_user(dbsession, init.config.registry)
+        slug = uuid_to_slug(u.uuid)
+
+    class RequestDependentShow(Show):
+        includes = ["id", "email", "username"]
+        field_mapper = RequestDependentFieldMapper()
+
+    with transaction.manager:
+        names = []
+        for params in ({}, {"username": "1"}):
+            request = testing.DummyRequest(params=params)
+            request.dbsession = dbsession
+            view = RequestDependentShow(UserCRUD(request, model=User)[slug], request)
+            assert view.get_schema_prototype(EditMode.show) is None
+            names.append([c.name for c in view.create_form(EditMode.show).schema.children])
+
+        assert "username" not in names[0]
+        assert "username" in names[1]
+
+        # Prototype of a cached view is mapped without the request
+        mapper = RequestDependentFieldMapper()
+        mapper.map_column = DefaultFieldMapper.map_column.__get__(mapper)
+
+        class CachedShow(UserShow):
+            field_mapper = mapper
+
+        request = testing.DummyRequest()
+        request.dbsession = dbsession
+        CachedShow(UserCRUD(request, model=User)[slug], request).create_form(EditMode.show)
+        assert mapper.requests == [None]
+
+
+def test_admin_views_cache_schema(dbsession, init):
+    """Admin form views share schemas, views with their own create_schema() do not."""
+
+    from websauna.system.admin import views as admin_views
+
+    assert admin_views.Show.cache_schema
+    assert admin_views.Edit.cache_schema
+    assert admin_views.Add.cache_schema
+
+    with transaction.manager:
+        u = create_user(dbsession, init.config.registry)
+        slug = uuid_to_slug(u.uuid)
+
+    class CustomSchemaShow(UserShow):
+
+        def create_schema(self, mode, nested=None):
+            schema = super(CustomSchemaShow, self).create_schema(mode, nested)
+            schema.title = self.request.params.get("title", "")
+            return schema
+
+    with transaction.manager:
+        request = testing.DummyRequest(params={"title": "Custom"})
+        request.dbsession = dbsession
+        view = CustomSchemaShow(UserCRUD(request, model=User)[slug], request)
+        assert view.get_schema_prototype(EditMode.show) is None
+        assert view.create_form(EditMode.show).schema.title == "Custom"
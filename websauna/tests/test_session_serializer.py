@@ -0,0 +1,43 @@
+"""Msgpack session serializer."""
+import datetime
+import pickle
+
+from websauna.system.core.messages import FlashMessage
+from websauna.system.core.sessionserializer import deserialize
+from websauna.system.core.sessionserializer import serialize
+from websauna.utils.time import now
+
+
+def test_roundtrip():
+    """Session data survives serialization."""
+
+    created_at = now()
+    data = {
+        "managed_dict": {
+            "created_at": created_at,
+            "naive": datetime.datetime(2016, 1, 1, 12, 0, 0, 123),
+            "day": datetime.date(2016, 1, 1),
+            "_f_info": [FlashMessage("Hello", kind="info", msg_id="msg-hello", extra={"foo": 1})],
+            "ids": {1, 2},
+        },
+        "created": 1460000000.0,
+        "timeout": 1200,
+    }
+
+    result = deserialize(serialize(data))
+    managed = result["managed_dict"]
+    assert managed["created_at"] == created_at
+    assert managed["naive"] == datetime.datetime(2016, 1, 1, 12, 0, 0, 123)
+    assert managed["day"] == datetime.date(2016, 1, 1)
+    assert managed["ids"] == {1, 2}
+
+    msg = managed["_f_info"][0]
+    assert msg.plain == "Hello"
+    assert msg.msg_id == "msg-hello"
+    assert msg.extra == {"foo": 1}
+
+
+def test_read_pickled_session():
+    """Old pickled sessions can be read."""
+    data = {"managed_dict": {"created_at": now()}, "created": 1460000000.0, "timeout": 1200}
+    assert deserialize(pickle.dumps(data)) == data
@@ -0,0 +1,107 @@
+"""Sliding window counter."""
+import logging
+import time
+
+from pyramid import testing
+
+from websauna.system.core.redis import get_redis
+from websauna.system.form import rollingwindow
+from websauna.system.form import slidingwindow
+from websauna.system.form.throttle import create_throttle_validator
+
+
+KEY = "test_sliding_window"
+
+
+logger = logging.getLogger(__name__)
+
+
+def test_accuracy(init):
+    """Approximated count stays close to the exact rolling window count."""
+
+    redis = get_redis(init.config.registry)
+    redis.delete(KEY)
+
+    # Two hits per second for five minutes
+    times = [1000 + i * 0.5 for i in range(600)]
+    for i, now in enumerate(times):
+        slidingwindow._check(redis, KEY, window=60, limit=1000, buckets=6, now=now)
+
+        if i > 200:
+            exact = sum(1 for t in times[:i + 1] if t > now - 60)
+            approximated = slidingwindow._get(redis, KEY, window=60, buckets=6, now=now)
+            assert abs(approximated - exact) <= exact / 6
+
+
+def test_limit(init):
+    """Limit is hit after the allowed number of hits."""
+
+    registry = init.config.registry
+    redis = get_redis(registry)
+    redis.delete(KEY)
+
+    assert not slidingwindow.check(registry, KEY, window=60, limit=2)
+    assert not slidingwindow.check(registry, KEY, window=60, limit=2)
+    assert slidingwindow.check(registry, KEY, window=60, limit=2)
+    assert slidingwindow.get(registry, KEY, window=60) == 3
+    assert 0 < redis.ttl(KEY) <= 61
+
+
+def test_memory_bounded(init):
+    """Flood does not grow the key beyond the number of buckets."""
+
+    registry = init.config.registry
+    redis = get_redis(registry)
+    redis.delete(KEY)
+
+    hits = 5000
+    for i in range(hits):
+        slidingwindow._check(redis, KEY, window=3600, limit=100, buckets=60, now=1000 + i)
+
+    assert redis.hlen(KEY) <= 61
+
+
+def test_switch_throttle_counter(init):
+    """A throttle can be switched from the rolling window to the sliding window counter."""
+
+    request = testing.DummyRequest()
+    request.registry = init.config.registry
+    redis = get_redis(request.registry)
+    redis.delete("throttle_test_switch", slidingwindow.THROTTLE_KEY_PREFIX + "test_switch")
+
+    for counter in (rollingwindow, slidingwindow):
+        validator = create_throttle_validator("test_switch", 10, counter=counter)(None, {"request": request})
+        validator(None, "foo")
+
+    assert redis.type("throttle_test_switch") == b"zset"
+    assert redis.type(slidingwindow.THROTTLE_KEY_PREFIX + "test_switch") == b"hash"
+
+
+def test_throughput(init):
+    """Bucketed counter keeps up with the rolling window ZSET under a flood of hits."""
+
+    registry = init.config.registry
+    redis = get_redis(registry)
+    rolling_key = KEY + "_rolling"
+    redis.delete(KEY, rolling_key)
+
+    hits = 2000
+
+    def measure(counter, key):
+        # Load the Lua script before timing
+        counter.check(registry, key, window=3600, limit=hits * 2)
+        start = time.perf_counter()
+        for i in range(hits):
+            counter.check(registry, key, window=3600, limit=hits * 2)
+        return hits / (time.perf_counter() - start)
+
+    try:
+        rolling_rate = measure(rollingwindow, rolling_key)
+        sliding_rate = measure(slidingwindow, KEY)
+    finally:
+        redis.delete(KEY, rolling_key)
+
+    logger.info("Rolling window %d hits/s, sliding window %d hits/s", rolling_rate, sliding_rate)
+
+    # Both do one script call per hit, leave room for timing noise
+    assert sliding_rate > rolling_rate * 0.5
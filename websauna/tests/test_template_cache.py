@@ -0,0 +1,24 @@
+"""Compiled template cache."""
+import os
+
+from websauna.system.core import templatecache
+
+
+def test_configure_jinja2_cache(tmpdir):
+    """Bytecode cache directory is created and passed to pyramid_jinja2 settings."""
+
+    settings = {"websauna.template_cache": str(tmpdir)}
+    directory = templatecache.get_cache_directory(settings)
+    templatecache.configure_jinja2_cache(settings, directory)
+
+    assert settings["jinja2.bytecode_caching"] == "true"
+    assert os.path.isdir(settings["jinja2.bytecode_caching_directory"])
+
+    assert templatecache.get_cache_directory({}) is None
+
+
+def test_compile_jinja2_templates(init):
+    """Templates on the search paths are compiled."""
+
+    compiled, failed = templatecache.compile_jinja2_templates(init.config.registry)
+    assert compiled > 0
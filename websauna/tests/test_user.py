@@ -12,3 +12,32 @@ def test_user_subsystem(init, dbsession):
     with transaction.manager:
         u = dbsession.query(User).get(1)
         assert u.email == "example@example.com"
+
+
+def test_resolve_principals_once(init, dbsession):
+    """Principals are resolved once per request and group checks follow group changes."""
+    from pyramid import testing
+    from websauna.system.auth.principals import resolve_principals
+    from websauna.system.user.models import Group
+    from websauna.tests.utils import create_user
+
+    with transaction.manager:
+        u = create_user(dbsession, init.config.registry)
+        user_id = u.id
+
+    request = testing.DummyRequest()
+    request.dbsession = dbsession
+    request.registry = init.config.registry
+
+    with transaction.manager:
+        principals = resolve_principals(user_id, request)
+        assert principals == []
+        assert resolve_principals(user_id, request) is principals
+
+        u = request._auth_user_cache[user_id]
+        assert not u.is_admin()
+
+        g = Group(name="admin")
+        dbsession.add(g)
+        g.users.append(u)
+        assert u.is_admin()